@@ -18,6 +18,7 @@ setup(
     packages=find_packages(exclude=["tests"]),
     install_requires=[x for x in open("requirements.txt").read().splitlines() if "://" not in x],
     dependency_links=[x for x in open("requirements.txt").read().splitlines() if "://" in x],
+    extras_require={"pytest": ["pytest>=7.0.0"]},
     url="https://github.com/wtsi-hgi/useintest",
     license="MIT",
     description="I don't care how it's done, I just want to use it in my tests!",
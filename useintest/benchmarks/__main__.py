@@ -0,0 +1,95 @@
+import argparse
+from typing import Callable
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine, use_fake_docker_engine
+from useintest.benchmarks.runner import benchmark_service_controller, benchmark_executables, store_results, \
+    load_results, format_results
+from useintest.executables.builders import CommandsBuilder
+from useintest.executables.controllers import DefinedExecutablesController
+from useintest.executables.models import Executable
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+
+DEFAULT_RESULTS_DIRECTORY = ".benchmarks"
+_REPOSITORY = "useintest/benchmark"
+_TAG = "latest"
+_STARTED_LOG_LINE = "Service started"
+
+
+def _parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the latency and throughput of starting and stopping services, and of proxy "
+                    "executables, against a fake Docker engine")
+    parser.add_argument("--iterations", type=int, default=50, help="number of services to start and stop")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of services to start and stop at once")
+    parser.add_argument("--executable-iterations", type=int, default=10,
+                        help="number of times to write and invoke the proxy executables")
+    parser.add_argument("--pull-delay", type=float, default=0.0, help="seconds taken to pull an image")
+    parser.add_argument("--create-delay", type=float, default=0.0, help="seconds taken to create a container")
+    parser.add_argument("--start-delay", type=float, default=0.0, help="seconds taken to start a container")
+    parser.add_argument("--stop-delay", type=float, default=0.0, help="seconds taken to stop a container")
+    parser.add_argument("--remove-delay", type=float, default=0.0, help="seconds taken to remove a container")
+    parser.add_argument("--run-delay", type=float, default=0.0,
+                        help="seconds taken by the `docker` CLI to run a proxied executable")
+    parser.add_argument("--log-lines", type=int, default=1000,
+                        help="number of lines containers log before they log that they have started")
+    parser.add_argument("--log-duration", type=float, default=0.0,
+                        help="seconds over which containers log before they log that they have started")
+    parser.add_argument("--results-directory", default=DEFAULT_RESULTS_DIRECTORY,
+                        help="directory in which results are stored")
+    parser.add_argument("--compare", help="location of stored results to compare against")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Runs the benchmarks.
+    """
+    arguments = _parse_arguments()
+    line_delay = arguments.log_duration / (arguments.log_lines + 1)
+    log_script = [(line_delay, f"Starting up ({i})...") for i in range(arguments.log_lines)]
+    log_script.append((line_delay, _STARTED_LOG_LINE))
+    engine = FakeDockerEngine(
+        pull_delay=arguments.pull_delay, create_delay=arguments.create_delay, start_delay=arguments.start_delay,
+        stop_delay=arguments.stop_delay, remove_delay=arguments.remove_delay, log_script=log_script)
+
+    with use_fake_docker_engine(engine):
+        image_cache = ImageCache()
+
+        def create_controller_factory(**kwargs) -> Callable[[], DockerisedServiceController]:
+            return lambda: DockerisedServiceController(
+                DockerisedService, _REPOSITORY, _TAG, [], image_cache=image_cache, start_tries=1, **kwargs)
+
+        def create_executables_controller() -> DefinedExecutablesController:
+            return DefinedExecutablesController(named_executables={
+                "benchmark": Executable(CommandsBuilder(executable="true", image=f"{_REPOSITORY}:{_TAG}"), False)})
+
+        results = [
+            benchmark_service_controller(
+                "log-detection", create_controller_factory(start_log_detector=_STARTED_LOG_LINE),
+                arguments.iterations, arguments.concurrency),
+            benchmark_service_controller(
+                "callable-log-detection",
+                create_controller_factory(start_log_detector=lambda line: _STARTED_LOG_LINE in line),
+                arguments.iterations, arguments.concurrency),
+            benchmark_service_controller(
+                "health-detection", create_controller_factory(healthcheck="true"), arguments.iterations,
+                arguments.concurrency),
+            benchmark_executables(
+                "executables", create_executables_controller, arguments.executable_iterations,
+                run_delay=arguments.run_delay)
+        ]
+
+        baseline = load_results(arguments.compare) if arguments.compare is not None else None
+        print(format_results(results, baseline))
+        location = store_results(results, arguments.results_directory, settings=vars(arguments))
+        print(f"Results stored in: {location}")
+
+
+if __name__ == "__main__":
+    main()
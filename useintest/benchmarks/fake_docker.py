@@ -0,0 +1,469 @@
+import hashlib
+import math
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from queue import Queue, Empty
+from threading import Lock, Event, Thread
+from time import sleep, monotonic, time
+from typing import Dict, List, Sequence, Tuple, Optional, Iterator, Any
+from uuid import uuid4
+
+from docker.errors import NotFound, ImageNotFound
+
+from useintest.common import set_docker_client_factory
+
+_DOCKER_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_HEALTH_STATUS_ACTION_PREFIX = "health_status: "
+# Docker's defaults for healthchecks
+_DEFAULT_HEALTHCHECK_INTERVAL = 30.0
+_DEFAULT_HEALTHCHECK_RETRIES = 3
+_NANOSECONDS_IN_SECOND = 1000000000
+_DEFAULT_MEMORY = 8 * 1024 ** 3
+_FIRST_EPHEMERAL_PORT = 32768
+
+LogScript = Sequence[Tuple[float, str]]
+
+
+class _FakeEventStream:
+    """
+    Stream of events from the fake Docker engine, which can be closed from another thread.
+    """
+    def __init__(self, engine: "FakeDockerEngine"):
+        self._engine = engine
+        self._queue = Queue()
+        self._closed = False
+
+    def __iter__(self) -> Iterator[Dict]:
+        while not self._closed:
+            try:
+                yield self._queue.get(timeout=0.1)
+            except Empty:
+                pass
+
+    def put(self, event: Dict):
+        self._queue.put(event)
+
+    def close(self):
+        self._closed = True
+        self._engine._unsubscribe(self)
+
+
+class _FakeLogStream:
+    """
+    Stream of a fake container's logs, which follows the container's log script and then blocks until the container
+    stops or the stream is closed.
+    """
+    def __init__(self, container: "FakeContainer"):
+        self._container = container
+        self._closed = Event()
+
+    def __iter__(self) -> Iterator[bytes]:
+        for at, line in self._container._log_script_times():
+            self._closed.wait(max(0.0, at - monotonic()))
+            if self._closed.is_set():
+                raise ValueError("Log stream has been closed")
+            if self._container.status != "running":
+                return
+            yield f"{line}\n".encode("utf-8")
+        while not self._closed.wait(0.05):
+            if self._container.status != "running":
+                return
+        raise ValueError("Log stream has been closed")
+
+    def close(self):
+        self._closed.set()
+
+
+class FakeImage:
+    """
+    Image in the fake Docker engine.
+    """
+    def __init__(self, name: str):
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        self.id = f"sha256:{digest}"
+        self.tags = [name]
+        self.labels: Dict[str, str] = {}
+        self.attrs = {"Id": self.id, "RepoDigests": [f"{name.split(':')[0]}@sha256:{digest}"]}
+
+
+class FakeRegistryData:
+    """
+    Registry data of an image, as returned by the fake Docker engine.
+    """
+    def __init__(self, image: FakeImage):
+        self.id = f"sha256:{image.attrs['RepoDigests'][0].split(':')[-1]}"
+
+
+class FakeContainer:
+    """
+    Container in the fake Docker engine.
+    """
+    @property
+    def attrs(self) -> Dict:
+        state = {"Status": self.status, "Running": self.status == "running", "OOMKilled": False}
+        if self._healthcheck is not None:
+            health = "starting"
+            if self._started_at is not None:
+                changed_health, at = self._get_health_change()
+                if monotonic() >= at:
+                    health = changed_health
+            state["Health"] = {"Status": health}
+        return {"Id": self.id, "Name": f"/{self.name}", "State": state, "Config": {"Labels": self.labels},
+                "NetworkSettings": {"Ports": self.ports}}
+
+    @property
+    def ports(self) -> Dict[str, List[Dict[str, str]]]:
+        if self.status != "running":
+            return {}
+        return {f"{port}/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(host_port)}]
+                for port, host_port in self._host_ports.items()}
+
+    def __init__(self, engine: "FakeDockerEngine", image: FakeImage, name: str, labels: Dict[str, str]=None,
+                 healthcheck: Dict=None, network: str=None, ports: Dict=None):
+        self.id = uuid4().hex + uuid4().hex
+        self.name = name if name is not None else uuid4().hex
+        self.image = image
+        self.labels = labels if labels is not None else {}
+        self.network = network
+        self.status = "created"
+        self._engine = engine
+        self._healthcheck = healthcheck
+        self._published_ports = ports if ports is not None else {}
+        self._host_ports: Dict[int, int] = {}
+        self._started_at: Optional[float] = None
+        self._started_at_time: Optional[float] = None
+
+    def start(self):
+        sleep(self._engine.start_delay)
+        self.status = "running"
+        # Ports published without a host port are assigned one by the engine
+        self._host_ports = {port: host_port if host_port is not None else self._engine._assign_host_port()
+                            for port, host_port in self._published_ports.items()}
+        self._started_at = monotonic()
+        self._started_at_time = time()
+        self._engine._emit(self, "start")
+        if self._healthcheck is not None:
+            health, at = self._get_health_change()
+            self._engine._emit_at(self, f"{_HEALTH_STATUS_ACTION_PREFIX}{health}", at)
+
+    def reload(self):
+        pass
+
+    def logs(self, stream: bool=False, timestamps: bool=False, since: int=None, **kwargs) -> Any:
+        if stream:
+            return _FakeLogStream(self)
+        lines = []
+        now = monotonic()
+        for at, line in self._log_script_times():
+            if at > now:
+                break
+            logged_at = self._started_at_time + (at - self._started_at)
+            if since is not None and logged_at < since:
+                continue
+            if timestamps:
+                timestamp = datetime.fromtimestamp(logged_at, timezone.utc).strftime(_DOCKER_TIMESTAMP_FORMAT)
+                line = f"{timestamp} {line}"
+            lines.append(f"{line}\n")
+        return "".join(lines).encode("utf-8")
+
+    def _log_script_times(self) -> List[Tuple[float, str]]:
+        """
+        Gets the (monotonic) times at which each line of the log script is logged.
+        :return: the log lines, with the times at which they are logged
+        """
+        if self._started_at is None:
+            return []
+        times = []
+        at = self._started_at
+        for delay, line in self._engine.log_script:
+            at += delay
+            times.append((at, line))
+        return times
+
+    def _log_script_end(self) -> float:
+        """
+        Gets the (monotonic) time at which the log script ends.
+        :return: the end time
+        """
+        return self._started_at + sum(delay for delay, _ in self._engine.log_script)
+
+    def _get_health_change(self) -> Tuple[str, float]:
+        """
+        Gets the health status that the (started) container changes to from `starting`, and when, as Docker would:
+        checks are made every interval and pass once the log script has ended, and the container is unhealthy once the
+        number of retries of consecutive checks after the start period have failed.
+        :return: tuple where the first element is the status (`healthy` or `unhealthy`) and the second is the
+        (monotonic) time at which the container has that status
+        """
+        interval = self._healthcheck.get("interval", 0) / _NANOSECONDS_IN_SECOND or _DEFAULT_HEALTHCHECK_INTERVAL
+        retries = self._healthcheck.get("retries", 0) or _DEFAULT_HEALTHCHECK_RETRIES
+        start_period = self._healthcheck.get("start_period", 0) / _NANOSECONDS_IN_SECOND
+        checks_until_healthy = max(1, math.ceil((self._log_script_end() - self._started_at) / interval))
+        checks_until_unhealthy = int(start_period // interval) + retries
+        if checks_until_unhealthy < checks_until_healthy:
+            return "unhealthy", self._started_at + checks_until_unhealthy * interval
+        return "healthy", self._started_at + checks_until_healthy * interval
+
+
+class _FakeContainerCollection:
+    """
+    Fake of docker-py's container collection.
+    """
+    def __init__(self, engine: "FakeDockerEngine"):
+        self._engine = engine
+
+    def create(self, image: str, name: str=None, labels: Dict[str, str]=None, healthcheck: Dict=None,
+               network: str=None, ports: Dict=None, **kwargs) -> FakeContainer:
+        sleep(self._engine.create_delay)
+        if network is not None:
+            self._engine.networks.get(network)
+        container = FakeContainer(self._engine, self._engine.images.get(image), name, labels, healthcheck, network,
+                                  ports)
+        with self._engine._lock:
+            self._engine._containers[container.id] = container
+        self._engine._emit(container, "create")
+        return container
+
+    def get(self, container_id: str) -> FakeContainer:
+        return self._engine._get_container(container_id)
+
+    def list(self, all: bool=False, filters: Dict=None, **kwargs) -> List[FakeContainer]:
+        with self._engine._lock:
+            containers = list(self._engine._containers.values())
+        return [container for container in containers if all or container.status == "running"]
+
+
+class _FakeImageCollection:
+    """
+    Fake of docker-py's image collection.
+    """
+    def __init__(self, engine: "FakeDockerEngine"):
+        self._engine = engine
+
+    def get(self, name: str) -> FakeImage:
+        with self._engine._lock:
+            for image in self._engine._images.values():
+                if name == image.id or name in image.tags:
+                    return image
+        raise ImageNotFound(f"No such image: {name}")
+
+    def pull(self, repository: str, tag: str="latest", **kwargs) -> FakeImage:
+        sleep(self._engine.pull_delay)
+        name = f"{repository}:{tag}"
+        with self._engine._lock:
+            image = self._engine._images.setdefault(name, FakeImage(name))
+        return image
+
+    def get_registry_data(self, name: str) -> FakeRegistryData:
+        return FakeRegistryData(FakeImage(name))
+
+    def list(self, filters: Dict=None, **kwargs) -> List[FakeImage]:
+        return []
+
+    def remove(self, image: str, force: bool=False, **kwargs):
+        with self._engine._lock:
+            for name, candidate in list(self._engine._images.items()):
+                if image == candidate.id or image == name:
+                    del self._engine._images[name]
+
+
+class FakeNetwork:
+    """
+    Network in the fake Docker engine.
+    """
+    def __init__(self, engine: "FakeDockerEngine", name: str, labels: Dict[str, str]=None):
+        self.id = uuid4().hex
+        self.name = name
+        self.attrs = {"Id": self.id, "Name": name, "Labels": labels if labels is not None else {}}
+        self._engine = engine
+
+    def remove(self):
+        with self._engine._lock:
+            self._engine._networks.pop(self.name, None)
+
+
+class _FakeNetworkCollection:
+    """
+    Fake of docker-py's network collection.
+    """
+    def __init__(self, engine: "FakeDockerEngine"):
+        self._engine = engine
+
+    def create(self, name: str, labels: Dict[str, str]=None, **kwargs) -> FakeNetwork:
+        with self._engine._lock:
+            return self._engine._networks.setdefault(name, FakeNetwork(self._engine, name, labels))
+
+    def get(self, network: str) -> FakeNetwork:
+        with self._engine._lock:
+            for candidate in self._engine._networks.values():
+                if network in (candidate.id, candidate.name):
+                    return candidate
+        raise NotFound(f"No such network: {network}")
+
+    def list(self, filters: Dict=None, **kwargs) -> List[FakeNetwork]:
+        with self._engine._lock:
+            return list(self._engine._networks.values())
+
+
+class _FakeApi:
+    """
+    Fake of docker-py's low level API client.
+    """
+    def __init__(self, engine: "FakeDockerEngine"):
+        self._engine = engine
+
+    def stop(self, container: str, timeout: int=None):
+        container = self._engine._get_container(container)
+        sleep(self._engine.stop_delay)
+        if container.status == "running":
+            container.status = "exited"
+            self._engine._emit(container, "die")
+
+    def remove_container(self, container: str, force: bool=False, **kwargs):
+        container = self._engine._get_container(container)
+        sleep(self._engine.remove_delay)
+        if container.status == "running":
+            container.status = "exited"
+            self._engine._emit(container, "die")
+        with self._engine._lock:
+            self._engine._containers.pop(container.id, None)
+        self._engine._emit(container, "destroy")
+
+    def logs(self, container: str, **kwargs) -> Any:
+        return self._engine._get_container(container).logs(**kwargs)
+
+    def inspect_container(self, container: str) -> Dict:
+        return self._engine._get_container(container).attrs
+
+    def pull(self, repository: str, tag: str="latest", stream: bool=False, **kwargs) -> Any:
+        self._engine.images.pull(repository, tag=tag)
+        status = [{"status": f"Downloaded newer image for {repository}:{tag}"}]
+        return iter(status) if stream else status
+
+
+class FakeDockerEngine:
+    """
+    Stand-in for a Docker engine (in the form of a docker-py client) that simulates the latency of pulling images and
+    creating, starting, stopping and removing containers, and whose containers log a scripted output once started.
+
+    Only the parts of docker-py used to start and stop services are faked.
+    """
+    def __init__(self, pull_delay: float=0.0, create_delay: float=0.0, start_delay: float=0.0,
+                 stop_delay: float=0.0, remove_delay: float=0.0, log_script: LogScript=(),
+                 memory: int=_DEFAULT_MEMORY):
+        """
+        Constructor.
+        :param pull_delay: number of seconds taken to pull an image
+        :param create_delay: number of seconds taken to create a container
+        :param start_delay: number of seconds taken to start a container
+        :param stop_delay: number of seconds taken to stop a container
+        :param remove_delay: number of seconds taken to remove a container
+        :param log_script: lines logged by containers once started, each with the number of seconds after the previous
+        line (or the start) that it is logged. Healthchecks of containers pass once the script has ended
+        :param memory: the total memory of the engine's machine, in bytes
+        """
+        self.pull_delay = pull_delay
+        self.create_delay = create_delay
+        self.start_delay = start_delay
+        self.stop_delay = stop_delay
+        self.remove_delay = remove_delay
+        self.log_script = list(log_script)
+        self.memory = memory
+        self.containers = _FakeContainerCollection(self)
+        self.images = _FakeImageCollection(self)
+        self.networks = _FakeNetworkCollection(self)
+        self.api = _FakeApi(self)
+        self._containers: Dict[str, FakeContainer] = {}
+        self._images: Dict[str, FakeImage] = {}
+        self._networks: Dict[str, FakeNetwork] = {}
+        self._next_host_port = _FIRST_EPHEMERAL_PORT
+        self._subscribers: List[_FakeEventStream] = []
+        self._lock = Lock()
+
+    def events(self, decode: bool=False, filters: Dict=None, **kwargs) -> _FakeEventStream:
+        stream = _FakeEventStream(self)
+        with self._lock:
+            self._subscribers.append(stream)
+        return stream
+
+    def close(self):
+        # The engine stands in for all of its clients so closing one leaves it running
+        pass
+
+    def info(self) -> Dict:
+        with self._lock:
+            running = sum(1 for container in self._containers.values() if container.status == "running")
+        return {"ContainersRunning": running, "MemTotal": self.memory}
+
+    def _assign_host_port(self) -> int:
+        """
+        Assigns an unused host port to a published container port.
+        :return: the host port
+        """
+        with self._lock:
+            port = self._next_host_port
+            self._next_host_port += 1
+            return port
+
+    def _get_container(self, container: str) -> FakeContainer:
+        """
+        Gets the container with the given identifier or name.
+        :param container: the identifier or name of the container
+        :raises NotFound: if the container does not exist
+        :return: the container
+        """
+        with self._lock:
+            if container in self._containers:
+                return self._containers[container]
+            for candidate in self._containers.values():
+                if candidate.name == container:
+                    return candidate
+        raise NotFound(f"No such container: {container}")
+
+    def _emit(self, container: FakeContainer, action: str):
+        """
+        Emits an event about the given container to all subscribers.
+        :param container: the container the event is about
+        :param action: the event's action
+        """
+        event = {"Type": "container", "Action": action, "id": container.id, "Actor": {"ID": container.id}}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+    def _emit_at(self, container: FakeContainer, action: str, at: float):
+        """
+        Emits an event about the given container at the given (monotonic) time, if the container is still running.
+        :param container: the container the event is about
+        :param action: the event's action
+        :param at: the time at which to emit the event
+        """
+        def emit():
+            sleep(max(0.0, at - monotonic()))
+            if container.status == "running":
+                self._emit(container, action)
+
+        Thread(target=emit, daemon=True).start()
+
+    def _unsubscribe(self, stream: _FakeEventStream):
+        """
+        Stops sending events to the given stream.
+        :param stream: the event stream
+        """
+        with self._lock:
+            if stream in self._subscribers:
+                self._subscribers.remove(stream)
+
+
+@contextmanager
+def use_fake_docker_engine(engine: FakeDockerEngine) -> Iterator[FakeDockerEngine]:
+    """
+    Context manager in which the given fake Docker engine is used instead of the real one.
+    :param engine: the fake Docker engine
+    """
+    set_docker_client_factory(lambda **kwargs: engine)
+    try:
+        yield engine
+    finally:
+        set_docker_client_factory(None)
@@ -0,0 +1,237 @@
+import json
+import math
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, time, sleep
+from typing import Dict, List, Callable, Iterable, Optional
+
+from temphelpers import TempManager
+
+from useintest.executables.controllers import DefinedExecutablesController
+from useintest.services.controllers import DockerisedServiceController
+
+START_LATENCY = "start"
+STOP_LATENCY = "stop"
+STOPPED_LATENCY = "stopped"
+WRITE_EXECUTABLES_LATENCY = "write-executables"
+INVOKE_EXECUTABLE_LATENCY = "invoke-executable"
+
+_FAKE_DOCKER_CLI = """#!/usr/bin/env bash
+sleep {delay}
+"""
+_STOP_TIMINGS_WAIT = 10.0
+
+
+def percentile(values: Iterable[float], percent: float) -> float:
+    """
+    Gets the given percentile of the given values (using the nearest rank method).
+    :param values: the values
+    :param percent: the percentile (0-100)
+    :return: the percentile (`math.nan` if there are no values)
+    """
+    values = sorted(values)
+    if len(values) == 0:
+        return math.nan
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+class BenchmarkResult:
+    """
+    Result of a benchmark: samples of the latency of each phase and the throughput.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.samples: Dict[str, List[float]] = {}
+        self.operations = 0
+        self.duration = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Gets the number of operations completed per second.
+        :return: the throughput
+        """
+        return self.operations / self.duration if self.duration > 0 else math.nan
+
+    def add_sample(self, phase: str, seconds: float):
+        """
+        Adds a latency sample of the given phase.
+        :param phase: the phase
+        :param seconds: the latency
+        """
+        self.samples.setdefault(phase, []).append(seconds)
+
+    def summarise(self) -> Dict:
+        """
+        Summarises the result.
+        :return: summary with the p50 and p95 latency of each phase, and the throughput
+        """
+        phases = {phase: dict(p50=percentile(samples, 50), p95=percentile(samples, 95), count=len(samples))
+                  for phase, samples in sorted(self.samples.items())}
+        return dict(phases=phases, operations=self.operations, duration=self.duration, throughput=self.throughput)
+
+
+def benchmark_service_controller(name: str, controller_factory: Callable[[], DockerisedServiceController],
+                                 iterations: int, concurrency: int=1) -> BenchmarkResult:
+    """
+    Benchmarks starting and stopping services with controllers created by the given factory.
+    :param name: the name of the benchmark
+    :param controller_factory: creates the controller to benchmark
+    :param iterations: the number of services to start and stop
+    :param concurrency: the number of services to start and stop at the same time
+    :return: the benchmark's result
+    """
+    result = BenchmarkResult(name)
+    controller = controller_factory()
+
+    def start_and_stop():
+        started_at = monotonic()
+        service = controller.start_service()
+        result.add_sample(START_LATENCY, monotonic() - started_at)
+        started_at = monotonic()
+        controller.stop_service(service)
+        result.add_sample(STOP_LATENCY, monotonic() - started_at)
+        return service
+
+    started_at = monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        services = list(executor.map(lambda _: start_and_stop(), range(iterations)))
+    controller.reaper.flush()
+    result.duration = monotonic() - started_at
+    result.operations = iterations
+
+    for service in services:
+        for phase, seconds in service.start_timings.phases.items():
+            result.add_sample(f"{START_LATENCY}:{phase}", seconds)
+        stop_timings = service.stop_timings
+        # Stop timings are completed by a callback, which can be called after the reaper has been flushed
+        waited = 0.0
+        while stop_timings.succeeded is None and waited < _STOP_TIMINGS_WAIT:
+            sleep(0.01)
+            waited += 0.01
+        for phase, seconds in stop_timings.phases.items():
+            result.add_sample(f"{STOP_LATENCY}:{phase}", seconds)
+        result.add_sample(STOPPED_LATENCY, stop_timings.total)
+    return result
+
+
+def benchmark_executables(name: str, controller_factory: Callable[[], DefinedExecutablesController],
+                          iterations: int, arguments: List[str]=None, run_delay: float=0.0) -> BenchmarkResult:
+    """
+    Benchmarks writing proxy executables and invoking them, with the `docker` CLI replaced by a stand-in that only
+    simulates the time taken to run.
+    :param name: the name of the benchmark
+    :param controller_factory: creates the executables controller to benchmark
+    :param iterations: the number of times to write the executables and invoke each of them
+    :param arguments: arguments to invoke the executables with
+    :param run_delay: number of seconds the `docker` CLI stand-in takes to run
+    :return: the benchmark's result
+    """
+    result = BenchmarkResult(name)
+    arguments = arguments if arguments is not None else []
+    temp_manager = TempManager()
+    try:
+        cli_directory = temp_manager.create_temp_directory()
+        cli_location = os.path.join(cli_directory, "docker")
+        with open(cli_location, "w") as file:
+            file.write(_FAKE_DOCKER_CLI.format(delay=run_delay))
+        os.chmod(cli_location, 0o700)
+        environment = dict(os.environ, PATH=f"{cli_directory}{os.pathsep}{os.environ.get('PATH', '')}")
+
+        started_at = monotonic()
+        for _ in range(iterations):
+            controller = controller_factory()
+            try:
+                write_started_at = monotonic()
+                location = controller.write_executables()
+                result.add_sample(WRITE_EXECUTABLES_LATENCY, monotonic() - write_started_at)
+                for executable in controller.named_executables.keys():
+                    invoke_started_at = monotonic()
+                    subprocess.run([os.path.join(location, executable)] + arguments, env=environment, check=True,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    result.add_sample(INVOKE_EXECUTABLE_LATENCY, monotonic() - invoke_started_at)
+                    result.operations += 1
+            finally:
+                controller.tear_down()
+        result.duration = monotonic() - started_at
+    finally:
+        temp_manager.tear_down()
+    return result
+
+
+def get_commit() -> str:
+    """
+    Gets the commit of the package's source that is being benchmarked.
+    :return: the commit or "unknown" if it cannot be determined
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def store_results(results: Iterable[BenchmarkResult], directory: str, settings: Dict=None) -> str:
+    """
+    Stores the summaries of the given results, along with the commit benchmarked, for later comparison.
+    :param results: the results to store
+    :param directory: the directory to store the results in
+    :param settings: the settings the benchmarks were run with
+    :return: the location of the stored results
+    """
+    os.makedirs(directory, exist_ok=True)
+    commit = get_commit()
+    timestamp = time()
+    stored = dict(commit=commit, timestamp=timestamp, settings=settings if settings is not None else {},
+                  results={result.name: result.summarise() for result in results})
+    location = os.path.join(directory, f"{int(timestamp)}-{commit}.json")
+    with open(location, "w") as file:
+        json.dump(stored, file, indent=2, sort_keys=True)
+    return location
+
+
+def load_results(location: str) -> Dict:
+    """
+    Loads stored results.
+    :param location: the location of the stored results
+    :return: the stored results
+    """
+    with open(location, "r") as file:
+        return json.load(file)
+
+
+def format_results(results: Iterable[BenchmarkResult], baseline: Optional[Dict]=None) -> str:
+    """
+    Formats the given results as a table, comparing them to the given baseline results if given.
+    :param results: the results to format
+    :param baseline: (optional) stored results to compare against
+    :return: the formatted results
+    """
+    lines = []
+    for result in results:
+        summary = result.summarise()
+        baseline_summary = baseline["results"].get(result.name) if baseline is not None else None
+        lines.append(f"{result.name}: {summary['throughput']:.2f} ops/s"
+                     + _format_change(summary["throughput"], baseline_summary, "throughput"))
+        for phase, statistics in summary["phases"].items():
+            baseline_phase = baseline_summary["phases"].get(phase) if baseline_summary is not None else None
+            lines.append(f"  {phase:<32} p50={statistics['p50'] * 1000:9.2f}ms"
+                         + _format_change(statistics["p50"], baseline_phase, "p50")
+                         + f"  p95={statistics['p95'] * 1000:9.2f}ms"
+                         + _format_change(statistics["p95"], baseline_phase, "p95"))
+    return "\n".join(lines)
+
+
+def _format_change(value: float, baseline: Optional[Dict], key: str) -> str:
+    """
+    Formats the change of the given value from the baseline.
+    :param value: the value
+    :param baseline: the baseline summary containing the value to compare against (`None` if there is no baseline)
+    :param key: the key of the value in the baseline summary
+    :return: the formatted (percentage) change, or an empty string if there is nothing to compare against
+    """
+    if baseline is None or not baseline.get(key):
+        return ""
+    return f" ({(value - baseline[key]) / baseline[key] * 100:+.1f}%)"
@@ -0,0 +1,71 @@
+import argparse
+import importlib
+import signal
+from threading import Event
+from typing import Dict, Tuple
+
+from useintest.broker.server import ServiceBroker, DEFAULT_POOL_SIZE, DEFAULT_RESET_CONCURRENCY
+from useintest.services.controllers import ServiceController
+
+
+def _parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Runs a broker that keeps warm pools of services and leases them to test processes over a Unix "
+                    "socket")
+    parser.add_argument("controllers", nargs="+", metavar="controller",
+                        help="controller of services to lease, as `module:ControllerType` (leased by the name of the "
+                             "type) or `name=module:ControllerType`, e.g. "
+                             "`useintest.modules.mongo:MongoServiceController`")
+    parser.add_argument("--socket", help="location of the Unix socket to listen on (defaults to "
+                                         "`USEINTEST_BROKER_SOCKET` or a location in a directory only accessible to the "
+                                         "current user)")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                        help="number of ready services to keep for each controller")
+    parser.add_argument("--reset-concurrency", type=int, default=DEFAULT_RESET_CONCURRENCY,
+                        help="number of returned services to reset in parallel")
+    return parser.parse_args()
+
+
+def _parse_controller(specification: str) -> Tuple[str, ServiceController]:
+    """
+    Parses the specification of a controller, creating the controller.
+    :param specification: the specification, as `[name=]module:ControllerType`
+    :return: tuple where the first element is the name by which services are leased and the second is the controller
+    """
+    name, _, location = specification.rpartition("=")
+    module_name, _, type_name = location.partition(":")
+    if len(type_name) == 0:
+        raise ValueError(f"Controller must be given as `module:ControllerType`: {specification}")
+    controller_type = getattr(importlib.import_module(module_name), type_name)
+    return name if len(name) > 0 else type_name, controller_type()
+
+
+def main():
+    """
+    Runs the broker until it is interrupted or terminated.
+    """
+    arguments = _parse_arguments()
+    controllers: Dict[str, ServiceController] = dict(_parse_controller(spec) for spec in arguments.controllers)
+    broker = ServiceBroker(controllers, socket_location=arguments.socket, pool_size=arguments.pool_size,
+                           reset_concurrency=arguments.reset_concurrency)
+
+    def interrupt(signal_number: int, frame):
+        raise KeyboardInterrupt()
+
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        broker.start()
+        print(f"Broker listening on: {broker.socket_location}", flush=True)
+        Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.tear_down()
+
+
+if __name__ == "__main__":
+    main()
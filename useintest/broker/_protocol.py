@@ -0,0 +1,109 @@
+import base64
+import json
+import os
+import pickle
+import socket
+import struct
+import tempfile
+from typing import Dict, Optional, BinaryIO
+
+from useintest.broker.exceptions import BrokerError
+from useintest.common import create_private_directory
+from useintest.services.models import Service
+
+BROKER_SOCKET_ENVIRONMENT_VARIABLE = "USEINTEST_BROKER_SOCKET"
+# Services are exchanged as pickles, so the socket is kept in a directory that only the current user can access (the
+# user's runtime directory, if there is one), rather than at a location in the temp directory that others could take
+DEFAULT_SOCKET_DIRECTORY = os.path.join(os.environ["XDG_RUNTIME_DIR"], "useintest") \
+    if os.environ.get("XDG_RUNTIME_DIR") else os.path.join(tempfile.gettempdir(), f"useintest-{os.getuid()}")
+DEFAULT_SOCKET_LOCATION = os.path.join(DEFAULT_SOCKET_DIRECTORY, "broker.sock")
+
+LEASE_ACTION = "lease"
+RELEASE_ACTION = "release"
+STATUS_ACTION = "status"
+
+
+def get_socket_location() -> str:
+    """
+    Gets the location of the broker's socket, as configured by the environment.
+    :return: the location of the socket
+    """
+    return os.environ.get(BROKER_SOCKET_ENVIRONMENT_VARIABLE, DEFAULT_SOCKET_LOCATION)
+
+
+def create_socket_directory(directory: str):
+    """
+    Creates the given directory of the broker's socket, which only the current user can access, if it does not exist.
+    :param directory: the directory
+    :raises BrokerError: if the directory exists but is not owned by the current user or can be accessed by others
+    """
+    try:
+        create_private_directory(directory)
+    except PermissionError as e:
+        raise BrokerError(f"Cannot keep the broker's socket in directory: {e}") from e
+
+
+def check_socket_owner(socket_location: str):
+    """
+    Checks that the given Unix socket was created (i.e. is listened on) by the current user.
+    :param socket_location: location of the socket
+    :raises BrokerError: if the socket was created by another user
+    :raises OSError: if the socket does not exist
+    """
+    if os.stat(socket_location).st_uid != os.getuid():
+        raise BrokerError(f"Socket is not owned by the current user: {socket_location}")
+
+
+def check_peer(connection: socket.socket):
+    """
+    Checks that the process at the other end of the given connection to a Unix socket is run by the current user (on
+    platforms that can get the credentials of the peer).
+    :param connection: the connection
+    :raises BrokerError: if the peer is run by another user
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    if uid != os.getuid():
+        raise BrokerError(f"Peer on the broker's socket is run by another user (uid {uid})")
+
+
+def write_message(file: BinaryIO, message: Dict):
+    """
+    Writes the given message to the given file, as a line of JSON.
+    :param file: the file (e.g. of a socket) to write to
+    :param message: the message
+    """
+    file.write(json.dumps(message).encode() + b"\n")
+    file.flush()
+
+
+def read_message(file: BinaryIO) -> Optional[Dict]:
+    """
+    Reads a message, written by `write_message`, from the given file.
+    :param file: the file (e.g. of a socket) to read from
+    :return: the message or `None` if the file has been closed
+    """
+    line = file.readline()
+    if len(line) == 0:
+        return None
+    return json.loads(line)
+
+
+def encode_service(service: Service) -> str:
+    """
+    Encodes the given service so that it can be sent in a message.
+    :param service: the service
+    :return: the encoded service
+    """
+    return base64.b64encode(pickle.dumps(service)).decode()
+
+
+def decode_service(encoded: str) -> Service:
+    """
+    Decodes a service encoded by `encode_service`, which must have been received from a peer checked by `check_peer`.
+    :param encoded: the encoded service
+    :return: the service
+    """
+    return pickle.loads(base64.b64decode(encoded))
@@ -0,0 +1,137 @@
+import socket
+from threading import Lock
+from typing import Dict, Optional
+
+from useintest.broker._protocol import get_socket_location, read_message, write_message, decode_service, \
+    check_socket_owner, check_peer, LEASE_ACTION, RELEASE_ACTION, STATUS_ACTION
+from useintest.broker.exceptions import BrokerError
+from useintest.services.models import Service
+
+
+class BrokerClient:
+    """
+    Client of a service broker (see `useintest.broker.server.ServiceBroker`), from which services are leased.
+
+    Leases are held for as long as the client's connection is open: services that have not been released when the
+    client is closed are stopped by the broker. Leased services can be used as context managers, which release them on
+    exit.
+    """
+    def __init__(self, socket_location: str=None):
+        """
+        Constructor.
+        :param socket_location: location of the broker's socket (defaults to that configured by the environment with
+        `USEINTEST_BROKER_SOCKET`)
+        """
+        self.socket_location = socket_location if socket_location is not None else get_socket_location()
+        self._socket: Optional[socket.socket] = None
+        self._file = None
+        self._leases: Dict[Service, str] = dict()
+        self._lock = Lock()
+
+    def lease(self, controller: str) -> Service:
+        """
+        Leases a service from the broker.
+        :param controller: name of the controller of the service, as configured in the broker
+        :raises BrokerError: if the broker could not lease a service
+        :return: the leased service
+        """
+        response = self._request(dict(action=LEASE_ACTION, controller=controller))
+        service = decode_service(response["service"])
+        if hasattr(service, "controller"):
+            # So that the service is released when used as a context manager
+            service.controller = self
+        with self._lock:
+            self._leases[service] = response["lease"]
+        return service
+
+    def release(self, service: Service, reset: bool=True):
+        """
+        Releases the given leased service back to the broker.
+        :param service: the leased service
+        :param reset: whether the broker can reset the service for reuse (otherwise it is stopped)
+        :raises ValueError: if the given service is not leased by this client
+        """
+        with self._lock:
+            lease_id = self._leases.pop(service, None)
+        if lease_id is None:
+            raise ValueError(f"Service not leased by this client: {service}")
+        self._request(dict(action=RELEASE_ACTION, lease=lease_id, reset=reset))
+
+    def stop_service(self, service: Service):
+        """
+        Releases the given leased service back to the broker, for reuse.
+        :param service: the leased service
+        """
+        self.release(service)
+
+    def get_status(self) -> Dict[str, Dict[str, int]]:
+        """
+        Gets the status of the broker's services.
+        :return: the number of services that are ready, leased and being reset, by the name of their controller
+        """
+        return self._request(dict(action=STATUS_ACTION))["controllers"]
+
+    def close(self):
+        """
+        Closes the connection to the broker, which stops any services that are still leased.
+        """
+        with self._lock:
+            self._disconnect()
+            self._leases.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _disconnect(self):
+        """
+        Closes the connection to the broker, if there is one. Must be called with the lock held.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _connect(self):
+        """
+        Connects to the broker, checking that it is run by the current user (as services it sends are unpickled). Must
+        be called with the lock held.
+        :raises BrokerError: if the broker is run by another user
+        :raises OSError: if the broker could not be connected to
+        """
+        check_socket_owner(self.socket_location)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(self.socket_location)
+            check_peer(self._socket)
+        except BaseException:
+            self._disconnect()
+            raise
+        self._file = self._socket.makefile("rwb")
+
+    def _request(self, request: Dict) -> Dict:
+        """
+        Makes the given request to the broker, connecting to it if required.
+        :param request: the request
+        :raises BrokerError: if the broker could not be reached or could not fulfil the request
+        :return: the response
+        """
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                write_message(self._file, request)
+                response = read_message(self._file)
+            except OSError as e:
+                self._disconnect()
+                raise BrokerError(f"Could not communicate with broker on socket {self.socket_location}: {e}") from e
+            if response is None:
+                self._disconnect()
+                raise BrokerError(f"Broker closed the connection on socket {self.socket_location}")
+        if "error" in response:
+            raise BrokerError(response["error"])
+        return response
@@ -0,0 +1,7 @@
+from useintest.common import UseInTestError
+
+
+class BrokerError(UseInTestError):
+    """
+    Exception for when the service broker cannot fulfil a request.
+    """
@@ -0,0 +1,311 @@
+import os
+import socket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from socketserver import ThreadingUnixStreamServer, StreamRequestHandler
+from threading import Lock, Thread
+from typing import Dict, Deque, Tuple, Optional, Set
+from uuid import uuid4
+
+from useintest._logging import create_logger
+from useintest.broker._protocol import get_socket_location, read_message, write_message, encode_service, \
+    create_socket_directory, check_peer, DEFAULT_SOCKET_DIRECTORY, LEASE_ACTION, RELEASE_ACTION, STATUS_ACTION
+from useintest.broker.exceptions import BrokerError
+from useintest.services.controllers import ServiceController
+from useintest.services.models import Service
+from useintest.services.pools import ServicePool
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_RESET_CONCURRENCY = 4
+
+logger = create_logger(__name__)
+
+
+class _BrokeredController:
+    """
+    Services of a controller that are held by the broker.
+    """
+    def __init__(self, controller: ServiceController, pool_size: int):
+        """
+        Constructor.
+        :param controller: the controller
+        :param pool_size: number of ready services to keep in the pool of newly started services, which is also the
+        maximum number of returned services that are kept for reuse
+        """
+        self.controller = controller
+        self.pool_size = pool_size
+        self.pool = ServicePool(controller.start_service, controller.stop_service, pool_size)
+        self.returned: Deque[Service] = deque()
+        self.resetting = 0
+
+
+class ServiceBroker:
+    """
+    Long-running broker that keeps warm pools of services for a number of controllers and leases the services to other
+    processes (e.g. test runs) over a Unix socket. Leased services are returned to the broker, which resets them so they
+    can be leased again or stops them.
+    """
+    @property
+    def socket_location(self) -> str:
+        """
+        Gets the location of the Unix socket on which the broker listens.
+        :return: the location of the socket
+        """
+        return self._socket_location
+
+    def __init__(self, controllers: Dict[str, ServiceController], socket_location: str=None,
+                 pool_size: int=DEFAULT_POOL_SIZE, reset_concurrency: int=DEFAULT_RESET_CONCURRENCY):
+        """
+        Constructor.
+        :param controllers: the controllers of the services that can be leased, by the name used to lease them
+        :param socket_location: location of the Unix socket on which to listen (defaults to that configured by the
+        environment with `USEINTEST_BROKER_SOCKET`)
+        :param pool_size: number of ready services to keep for each controller
+        :param reset_concurrency: maximum number of returned services that are reset (or stopped) in parallel
+        """
+        if pool_size < 1:
+            raise ValueError(f"Pool size must be positive: {pool_size}")
+        if reset_concurrency < 1:
+            raise ValueError(f"Reset concurrency must be positive: {reset_concurrency}")
+        self._socket_location = socket_location if socket_location is not None else get_socket_location()
+        self._controllers = {name: _BrokeredController(controller, pool_size)
+                             for name, controller in controllers.items()}
+        self._leases: Dict[str, Tuple[str, Service]] = dict()
+        self._closed = False
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=reset_concurrency)
+        self._server: Optional[_UnixServer] = None
+
+    def start(self):
+        """
+        Starts listening for leases on the broker's socket, in the background.
+        :raises BrokerError: if another broker is listening on the socket
+        """
+        self._server = self._create_server()
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def lease(self, name: str) -> Tuple[str, Service]:
+        """
+        Leases a service, which is a returned service that has been reset if there is one, otherwise one from the pool.
+        :param name: name of the controller of the service
+        :raises BrokerError: if there is no controller with the given name or the broker has been torn down
+        :raises ServiceStartError: if a service had to be started and it could not be
+        :return: tuple where the first element is the ID of the lease and the second is the leased service
+        """
+        brokered = self._controllers.get(name)
+        if brokered is None:
+            raise BrokerError(f"No controller named \"{name}\" (known: {', '.join(sorted(self._controllers))})")
+        with self._lock:
+            if self._closed:
+                raise BrokerError("Broker has been torn down")
+            service = brokered.returned.popleft() if len(brokered.returned) > 0 else None
+        if service is None:
+            try:
+                service = brokered.pool.acquire()
+            except RuntimeError as e:
+                # The pool is torn down by the broker being torn down whilst not holding the lock
+                with self._lock:
+                    if self._closed:
+                        raise BrokerError("Broker has been torn down") from e
+                raise
+        lease_id = uuid4().hex
+        with self._lock:
+            if not self._closed:
+                self._leases[lease_id] = (name, service)
+                return lease_id, service
+        self._stop(brokered, service)
+        raise BrokerError("Broker has been torn down")
+
+    def release(self, lease_id: str, reset: bool=True) -> Future:
+        """
+        Releases the given lease, returning the service to the broker. The service is reset in the background, so that
+        it can be leased again, unless the broker already has enough services in reserve (or is not to be reset), in
+        which case the service is stopped.
+        :param lease_id: ID of the lease
+        :param reset: whether the service can be reset for reuse, rather than stopped
+        :raises BrokerError: if there is no such lease
+        :return: future that completes once the service has been reset or stopped
+        """
+        with self._lock:
+            if lease_id not in self._leases:
+                raise BrokerError(f"No lease with ID: {lease_id}")
+            name, service = self._leases.pop(lease_id)
+            brokered = self._controllers[name]
+            reset = reset and not self._closed and hasattr(brokered.controller, "reset_service") \
+                and len(brokered.returned) + brokered.resetting < brokered.pool_size
+            if reset:
+                brokered.resetting += 1
+        try:
+            if reset:
+                return self._executor.submit(self._reset, brokered, service)
+            return self._executor.submit(self._stop, brokered, service)
+        except RuntimeError:
+            # Broker is being torn down
+            if reset:
+                with self._lock:
+                    brokered.resetting -= 1
+            self._stop(brokered, service)
+            stopped = Future()
+            stopped.set_result(None)
+            return stopped
+
+    def get_status(self) -> Dict[str, Dict[str, int]]:
+        """
+        Gets the status of the broker's services.
+        :return: the number of services that are ready (in the pool or returned), leased and being reset, by the name of
+        their controller
+        """
+        with self._lock:
+            leased = [name for name, _ in self._leases.values()]
+            return {name: dict(ready=brokered.pool.number_ready + len(brokered.returned), leased=leased.count(name),
+                               resetting=brokered.resetting)
+                    for name, brokered in self._controllers.items()}
+
+    def tear_down(self):
+        """
+        Tears down the broker: stops listening and stops all of its services, including those that are leased.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            if os.path.exists(self._socket_location):
+                os.remove(self._socket_location)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            leased = list(self._leases.values())
+            self._leases.clear()
+        for name, service in leased:
+            self._stop(self._controllers[name], service)
+        for brokered in self._controllers.values():
+            brokered.pool.tear_down()
+            while len(brokered.returned) > 0:
+                self._stop(brokered, brokered.returned.popleft())
+
+    def _reset(self, brokered: _BrokeredController, service: Service):
+        """
+        Resets the given returned service and keeps it for reuse, stopping it if it cannot be reset.
+        :param brokered: the controller of the service
+        :param service: the service
+        """
+        try:
+            brokered.controller.reset_service(service)
+        except Exception as e:
+            logger.warning(f"Could not reset returned service, stopping it instead: {e!r}")
+            with self._lock:
+                brokered.resetting -= 1
+            self._stop(brokered, service)
+            return
+        with self._lock:
+            brokered.resetting -= 1
+            if not self._closed:
+                brokered.returned.append(service)
+                service = None
+        if service is not None:
+            # Broker was torn down whilst the service was being reset
+            self._stop(brokered, service)
+
+    @staticmethod
+    def _stop(brokered: _BrokeredController, service: Service):
+        """
+        Stops the given service, logging (rather than raising) any error.
+        :param brokered: the controller of the service
+        :param service: the service
+        """
+        try:
+            brokered.controller.stop_service(service)
+        except Exception as e:
+            logger.warning(f"Could not stop service: {e!r}")
+
+    def _create_server(self) -> "_UnixServer":
+        """
+        Creates the server that listens on the broker's socket, which only the current user can connect to.
+        :raises BrokerError: if another broker is listening on the socket or the default directory of the socket can be
+        accessed by other users
+        :return: the server
+        """
+        if os.path.dirname(os.path.abspath(self._socket_location)) == DEFAULT_SOCKET_DIRECTORY:
+            create_socket_directory(DEFAULT_SOCKET_DIRECTORY)
+        if os.path.exists(self._socket_location):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as test_socket:
+                try:
+                    test_socket.connect(self._socket_location)
+                    raise BrokerError(f"Broker already listening on socket: {self._socket_location}")
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a broker that did not shut down cleanly
+                    os.remove(self._socket_location)
+        server = _UnixServer(self._socket_location, _RequestHandler)
+        os.chmod(self._socket_location, 0o600)
+        server.broker = self
+        return server
+
+    def _handle(self, request: Dict, leases: Set[str]) -> Dict:
+        """
+        Handles a request made to the broker.
+        :param request: the request
+        :param leases: IDs of the leases held by the connection the request was made on (updated by the request)
+        :return: the response
+        """
+        action = request.get("action")
+        if action == LEASE_ACTION:
+            lease_id, service = self.lease(request["controller"])
+            leases.add(lease_id)
+            return dict(lease=lease_id, service=encode_service(service))
+        elif action == RELEASE_ACTION:
+            lease_id = request["lease"]
+            if lease_id not in leases:
+                raise BrokerError(f"Lease was not made on this connection: {lease_id}")
+            self.release(lease_id, reset=request.get("reset", True))
+            leases.remove(lease_id)
+            return dict()
+        elif action == STATUS_ACTION:
+            return dict(controllers=self.get_status())
+        raise BrokerError(f"Unknown action: {action}")
+
+
+class _UnixServer(ThreadingUnixStreamServer):
+    """
+    Server that handles each connection to the broker's socket in its own thread.
+    """
+    daemon_threads = True
+    broker: ServiceBroker
+
+
+class _RequestHandler(StreamRequestHandler):
+    """
+    Handles the requests made on a connection to the broker. Services still leased when the connection is closed (e.g.
+    because the process that leased them died) are stopped, as the state they were left in is unknown.
+    """
+    def handle(self):
+        broker = self.server.broker
+        try:
+            check_peer(self.connection)
+        except BrokerError as e:
+            logger.warning(f"Refused connection: {e}")
+            return
+        leases: Set[str] = set()
+        try:
+            while True:
+                try:
+                    request = read_message(self.rfile)
+                except (OSError, ValueError):
+                    break
+                if request is None:
+                    break
+                try:
+                    response = broker._handle(request, leases)
+                except Exception as e:
+                    response = dict(error=str(e) if isinstance(e, BrokerError) else repr(e))
+                try:
+                    write_message(self.wfile, response)
+                except OSError:
+                    break
+        finally:
+            for lease_id in leases:
+                try:
+                    broker.release(lease_id, reset=False)
+                except (BrokerError, RuntimeError):
+                    pass
@@ -1,11 +1,187 @@
 # FIXME: This is not cross platform...
+import os
+import stat
+import warnings
 from abc import ABCMeta
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Optional, Any, Iterator, List, ContextManager, TYPE_CHECKING
 
-import docker
+if TYPE_CHECKING:
+    from docker import DockerClient
 
 MOUNTABLE_TEMP_DIRECTORY = "/tmp"
 
-docker_client = docker.from_env()
+DOCKER_CLIENT_POOL_SIZE_ENVIRONMENT_VARIABLE = "USEINTEST_DOCKER_CLIENT_POOL_SIZE"
+DEFAULT_DOCKER_CLIENT_POOL_SIZE = 32
+DEFAULT_MAX_IDLE_STREAMING_CLIENTS = 8
+
+DockerClientFactory = Callable[..., "DockerClient"]
+
+
+def _create_docker_client_from_environment(**kwargs) -> "DockerClient":
+    """
+    Creates a Docker client, configured by the environment (e.g. `DOCKER_HOST`).
+    :param kwargs: keyword arguments to create the client with (e.g. `max_pool_size`)
+    :return: the Docker client
+    """
+    import docker
+    return docker.from_env(**kwargs)
+
+
+class DockerClientPool:
+    """
+    Docker clients used by a process: a client for short calls, shared by all threads, and clients for streaming calls
+    (e.g. following logs or events), each of which is checked out for the duration of a stream. Streams hold their
+    connection for as long as they are open, so they are kept off the shared client's connection pool, where they would
+    hold up short calls from other threads.
+    """
+    def __init__(self, factory: DockerClientFactory=_create_docker_client_from_environment,
+                 pool_size: int=DEFAULT_DOCKER_CLIENT_POOL_SIZE,
+                 max_idle_streaming_clients: int=DEFAULT_MAX_IDLE_STREAMING_CLIENTS):
+        """
+        Constructor.
+        :param factory: creates Docker clients, given the maximum size of their connection pool (`max_pool_size`)
+        :param pool_size: the maximum number of connections the shared client keeps open
+        :param max_idle_streaming_clients: the maximum number of streaming clients kept for reuse once returned (others
+        are closed)
+        """
+        self.factory = factory
+        self.pool_size = pool_size
+        self.max_idle_streaming_clients = max_idle_streaming_clients
+        self._client: Optional["DockerClient"] = None
+        self._idle_streaming_clients: List["DockerClient"] = []
+        self._closed = False
+        self._lock = Lock()
+
+    def get(self) -> "DockerClient":
+        """
+        Gets the client shared by all threads, creating it on first use.
+        :return: the client
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.factory(max_pool_size=self.pool_size)
+        return self._client
+
+    @contextmanager
+    def streaming_client(self) -> Iterator["DockerClient"]:
+        """
+        Checks out a client for a streaming call, which has a connection of its own, returning it to the pool on exit.
+        Idle clients are reused, so a client (and connection) is only created if all are in use.
+        :return: context manager giving the client
+        """
+        with self._lock:
+            client = self._idle_streaming_clients.pop() if len(self._idle_streaming_clients) > 0 else None
+        if client is None:
+            client = self.factory(max_pool_size=1)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if not self._closed and len(self._idle_streaming_clients) < self.max_idle_streaming_clients:
+                    self._idle_streaming_clients.append(client)
+                    client = None
+            if client is not None:
+                client.close()
+
+    def close(self):
+        """
+        Closes the pool's clients. Streaming clients that are checked out are closed when they are returned.
+        """
+        with self._lock:
+            self._closed = True
+            clients = self._idle_streaming_clients + ([self._client] if self._client is not None else [])
+            self._idle_streaming_clients = []
+            self._client = None
+        for client in clients:
+            client.close()
+
+
+_docker_client_pool = DockerClientPool(pool_size=int(os.environ.get(
+    DOCKER_CLIENT_POOL_SIZE_ENVIRONMENT_VARIABLE, DEFAULT_DOCKER_CLIENT_POOL_SIZE)))
+
+
+def get_docker_client() -> "DockerClient":
+    """
+    Gets the Docker client shared by all threads of this process (see `DockerClientPool`). Clients are re-created in
+    forked processes, as the connections of the parent's clients cannot be shared.
+    :return: the Docker client
+    """
+    return _docker_client_pool.get()
+
+
+def streaming_docker_client() -> ContextManager["DockerClient"]:
+    """
+    Checks out a Docker client from the pool used by this process for a streaming call, which can hold its connection
+    for a long time (e.g. following logs or events), returning it on exit (see `DockerClientPool`).
+    :return: context manager giving the Docker client
+    """
+    return _docker_client_pool.streaming_client()
+
+
+def set_docker_client_factory(factory: Optional[DockerClientFactory], pool_size: int=None):
+    """
+    Sets the factory used to create Docker clients, closing any clients already created.
+    :param factory: creates Docker clients, given the maximum size of their connection pool (`max_pool_size`), or
+    `None` to restore the default, which is configured by the environment
+    :param pool_size: the maximum number of connections the client shared by all threads keeps open (defaults to the
+    current size)
+    """
+    global _docker_client_pool
+    previous_pool = _docker_client_pool
+    _docker_client_pool = DockerClientPool(
+        factory if factory is not None else _create_docker_client_from_environment,
+        pool_size if pool_size is not None else previous_pool.pool_size)
+    previous_pool.close()
+
+
+def _reset_docker_client_pool_after_fork():
+    """
+    Discards the parent's Docker clients (and the pool's lock, which may have been held whilst forking) in a forked
+    process.
+    """
+    global _docker_client_pool
+    _docker_client_pool = DockerClientPool(_docker_client_pool.factory, _docker_client_pool.pool_size,
+                                           _docker_client_pool.max_idle_streaming_clients)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_docker_client_pool_after_fork)
+
+
+def create_private_directory(directory: str):
+    """
+    Creates the given directory, which only the current user can access, if it does not exist. Used for directories in
+    shared locations (e.g. the temp directory) from which files that are trusted (e.g. pickles) are read.
+    :param directory: the directory
+    :raises PermissionError: if the directory exists but is not owned by the current user or can be accessed by others
+    """
+    try:
+        os.makedirs(directory, mode=0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077 != 0:
+        raise PermissionError(f"Directory must be owned by, and only accessible to, the current user: {directory}")
+
+
+class _DeprecatedDockerClient:
+    """
+    Stands in for the Docker client that used to be created when this module was imported (`docker_client`), getting
+    its attributes from the client given by `get_docker_client`, so that the client is only created on first use.
+    """
+    def __getattr__(self, name: str) -> Any:
+        warnings.warn("`useintest.common.docker_client` is deprecated: use `get_docker_client()`", DeprecationWarning,
+                      stacklevel=2)
+        return getattr(get_docker_client(), name)
+
+    def __repr__(self) -> str:
+        return f"<deprecated proxy of {get_docker_client()!r}>"
+
+
+docker_client = _DeprecatedDockerClient()
 
 
 class UseInTestError(Exception):
@@ -27,5 +203,3 @@ class UseInTestModel(metaclass=ABCMeta):
     """
     Base which all models in this package should extend.
     """
-
-
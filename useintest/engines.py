@@ -0,0 +1,304 @@
+import functools
+import os
+import weakref
+from threading import Lock
+from time import monotonic
+from typing import ContextManager, Dict, Optional, Sequence, Tuple, MutableMapping, TYPE_CHECKING
+from urllib.parse import urlparse
+
+from useintest._logging import create_logger
+from useintest.common import UseInTestModel, UseInTestError, DockerClientFactory, DockerClientPool, \
+    get_docker_client, streaming_docker_client, DEFAULT_DOCKER_CLIENT_POOL_SIZE
+from useintest.services.events import ContainerEventMonitor, container_event_monitor
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+
+DOCKER_ENGINES_ENVIRONMENT_VARIABLE = "USEINTEST_DOCKER_ENGINES"
+DEFAULT_ENGINE_NAME = "default"
+DEFAULT_LOAD_TTL = 2.0
+
+_DOCKER_HOST_ENVIRONMENT_VARIABLE = "DOCKER_HOST"
+_REMOTE_URL_SCHEMES = {"tcp", "http", "https", "ssh"}
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+_BYTES_IN_GIGABYTE = 1024 ** 3
+
+logger = create_logger(__name__)
+
+
+def _create_docker_client(base_url: str, **kwargs) -> "DockerClient":
+    """
+    Creates a client of the Docker engine at the given URL.
+    :param base_url: the URL of the Docker engine (e.g. `tcp://build-1:2375`)
+    :param kwargs: keyword arguments to create the client with (e.g. `max_pool_size`)
+    :return: the Docker client
+    """
+    import docker
+    return docker.DockerClient(base_url=base_url, **kwargs)
+
+
+def _get_host(base_url: Optional[str]) -> str:
+    """
+    Gets the host on which the ports published by containers of the Docker engine at the given URL are accessible.
+    :param base_url: the URL of the Docker engine (`None` if the engine is local)
+    :return: the host
+    """
+    if base_url is None:
+        return "localhost"
+    url = urlparse(base_url)
+    if url.scheme not in _REMOTE_URL_SCHEMES or url.hostname is None:
+        return "localhost"
+    return url.hostname
+
+
+class EngineLoad(UseInTestModel):
+    """
+    Load on a Docker engine.
+    """
+    def __init__(self, running_containers: int, memory: int):
+        """
+        Constructor.
+        :param running_containers: the number of containers running on the engine
+        :param memory: the total memory of the engine's machine, in bytes
+        """
+        self.running_containers = running_containers
+        self.memory = memory
+
+
+class DockerEngine:
+    """
+    Docker engine on which services can be placed (see `EngineScheduler`).
+
+    Engines are identified by their name: copies of an engine (e.g. made when a service is shared with another process)
+    use the engine with the same name in the process they are copied into, if there is one.
+    """
+    def __init__(self, name: str, base_url: str=None, host: str=None, factory: DockerClientFactory=None,
+                 pool_size: int=DEFAULT_DOCKER_CLIENT_POOL_SIZE):
+        """
+        Constructor.
+        :param name: the engine's name, unique within the process
+        :param base_url: the URL of the engine (e.g. `tcp://build-1:2375`). The engine configured by the environment
+        (e.g. `DOCKER_HOST`), whose clients are shared with the rest of `useintest`, is used if neither this nor a
+        factory is given
+        :param host: the host on which the ports published by the engine's containers are accessible (defaults to the
+        host of the engine's URL, or `localhost` if the engine is local)
+        :param factory: creates clients of the engine, given the maximum size of their connection pool
+        (`max_pool_size`). Cannot be used in other processes, which connect to the engine using its URL
+        :param pool_size: the maximum number of connections the engine's client shared by all threads keeps open
+        """
+        if factory is None and base_url is not None:
+            factory = functools.partial(_create_docker_client, base_url)
+        self.name = name
+        self.base_url = base_url
+        self.host = host if host is not None else _get_host(
+            base_url if factory is not None else os.environ.get(_DOCKER_HOST_ENVIRONMENT_VARIABLE))
+        self._pool = DockerClientPool(factory, pool_size) if factory is not None else None
+        self._event_monitor: Optional[ContainerEventMonitor] = None
+        self._lock = Lock()
+        _engines[name] = self
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+    def __reduce__(self) -> Tuple:
+        # Clients, and the monitor of events, belong to this process
+        return _restore_docker_engine, (self.name, self.base_url, self.host)
+
+    @property
+    def is_default(self) -> bool:
+        """
+        Whether the engine is that configured by the environment, whose clients are shared with the rest of `useintest`.
+        :return: `True` if the default engine
+        """
+        return self._pool is None
+
+    @property
+    def is_local(self) -> bool:
+        """
+        Whether the ports published by the engine's containers are bound on this machine.
+        :return: `True` if the engine's host is this machine
+        """
+        return self.host in _LOCAL_HOSTS
+
+    @property
+    def event_monitor(self) -> ContainerEventMonitor:
+        """
+        Gets the monitor of the engine's container events, creating it on first use.
+        :return: the event monitor
+        """
+        if self.is_default:
+            return container_event_monitor
+        with self._lock:
+            if self._event_monitor is None:
+                self._event_monitor = ContainerEventMonitor(self)
+            return self._event_monitor
+
+    def get_client(self) -> "DockerClient":
+        """
+        Gets the client of the engine shared by all threads (see `DockerClientPool`).
+        :return: the Docker client
+        """
+        if self._pool is None:
+            return get_docker_client()
+        return self._pool.get()
+
+    def streaming_client(self) -> ContextManager["DockerClient"]:
+        """
+        Checks out a client of the engine for a streaming call, returning it on exit (see `DockerClientPool`).
+        :return: context manager giving the Docker client
+        """
+        if self._pool is None:
+            return streaming_docker_client()
+        return self._pool.streaming_client()
+
+    def get_load(self) -> EngineLoad:
+        """
+        Gets the current load on the engine.
+        :return: the engine's load
+        """
+        info = self.get_client().info()
+        return EngineLoad(int(info.get("ContainersRunning", 0)), int(info.get("MemTotal", 0)))
+
+    def _reset_after_fork(self):
+        """
+        Discards the parent's clients in a forked process.
+        """
+        if self._pool is not None:
+            self._pool = DockerClientPool(self._pool.factory, self._pool.pool_size,
+                                          self._pool.max_idle_streaming_clients)
+        self._event_monitor = None
+        self._lock = Lock()
+
+
+_engines: MutableMapping[str, DockerEngine] = weakref.WeakValueDictionary()
+
+
+def _restore_docker_engine(name: str, base_url: Optional[str], host: str) -> DockerEngine:
+    """
+    Restores a copy of a Docker engine, using the engine with the same name in this process if there is one.
+    :param name: the engine's name
+    :param base_url: the URL of the engine
+    :param host: the host on which the ports published by the engine's containers are accessible
+    :return: the engine
+    """
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+    if base_url is None:
+        return default_docker_engine
+    return DockerEngine(name, base_url, host)
+
+
+def _reset_engines_after_fork():
+    """
+    Discards the parent's clients of all engines in a forked process.
+    """
+    for engine in list(_engines.values()):
+        engine._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
+
+class NoEngineAvailableError(UseInTestError):
+    """
+    Raised when a service cannot be placed as none of the Docker engines can be reached.
+    """
+
+
+class EngineScheduler:
+    """
+    Places services on the least loaded of a set of Docker engines.
+
+    Engines are loaded in proportion to the number of containers running on them relative to their memory, so an engine
+    with twice the memory of another is given twice the containers. The load on each engine is got at most once every
+    `load_ttl` seconds; services placed on an engine in the meantime count towards its load. Engines that cannot be
+    reached are not used until their load is next got.
+    """
+    def __init__(self, engines: Sequence[DockerEngine], load_ttl: float=DEFAULT_LOAD_TTL):
+        """
+        Constructor.
+        :param engines: the engines on which services can be placed
+        :param load_ttl: number of seconds for which the load got from an engine is used
+        """
+        if len(engines) == 0:
+            raise ValueError("At least one Docker engine must be given")
+        self.engines = list(engines)
+        self.load_ttl = load_ttl
+        self._loads: Dict[str, Tuple[Optional[EngineLoad], float]] = {}
+        self._placed: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def select(self) -> DockerEngine:
+        """
+        Selects the engine on which to place a new service, counting the service towards the engine's load.
+        :raises NoEngineAvailableError: if none of the engines can be reached
+        :return: the selected engine
+        """
+        with self._lock:
+            selected = None
+            selected_score = None
+            for engine in self.engines:
+                load = self._get_load(engine)
+                if load is None:
+                    continue
+                score = (load.running_containers + self._placed[engine.name]) \
+                    / max(load.memory / _BYTES_IN_GIGABYTE, 1.0)
+                if selected is None or score < selected_score:
+                    selected, selected_score = engine, score
+            if selected is None:
+                raise NoEngineAvailableError(f"None of the Docker engines can be reached: {self.engines}")
+            self._placed[selected.name] += 1
+            return selected
+
+    def _get_load(self, engine: DockerEngine) -> Optional[EngineLoad]:
+        """
+        Gets the load on the given engine, from the engine if the last load got has expired. Must be called with the
+        lock held.
+        :param engine: the engine
+        :return: the load, excluding services placed since it was got, or `None` if the engine cannot be reached
+        """
+        load, got_at = self._loads.get(engine.name, (None, -float("inf")))
+        if monotonic() - got_at < self.load_ttl:
+            return load
+        try:
+            load = engine.get_load()
+        except Exception as e:
+            logger.warning(f"Could not get the load on Docker engine {engine.name}: {e!r}")
+            load = None
+        self._loads[engine.name] = (load, monotonic())
+        self._placed[engine.name] = 0
+        return load
+
+
+def parse_docker_engines(specification: str) -> Sequence[DockerEngine]:
+    """
+    Parses Docker engines from a comma separated list of engine URLs, each optionally named (`name=url`). Engines are
+    named after their URL if not named.
+    :param specification: the engines (e.g. `build-1=tcp://build-1:2375,build-2=tcp://build-2:2375`)
+    :return: the engines
+    """
+    engines = []
+    for item in specification.split(","):
+        item = item.strip()
+        if len(item) == 0:
+            continue
+        name, separator, base_url = item.partition("=")
+        if separator == "" or "://" in name:
+            name, base_url = item, item
+        engines.append(DockerEngine(name, base_url))
+    return engines
+
+
+def _create_default_engine_scheduler() -> Optional[EngineScheduler]:
+    """
+    Creates the scheduler of the engines configured by the environment (`USEINTEST_DOCKER_ENGINES`), if any.
+    :return: the scheduler or `None` if no engines are configured
+    """
+    engines = parse_docker_engines(os.environ.get(DOCKER_ENGINES_ENVIRONMENT_VARIABLE, ""))
+    return EngineScheduler(engines) if len(engines) > 0 else None
+
+
+default_docker_engine = DockerEngine(DEFAULT_ENGINE_NAME)
+default_engine_scheduler = _create_default_engine_scheduler()
@@ -1,12 +1,11 @@
 import argparse
 import base64
 import os
+import shlex
 import sys
 from copy import deepcopy
 from typing import List, Iterable, Dict, Set, Callable, Any, Union
 
-from dill import dill
-
 from useintest.executables.common import CLI_ARGUMENTS
 
 _PROJECT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../")
@@ -20,7 +19,8 @@ class CommandsBuilder:
     def __init__(self, executable: str=None, container: str=None, image: str=None, executable_arguments: List[str]=None,
                  get_path_arguments_to_mount: Callable[[List[Any]], Set[str]]=None,
                  ports: Dict[int, int]=None, mounts: Dict[str, Union[str, Set[str]]]=None,
-                 variables: Iterable[str]=None, name: str=None, detached: bool=False, other_docker: str=""):
+                 variables: Iterable[str]=None, name: str=None, detached: bool=False, other_docker: str="",
+                 labels: Dict[str, str]=None, network: str=None):
         self.executable = executable
         self.container = container
         self.image = image
@@ -33,6 +33,8 @@ class CommandsBuilder:
         self.name = name
         self.detached = detached
         self.other_docker = other_docker
+        self.labels = labels if labels is not None else dict()
+        self.network = network
 
     def build(self) -> str:
         """
@@ -59,9 +61,19 @@ class CommandsBuilder:
         for variable in self.variables:
             variables += "-e %s " % variable
 
+        labels = ""
+        network = ""
+        if self.image is not None:
+            # Labels and networks can only be given to containers that are being created
+            for key, value in self.labels.items():
+                labels += "--label %s " % shlex.quote(f"{key}={value}")
+            if self.network is not None:
+                network = "--network %s" % shlex.quote(self.network)
+
         executable_arguments = " ".join(self.executable_arguments) if self.executable_arguments is not None else CLI_ARGUMENTS
 
         if self.get_path_arguments_to_mount is not None:
+            from dill import dill
             serialised_arguments_parser = base64.b64encode(dill.dumps(self.get_path_arguments_to_mount)).decode("utf-8")
 
             calculate_additional_mounts = ("""
@@ -82,6 +94,8 @@ class CommandsBuilder:
                 %(mounts)s %(calculate_additional_mounts)s \\
                 %(ports)s \\
                 %(variables)s \\
+                %(labels)s \\
+                %(network)s \\
                 %(other_docker)s \\
                 %(image_or_container)s \\
                 %(executable)s %(executable_arguments)s
@@ -92,6 +106,8 @@ class CommandsBuilder:
             "mounts": mounts,
             "ports": ports,
             "variables": variables,
+            "labels": labels,
+            "network": network,
             "other_docker": self.other_docker,
             "docker_noun": "run" if self.image is not None else "exec",
             "image_or_container": self.image if self.image is not None else self.container,
@@ -2,9 +2,8 @@ import logging
 import os
 from typing import List, Any, Set
 
-from docker.errors import ImageNotFound
-
-from useintest.common import docker_client
+from useintest.common import streaming_docker_client
+from useintest.images import ImageCache, default_image_cache
 
 CLI_ARGUMENTS = "\"$@\""
 
@@ -25,13 +24,15 @@ def write_commands(location: str, commands: str):
     os.chmod(location, 0o700)
 
 
-def pull_docker_image(image: str, tag: str=None):
+def pull_docker_image(image: str, tag: str=None, image_cache: ImageCache=None) -> str:
     """
-    TODO
-    :param image:
-    :param tag:
-    :return:
+    Ensures that the given image is available locally, pulling it if it is not.
+    :param image: the image repository (optionally with the tag, e.g. "ubuntu:16.04")
+    :param tag: the image tag, if not given as part of `image` (defaults to "latest")
+    :param image_cache: cache of image resolutions (defaults to the shared cache)
+    :return: the identifier of the local image
     """
+    from docker.errors import ImageNotFound
     # Ensure the image with the real binaries have been pulled to stop it polluting the output
     if ":" in image:
         if tag is not None:
@@ -39,14 +40,16 @@ def pull_docker_image(image: str, tag: str=None):
         repository, tag = image.split(":")
     else:
         repository, tag = image, tag
+    image_cache = image_cache if image_cache is not None else default_image_cache
 
     try:
-        docker_client.images.get(f"{repository}:{tag}")
+        return image_cache.resolve(repository, tag, pull=False)
     except ImageNotFound:
-        pull_stream = docker_client.api.pull(repository, tag=tag, stream=True)
-        for line in pull_stream:
-            # TODO: Remove logging to root logger
-            logging.debug(line)
+        with streaming_docker_client() as client:
+            for line in client.api.pull(repository, tag=tag, stream=True):
+                # TODO: Remove logging to root logger
+                logging.debug(line)
+        return image_cache.resolve(repository, tag, pull=False)
 
 
 # TODO: Test this
@@ -2,15 +2,17 @@ import atexit
 import os
 from copy import deepcopy
 
-from docker.errors import NotFound
 from temphelpers import TempManager
 from typing import Dict, Optional, Type
 from uuid import uuid4
 
-from useintest.common import MOUNTABLE_TEMP_DIRECTORY, docker_client
+from useintest.common import MOUNTABLE_TEMP_DIRECTORY
 from useintest.executables.builders import CommandsBuilder
 from useintest.executables.common import CLI_ARGUMENTS, write_commands, pull_docker_image
 from useintest.executables.models import Executable
+from useintest.networks import is_session_network_enabled, ensure_session_network
+from useintest.ownership import get_owner_labels, mark_owned
+from useintest.reaper import ContainerReaper, default_reaper
 
 _TAB_AS_SPACES = "    "
 
@@ -33,7 +35,8 @@ class ExecutablesController:
     """
     Controller for proxy executables that execute commands in a transparent Docker container.
     """
-    def __init__(self, run_container_commands_builder: Optional[CommandsBuilder]=None):
+    def __init__(self, run_container_commands_builder: Optional[CommandsBuilder]=None, reaper: ContainerReaper=None,
+                 session_network: bool=None):
         """
         Constructor.
         :param image_with_real_binaries: the name (docker-py's "tag") of the Docker image that the proxied binaries are
@@ -41,8 +44,13 @@ class ExecutablesController:
         :param run_container_commands_builder: (optional) builder for commands used to start up persistent container in
         which commands should be run (can lead to much better performance because new container is not brought up each
         time)
+        :param reaper: reaper that removes the execution container in the background (defaults to the shared reaper)
+        :param session_network: whether execution containers join the session's network (see `useintest.networks`), on
+        which they reach services by their name (defaults to whether `USEINTEST_SESSION_NETWORK` is set)
         """
         self.run_container_command_builder = run_container_commands_builder
+        self.reaper = reaper if reaper is not None else default_reaper
+        self.session_network = session_network if session_network is not None else is_session_network_enabled()
 
         if run_container_commands_builder is not None:
             if run_container_commands_builder.image is None:
@@ -51,6 +59,8 @@ class ExecutablesController:
             self._cached_container_name = f"execution-container-{uuid4()}"
             self.run_container_command_builder.name = self._cached_container_name
             self.run_container_command_builder.detached = True
+            self.run_container_command_builder.labels.update(get_owner_labels())
+            self._join_session_network(self.run_container_command_builder)
 
         atexit.register(self.tear_down)
 
@@ -59,12 +69,9 @@ class ExecutablesController:
         Tears down the controller.
         """
         if self.run_container_command_builder is not None:
-            try:
-                container = docker_client.containers.get(self._cached_container_name)
-                container.stop()
-                container.remove(force=True)
-            except NotFound:
-                """ Not concerned if the container had not yet been created """
+            # The execution container only ever runs commands on request so it can be killed (the reaper is not
+            # concerned if the container had not yet been created)
+            self.reaper.remove(self._cached_container_name, kill=True)
 
     def create_executable_commands(self, executable: Executable) -> str:
         """
@@ -121,8 +128,19 @@ class ExecutablesController:
             })
         else:
             pull_docker_image(executable.commands_builder.image)
+            executable.commands_builder.labels.update(get_owner_labels())
+            self._join_session_network(executable.commands_builder)
             return executable.commands_builder.build()
 
+    def _join_session_network(self, commands_builder: CommandsBuilder):
+        """
+        Makes the container run by the given commands join the session's network, if execution containers are to and
+        the container is not to join another network.
+        :param commands_builder: builder of the commands that run the container
+        """
+        if self.session_network and commands_builder.network is None:
+            commands_builder.network = ensure_session_network()
+
     def create_simple_executable_commands(self, containerised_executable: str, executable_arguments=CLI_ARGUMENTS) -> str:
         """
         TODO
@@ -141,8 +159,8 @@ class DefinedExecutablesController(ExecutablesController):
     TODO
     """
     def __init__(self, run_container_commands_builder: Optional[CommandsBuilder]=None,
-                 named_executables: Dict[str, Executable]=None):
-        super().__init__(run_container_commands_builder)
+                 named_executables: Dict[str, Executable]=None, session_network: bool=None):
+        super().__init__(run_container_commands_builder, session_network=session_network)
         self._temp_manager = TempManager()
         self.named_executables = named_executables if named_executables is not None else dict()
 
@@ -163,6 +181,7 @@ class DefinedExecutablesController(ExecutablesController):
         """
         if location is None:
             location = self._temp_manager.create_temp_directory(prefix="executables-", dir=MOUNTABLE_TEMP_DIRECTORY)
+            mark_owned(location)
 
         for name, executable in self.named_executables.items():
             executable_location = os.path.join(location, name)
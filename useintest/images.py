@@ -0,0 +1,215 @@
+import json
+import os
+from threading import Lock
+from time import time
+from typing import Dict, Optional, Set, TYPE_CHECKING
+
+from useintest._logging import create_logger
+from useintest.common import get_docker_client
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+    from useintest.engines import DockerEngine
+
+IMAGE_CACHE_TTL_ENVIRONMENT_VARIABLE = "USEINTEST_IMAGE_CACHE_TTL"
+IMAGE_CACHE_LOCATION_ENVIRONMENT_VARIABLE = "USEINTEST_IMAGE_CACHE_LOCATION"
+DEFAULT_IMAGE_CACHE_TTL = 600.0
+
+logger = create_logger(__name__)
+
+
+def get_image_name(repository: str, tag: Optional[str]) -> str:
+    """
+    Gets the full name of the image with the given repository and tag.
+    :param repository: the image's repository
+    :param tag: the image's tag (defaults to "latest")
+    :return: the image name, in the form `repository:tag`
+    """
+    return f"{repository}:{tag if tag is not None else 'latest'}"
+
+
+def _get_resolution_key(name: str, engine: Optional["DockerEngine"]) -> str:
+    """
+    Gets the key of the resolution of the image with the given name for the given Docker engine.
+    :param name: the image name
+    :param engine: the Docker engine (`None` for that configured by the environment)
+    :return: the resolution key: the image name, qualified by the engine's name if not the default engine
+    """
+    if engine is None or engine.is_default:
+        return name
+    return f"{engine.name}/{name}"
+
+
+class _ImageResolution:
+    """
+    Record of an image name having been resolved to a local image.
+    """
+    def __init__(self, image_id: str, digests: Set[str], resolved_at: float, verified: bool=True):
+        self.image_id = image_id
+        self.digests = digests
+        self.resolved_at = resolved_at
+        self.verified = verified
+
+
+class ImageCache:
+    """
+    Cache of the resolution of image names (`repository:tag`) to the identifiers of local images.
+
+    Pulled images are not pulled again until the cached resolution is older than the TTL and the image's digest in the
+    registry has changed.
+    """
+    def __init__(self, ttl: float=DEFAULT_IMAGE_CACHE_TTL, location: str=None):
+        """
+        Constructor.
+        :param ttl: number of seconds for which an image name's resolution is used without checking the registry
+        :param location: (optional) location of a file in which to persist resolutions between processes
+        """
+        self.ttl = ttl
+        self.location = location
+        self._resolutions: Dict[str, _ImageResolution] = {}
+        self._lock = Lock()
+        self._name_locks: Dict[str, Lock] = {}
+        if location is not None:
+            self._load()
+
+    def resolve(self, repository: str, tag: str=None, pull: bool=True, engine: "DockerEngine"=None) -> str:
+        """
+        Resolves the image with the given repository and tag to the identifier of a local image.
+        :param repository: the image's repository
+        :param tag: the image's tag (defaults to "latest")
+        :param pull: whether to pull the image from the registry (if the cached resolution is out of date)
+        :param engine: the Docker engine that the image is to be used on (defaults to that configured by the
+        environment). Images are resolved, and pulled, separately for each engine
+        :raises ImageNotFound: if not pulling and the image is not available locally
+        :return: the identifier of the local image
+        """
+        name = get_image_name(repository, tag)
+        key = _get_resolution_key(name, engine)
+        client = engine.get_client() if engine is not None else get_docker_client()
+        with self._get_name_lock(key):
+            resolution = self._get_valid_resolution(key, client)
+            if resolution is not None and time() - resolution.resolved_at < self.ttl:
+                return resolution.image_id
+
+            if not pull:
+                image = client.images.get(name)
+            elif resolution is not None and self._registry_digest_in(name, resolution.digests, client):
+                resolution.resolved_at = time()
+                self._save()
+                return resolution.image_id
+            else:
+                logger.info(f"Pulling image: {name}" + (f" (on {engine.name})" if key != name else ""))
+                image = client.images.pull(repository, tag=tag if tag is not None else "latest")
+
+            digests = {digest.split("@")[-1] for digest in image.attrs.get("RepoDigests", [])}
+            with self._lock:
+                self._resolutions[key] = _ImageResolution(image.id, digests, time())
+            self._save()
+            return image.id
+
+    def invalidate(self, repository: str, tag: str=None, engine: "DockerEngine"=None):
+        """
+        Removes the cached resolution of the image with the given repository and tag.
+        :param repository: the image's repository
+        :param tag: the image's tag (defaults to "latest")
+        :param engine: the Docker engine that the image was resolved for (defaults to that configured by the
+        environment)
+        """
+        with self._lock:
+            self._resolutions.pop(_get_resolution_key(get_image_name(repository, tag), engine), None)
+        self._save()
+
+    def clear(self):
+        """
+        Removes all cached resolutions.
+        """
+        with self._lock:
+            self._resolutions.clear()
+        self._save()
+
+    def _get_name_lock(self, name: str) -> Lock:
+        """
+        Gets the lock for resolving the image with the given name, which stops the same image being pulled in parallel.
+        :param name: the image name
+        :return: the lock for the image name
+        """
+        with self._lock:
+            if name not in self._name_locks:
+                self._name_locks[name] = Lock()
+            return self._name_locks[name]
+
+    def _get_valid_resolution(self, key: str, client: "DockerClient") -> Optional[_ImageResolution]:
+        """
+        Gets the cached resolution of the image with the given name, checking that the image still exists locally if the
+        resolution was loaded from disk.
+        :param key: the image name (qualified by the engine it is resolved for, see `_get_resolution_key`)
+        :param client: client of the Docker engine the image is resolved for
+        :return: the resolution or `None` if there is no valid resolution
+        """
+        from docker.errors import ImageNotFound
+        with self._lock:
+            resolution = self._resolutions.get(key)
+        if resolution is None or resolution.verified:
+            return resolution
+        try:
+            client.images.get(resolution.image_id)
+            resolution.verified = True
+            return resolution
+        except ImageNotFound:
+            with self._lock:
+                self._resolutions.pop(key, None)
+            return None
+
+    def _registry_digest_in(self, name: str, digests: Set[str], client: "DockerClient") -> bool:
+        """
+        Checks whether the digest of the image with the given name in the registry is one of those given.
+        :param name: the image name
+        :param digests: the known digests
+        :param client: client of the Docker engine through which to check the registry
+        :return: whether the registry's digest is known (`False` if the registry could not be checked)
+        """
+        from docker.errors import APIError, NotFound
+        if len(digests) == 0:
+            return False
+        try:
+            return client.images.get_registry_data(name).id in digests
+        except (APIError, NotFound, AttributeError) as e:
+            logger.debug(f"Could not get registry data for {name}: {e!r}")
+            return False
+
+    def _load(self):
+        """
+        Loads resolutions from the cache file.
+        """
+        try:
+            with open(self.location, "r") as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for name, resolution in stored.items():
+                self._resolutions[name] = _ImageResolution(
+                    resolution["image_id"], set(resolution["digests"]), resolution["resolved_at"], verified=False)
+
+    def _save(self):
+        """
+        Saves resolutions to the cache file, if there is one.
+        """
+        if self.location is None:
+            return
+        with self._lock:
+            to_store = {name: dict(image_id=resolution.image_id, digests=sorted(resolution.digests),
+                                   resolved_at=resolution.resolved_at)
+                        for name, resolution in self._resolutions.items()}
+            temp_location = f"{self.location}.{os.getpid()}.tmp"
+            try:
+                with open(temp_location, "w") as file:
+                    json.dump(to_store, file)
+                os.replace(temp_location, self.location)
+            except OSError as e:
+                logger.warning(f"Could not save image cache to {self.location}: {e}")
+
+
+default_image_cache = ImageCache(
+    ttl=float(os.environ.get(IMAGE_CACHE_TTL_ENVIRONMENT_VARIABLE, DEFAULT_IMAGE_CACHE_TTL)),
+    location=os.environ.get(IMAGE_CACHE_LOCATION_ENVIRONMENT_VARIABLE))
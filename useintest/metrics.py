@@ -0,0 +1,242 @@
+import json
+import os
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic, time
+from typing import Dict, Optional, Iterator, Tuple, List
+
+from useintest._logging import create_logger
+
+METRICS_LOCATION_ENVIRONMENT_VARIABLE = "USEINTEST_METRICS_LOCATION"
+
+START_KIND = "start"
+STOP_KIND = "stop"
+RESET_KIND = "reset"
+
+RESOLVE_IMAGE_PHASE = "resolve-image"
+CREATE_CONTAINER_PHASE = "create-container"
+START_CONTAINER_PHASE = "start-container"
+READINESS_PHASE = "readiness"
+RETRY_PHASE = "retry"
+POST_START_PHASE = "post-start"
+STOP_PHASE = "stop"
+STOP_CONTAINER_PHASE = "stop-container"
+REMOVE_CONTAINER_PHASE = "remove-container"
+CREATE_NAMESPACE_PHASE = "create-namespace"
+REMOVE_NAMESPACE_PHASE = "remove-namespace"
+RESET_PHASE = "reset"
+REPLACE_CONTAINER_PHASE = "replace-container"
+REUSE_PHASE = "reuse"
+
+_PROMETHEUS_METRIC_PREFIX = "useintest"
+
+logger = create_logger(__name__)
+
+
+class Timings:
+    """
+    Breakdown of the time taken to start or stop a service, by phase.
+    """
+    @property
+    def total(self) -> float:
+        """
+        Gets the total number of seconds taken (so far).
+        :return: the total time
+        """
+        end = self._ended_at if self._ended_at is not None else monotonic()
+        return end - self._started_at
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.tries = 0
+        self.succeeded: Optional[bool] = None
+        self.timestamp = time()
+        self._started_at = monotonic()
+        self._ended_at: Optional[float] = None
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """
+        Context manager that adds the time spent in context to the given phase.
+        :param phase: the phase being timed
+        """
+        started_at = monotonic()
+        try:
+            yield
+        finally:
+            self.add(phase, monotonic() - started_at)
+
+    def add(self, phase: str, seconds: float):
+        """
+        Adds the given time to the given phase (phases can be timed more than once, e.g. when retrying).
+        :param phase: the phase
+        :param seconds: the number of seconds spent in the phase
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def end(self, succeeded: bool):
+        """
+        Records that whatever is being timed has ended.
+        :param succeeded: whether it succeeded
+        """
+        self._ended_at = monotonic()
+        self.succeeded = succeeded
+
+    def to_json(self) -> Dict:
+        """
+        Gets a JSON representation of the timings.
+        :return: the JSON representation
+        """
+        return dict(timestamp=self.timestamp, total=self.total, tries=self.tries, succeeded=self.succeeded,
+                    phases=dict(self.phases))
+
+
+class MetricsSink(metaclass=ABCMeta):
+    """
+    Destination of the timings of services being started and stopped.
+    """
+    @abstractmethod
+    def record(self, kind: str, labels: Dict[str, str], timings: Timings):
+        """
+        Records the given timings. Called from the thread that started or stopped the service, so should return quickly.
+        :param kind: what the timings are of (`START_KIND`, `STOP_KIND` or `RESET_KIND`)
+        :param labels: labels identifying what was started or stopped (e.g. the controller, repository and tag)
+        :param timings: the timings
+        """
+
+
+class JsonLinesMetricsSink(MetricsSink):
+    """
+    Appends timings to a file, one JSON object per line.
+    """
+    def __init__(self, location: str):
+        """
+        Constructor.
+        :param location: location of the file to append to
+        """
+        self.location = location
+        self._lock = Lock()
+
+    def record(self, kind: str, labels: Dict[str, str], timings: Timings):
+        line = json.dumps(dict(kind=kind, labels=labels, **timings.to_json()), sort_keys=True)
+        with self._lock:
+            try:
+                with open(self.location, "a") as file:
+                    file.write(f"{line}\n")
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.location}: {e}")
+
+
+class PrometheusMetricsSink(MetricsSink):
+    """
+    Aggregates timings into summaries, exported in the Prometheus text format (e.g. for the node exporter's textfile
+    collector).
+    """
+    def __init__(self, location: str=None):
+        """
+        Constructor.
+        :param location: (optional) location of a file that is rewritten with the exported metrics after every record
+        """
+        self.location = location
+        self._phase_seconds: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._total_seconds: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._tries: Dict[Tuple[Tuple[str, str], ...], int] = {}
+        self._lock = Lock()
+        # Writes by different threads share the temp file, and must not publish an older export over a newer one
+        self._write_lock = Lock()
+
+    def record(self, kind: str, labels: Dict[str, str], timings: Timings):
+        labels = dict(labels, kind=kind)
+        with self._lock:
+            for phase, seconds in timings.phases.items():
+                PrometheusMetricsSink._observe(self._phase_seconds, dict(labels, phase=phase), seconds)
+            total_labels = dict(labels, succeeded=str(bool(timings.succeeded)).lower())
+            PrometheusMetricsSink._observe(self._total_seconds, total_labels, timings.total)
+            if kind == START_KIND:
+                key = PrometheusMetricsSink._to_key(labels)
+                self._tries[key] = self._tries.get(key, 0) + timings.tries
+        if self.location is not None:
+            self.write(self.location)
+
+    def export(self) -> str:
+        """
+        Exports the aggregated timings in the Prometheus text format.
+        :return: the exported metrics
+        """
+        lines = []
+        with self._lock:
+            for name, description, observations in (
+                    ("phase_seconds", "Time spent in each phase of starting or stopping services",
+                     self._phase_seconds),
+                    ("seconds", "Total time taken to start or stop services", self._total_seconds)):
+                metric = f"{_PROMETHEUS_METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} summary")
+                for key, (total, count) in sorted(observations.items()):
+                    labels = PrometheusMetricsSink._format_labels(key)
+                    lines.append(f"{metric}_sum{labels} {total}")
+                    lines.append(f"{metric}_count{labels} {int(count)}")
+            metric = f"{_PROMETHEUS_METRIC_PREFIX}_tries_total"
+            lines.append(f"# HELP {metric} Number of attempts made to start services")
+            lines.append(f"# TYPE {metric} counter")
+            for key, tries in sorted(self._tries.items()):
+                lines.append(f"{metric}{PrometheusMetricsSink._format_labels(key)} {tries}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, location: str):
+        """
+        Writes the exported metrics to the given location (atomically, so partially written files are never read).
+        :param location: the location to write to
+        """
+        temp_location = f"{location}.{os.getpid()}.tmp"
+        with self._write_lock:
+            try:
+                with open(temp_location, "w") as file:
+                    file.write(self.export())
+                os.replace(temp_location, location)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {location}: {e}")
+
+    @staticmethod
+    def _observe(observations: Dict[Tuple[Tuple[str, str], ...], List[float]], labels: Dict[str, str], value: float):
+        """
+        Adds the given observation to the summary with the given labels.
+        :param observations: summaries (sum and count), by labels
+        :param labels: the labels of the observation
+        :param value: the observed value
+        """
+        summary = observations.setdefault(PrometheusMetricsSink._to_key(labels), [0.0, 0])
+        summary[0] += value
+        summary[1] += 1
+
+    @staticmethod
+    def _to_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        """
+        Converts the given labels into a hashable (and sortable) key.
+        :param labels: the labels
+        :return: the key
+        """
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+        """
+        Formats the labels in the given key in the Prometheus text format.
+        :param key: the key containing the labels
+        :return: the formatted labels
+        """
+        escaped = (value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in key)
+        return "{" + ",".join(f"{name}=\"{value}\"" for (name, _), value in zip(key, escaped)) + "}"
+
+
+def _create_default_metrics_sink() -> Optional[MetricsSink]:
+    """
+    Creates the metrics sink used by all controllers, as configured by the environment.
+    :return: the metrics sink or `None` if metrics are not to be recorded
+    """
+    location = os.environ.get(METRICS_LOCATION_ENVIRONMENT_VARIABLE)
+    return JsonLinesMetricsSink(location) if location else None
+
+
+default_metrics_sink = _create_default_metrics_sink()
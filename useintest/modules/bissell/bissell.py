@@ -2,7 +2,7 @@ from useintest.services.builders import DockerisedServiceControllerTypeBuilder
 
 common_setup = {
     "repository": "mercury/bissell",
-    "start_log_detector": lambda line: "Bissell starting on port" in line,
+    "start_log_detector": "Bissell starting on port",
     "start_http_detector": lambda response: response.status_code == 401,
     "ports": [5000]
 }
@@ -1,2 +1,2 @@
 from useintest.modules.consul.consul import ConsulServiceController, consul_service_controllers, \
-    Consul1_0_0ServiceController, Consul0_8_4ServiceController, ConsulDockerisedService
+    Consul1_0_0ServiceController, Consul0_8_4ServiceController, ConsulDockerisedService, ConsulTenancy
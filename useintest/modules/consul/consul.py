@@ -1,14 +1,22 @@
 import os
+from typing import Dict, Optional
 
 from useintest.common import MissingDependencyError
 from useintest.services.builders import DockerisedServiceControllerTypeBuilder
+from useintest.services.exceptions import NamespaceError
 from useintest.services.models import DockerisedService
+from useintest.services.tenancy import Tenancy
 
 DEFAULT_HTTP_PORT = 8500
 
+_NAMESPACE_REQUEST_TIMEOUT = 30.0
+_RESET_REQUEST_TIMEOUT = 30.0
+_CONSUL_SERVICE_ID = "consul"
+_TENANT_ACL_RULES = "key \"{namespace}/\" {{ policy = \"write\" }}"
+
 _repository = "consul"
 _ports = [8300, 8301, 8302, DEFAULT_HTTP_PORT, 8600]
-_start_detector = lambda log_line: "Node info in sync" in log_line or "Synced node info" in log_line
+_start_detector = ["Node info in sync", "Synced node info"]
 
 
 class ConsulDockerisedService(DockerisedService):
@@ -22,6 +30,10 @@ class ConsulDockerisedService(DockerisedService):
     CONSUL_VERIFY_ENVIRONMENT_VARIABLE = "CONSUL_HTTP_SSL_VERIFY"
     CONSUL_CERTIFICATE_ENVIRONMENT_VARIABLE = "CONSUL_CLIENT_CERT"
 
+    def __init__(self):
+        super().__init__()
+        self.token: Optional[str] = None
+
     @staticmethod
     def _clear_environment():
         """
@@ -46,7 +58,7 @@ class ConsulDockerisedService(DockerisedService):
         except ImportError as e:
             raise MissingDependencyError("python-consul") from e
         ConsulDockerisedService._clear_environment()
-        return Consul(self.host, self.ports[DEFAULT_HTTP_PORT])
+        return Consul(self.host, self.ports[DEFAULT_HTTP_PORT], token=self.token)
 
     def setup_environment(self):
         """
@@ -55,13 +67,85 @@ class ConsulDockerisedService(DockerisedService):
         ConsulDockerisedService._clear_environment()
         os.environ[ConsulDockerisedService.CONSUL_ADDRESS_ENVIRONMENT_VARIABLE] = \
             f"{self.host}:{self.ports[DEFAULT_HTTP_PORT]}"
+        if self.token is not None:
+            os.environ[ConsulDockerisedService.CONSUL_TOKEN_ENVIRONMENT_VARIABLE] = self.token
+
+
+class ConsulTenancy(Tenancy[ConsulDockerisedService]):
+    """
+    Gives each tenant of a shared Consul service its own key prefix in the KV store (`{namespace}/`), which is deleted
+    when the tenant is released. If a management token is given, each tenant is also given an ACL token (`token`)
+    that can only write under its prefix.
+    """
+    def __init__(self, management_token: str=None):
+        """
+        Constructor.
+        :param management_token: (optional) token used to create ACL tokens for tenants (requires ACLs to be enabled)
+        """
+        self.management_token = management_token
+
+    def create_namespace(self, service: ConsulDockerisedService, tenant: ConsulDockerisedService):
+        if self.management_token is not None:
+            rules = _TENANT_ACL_RULES.format(namespace=tenant.namespace)
+            response = self._request("PUT", service, "acl/create",
+                                     json=dict(Name=tenant.namespace, Type="client", Rules=rules))
+            tenant.token = response["ID"]
+
+    def remove_namespace(self, service: ConsulDockerisedService, tenant: ConsulDockerisedService):
+        self._request("DELETE", service, f"kv/{tenant.namespace}", params=dict(recurse="true"))
+        if tenant.token is not None:
+            self._request("PUT", service, f"acl/destroy/{tenant.token}")
+
+    def _request(self, method: str, service: ConsulDockerisedService, endpoint: str, **kwargs) -> Optional[Dict]:
+        """
+        Makes a request to the given Consul service's HTTP API.
+        :param method: the HTTP method of the request
+        :param service: the Consul service
+        :param endpoint: the API endpoint (relative to `/v1/`)
+        :param kwargs: keyword arguments passed to `requests.request`
+        :raises NamespaceError: if the request is not successful
+        :return: the decoded JSON response (`None` if the response is empty)
+        """
+        import requests
+        headers = {"X-Consul-Token": self.management_token} if self.management_token is not None else {}
+        url = f"http://{service.host}:{service.ports[DEFAULT_HTTP_PORT]}/v1/{endpoint}"
+        try:
+            response = requests.request(method, url, headers=headers, timeout=_NAMESPACE_REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException as e:
+            raise NamespaceError(f"Could not {method} Consul {endpoint}: {e!r}") from e
+        if not response.ok:
+            raise NamespaceError(f"Could not {method} Consul {endpoint}: {response.status_code} {response.text}")
+        return response.json() if response.content else None
+
+
+def _reset_consul(service: ConsulDockerisedService):
+    """
+    Resets the given Consul service by deleting everything in the KV store and deregistering all services registered
+    with the agent (other than Consul itself).
+    :param service: the Consul service
+    :raises RequestException: if a request to the service is not successful
+    """
+    import requests
+    url = f"http://{service.host}:{service.ports[DEFAULT_HTTP_PORT]}/v1"
+    with requests.Session() as session:
+        if service.token is not None:
+            session.headers["X-Consul-Token"] = service.token
+        session.delete(f"{url}/kv/", params=dict(recurse="true"), timeout=_RESET_REQUEST_TIMEOUT).raise_for_status()
+        response = session.get(f"{url}/agent/services", timeout=_RESET_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        for service_id in response.json():
+            if service_id != _CONSUL_SERVICE_ID:
+                session.put(f"{url}/agent/service/deregister/{service_id}",
+                            timeout=_RESET_REQUEST_TIMEOUT).raise_for_status()
 
 
 common_setup = {
     "repository": _repository,
     "start_log_detector": _start_detector,
     "ports": _ports,
-    "service_model": ConsulDockerisedService
+    "tmpfs": {"/consul/data": "256m"},
+    "service_model": ConsulDockerisedService,
+    "resetter": _reset_consul
 }
 
 Consul1_0_0ServiceController = DockerisedServiceControllerTypeBuilder(
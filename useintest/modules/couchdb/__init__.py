@@ -1,2 +1,3 @@
 from useintest.modules.couchdb.couchdb import CouchDB1_6ServiceController, CouchDBServiceController, \
-    couchdb_service_controllers, CouchDB1_6DockerisedServiceController, common_setup
+    couchdb_service_controllers, CouchDB1_6DockerisedServiceController, CouchDBTenancy, \
+    common_setup
@@ -1,10 +1,64 @@
 from useintest.services.builders import DockerisedServiceControllerTypeBuilder
+from useintest.services.exceptions import NamespaceError
+from useintest.services.models import DockerisedService
+from useintest.services.tenancy import Tenancy
+
+_NAMESPACE_REQUEST_TIMEOUT = 30.0
+_RESET_REQUEST_TIMEOUT = 30.0
+
+
+def _reset_couchdb(service: DockerisedService):
+    """
+    Resets the given CouchDB service by deleting all databases other than the system databases (prefixed with "_").
+    :param service: the CouchDB service
+    :raises RequestException: if a request to the service is not successful
+    """
+    import requests
+    with requests.Session() as session:
+        response = session.get(f"{service.url}/_all_dbs", timeout=_RESET_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        for database in response.json():
+            if not database.startswith("_"):
+                session.delete(f"{service.url}/{database}", timeout=_RESET_REQUEST_TIMEOUT).raise_for_status()
+
+
+class CouchDBTenancy(Tenancy[DockerisedService]):
+    """
+    Gives each tenant of a shared CouchDB service its own database, named by the tenant's namespace.
+    """
+    def create_namespace(self, service: DockerisedService, tenant: DockerisedService):
+        CouchDBTenancy._request("PUT", service, tenant.namespace)
+
+    def remove_namespace(self, service: DockerisedService, tenant: DockerisedService):
+        CouchDBTenancy._request("DELETE", service, tenant.namespace, allow_missing=True)
+
+    @staticmethod
+    def _request(method: str, service: DockerisedService, database: str, allow_missing: bool=False):
+        """
+        Makes a request about the given database to the given CouchDB service.
+        :param method: the HTTP method of the request
+        :param service: the CouchDB service
+        :param database: the name of the database
+        :param allow_missing: whether it is not an error if the database does not exist
+        :raises NamespaceError: if the request is not successful
+        """
+        import requests
+        try:
+            response = requests.request(method, f"{service.url}/{database}", timeout=_NAMESPACE_REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            raise NamespaceError(f"Could not {method} CouchDB database {database}: {e!r}") from e
+        if not response.ok and not (allow_missing and response.status_code == 404):
+            raise NamespaceError(f"Could not {method} CouchDB database {database}: {response.status_code} "
+                                 f"{response.text}")
+
 
 common_setup = {
     "repository": "couchdb",
-    "start_log_detector": lambda log_line: "Apache CouchDB has started" in log_line,
-    "persistent_error_log_detector": lambda log_line: "no space left on device" in log_line,
-    "ports": [5984]
+    "start_log_detector": "Apache CouchDB has started",
+    "persistent_error_log_detector": "no space left on device",
+    "ports": [5984],
+    "tmpfs": {"/usr/local/var/lib/couchdb": "512m"},
+    "resetter": _reset_couchdb
 }
 
 CouchDB1_6DockerisedServiceController = DockerisedServiceControllerTypeBuilder(
@@ -16,6 +16,23 @@ _CONFIGURATION_DOCKER_LOCATION = PurePosixPath("/data")
 
 _ROOT_USERNAME = "root"
 _ROOT_PASSWORD = "root"
+_RESET_REQUEST_TIMEOUT = 30.0
+
+
+def _reset_gogs(service: DockerisedServiceWithUsers[User]):
+    """
+    Resets the given Gogs service by deleting all repositories that the root user has access to.
+    :param service: the Gogs service
+    :raises RequestException: if a request to the service is not successful
+    """
+    import requests
+    with requests.Session() as session:
+        session.auth = (service.root_user.username, service.root_user.password)
+        response = session.get(f"{service.url}/api/v1/user/repos", timeout=_RESET_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        for repository in response.json():
+            session.delete(f"{service.url}/api/v1/repos/{repository['full_name']}",
+                           timeout=_RESET_REQUEST_TIMEOUT).raise_for_status()
 
 
 class GogsBaseServiceController(Generic[DockerisedServiceWithUsersType],
@@ -23,8 +40,8 @@ class GogsBaseServiceController(Generic[DockerisedServiceWithUsersType],
     """
     Base class for Gogs service controllers.
     """
-    def start_service(self) -> DockerisedServiceWithUsersType:
-        service = super().start_service()
+    def _post_start(self, service: DockerisedServiceWithUsersType):
+        super()._post_start(service)
         container = service.container
 
         # Painful conversion required due to limitation of the Docker client:
@@ -45,18 +62,17 @@ class GogsBaseServiceController(Generic[DockerisedServiceWithUsersType],
             if "Listen: http://0.0.0.0:3000" in str(line):
                 break
 
-        return service
-
 
 # Employing hacky way of getting run sleeping forever with the detector
 common_setup = {
     "superclass": GogsBaseServiceController,
     "service_model": DockerisedServiceWithUsers[User],
     "repository": "gogs/gogs",
-    "start_log_detector": lambda log_line: "127.0.0.1\tlocalhost" in log_line,
-    "transient_error_log_detector": lambda log_line: "the container has stopped" in log_line,
+    "start_log_detector": "127.0.0.1\tlocalhost",
+    "transient_error_log_detector": "the container has stopped",
     "ports": [3000],
-    "additional_run_settings": {"entrypoint": "tail", "command": ["-f", "/etc/hosts"]}
+    "additional_run_settings": {"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+    "resetter": _reset_gogs
 }
 
 Gogs0_11_4ServiceController = DockerisedServiceControllerTypeBuilder(
@@ -4,4 +4,4 @@ from useintest.modules.irods.helpers import AccessLevel, IrodsSetupHelper
 from useintest.modules.irods.models import IrodsResource, IrodsUser, IrodsDockerisedService
 from useintest.modules.irods.setup_irods import setup_irods
 from useintest.modules.irods.services import IrodsBaseServiceController, Irods4ServiceController, \
-    Irods4_1_10ServiceController, IrodsServiceController, irods_service_controllers
\ No newline at end of file
+    Irods4_1_10ServiceController, IrodsServiceController, irods_service_controllers, IrodsTenancy
\ No newline at end of file
@@ -24,7 +24,7 @@ class IrodsBaseExecutablesController(DefinedExecutablesController):
 
     # TODO: Could add option to connect to iRODS server not running in Docker (i.e. via port opposed to link)
     def __init__(self, irods_container_name: str, image_with_compatible_icommands: str, settings_directory_on_host: str,
-                 settings_directories_in_container: Sequence[str]=_DEFAULT_SETTINGS_DIRECTORIES):
+                 settings_directories_in_container: Sequence[str]=_DEFAULT_SETTINGS_DIRECTORIES, network: str=None):
         """
         Constructor.
         :param irods_container_name: the name of the container running the iRODS server
@@ -32,13 +32,18 @@ class IrodsBaseExecutablesController(DefinedExecutablesController):
         :param settings_directory_on_host: directory on the Docker host machine that are used to access iRODS
         :param settings_directories_in_container: the directories on the container running the Docker image that need to
         contain the settings
+        :param network: the user-defined network that the iRODS server is on (e.g. the session's network, see
+        `DockerisedService.network`), which the execution containers join to reach the server by its name. The
+        execution containers are linked to the server if not set
         """
         self._image_with_compatible_icommands = image_with_compatible_icommands
         self._run_container_commands_builder = CommandsBuilder(
             "sleep", executable_arguments=["infinity"], image=image_with_compatible_icommands,
-            other_docker="--link %s" % irods_container_name,
+            other_docker="--link %s" % irods_container_name if network is None else "", network=network,
             mounts={settings_directory_on_host: set(settings_directories_in_container)})
-        super().__init__(run_container_commands_builder=self._run_container_commands_builder)
+        # Execution containers must be on the same network as the server, so do not join the session's network unless
+        # the server is on it
+        super().__init__(run_container_commands_builder=self._run_container_commands_builder, session_network=False)
         self._register_named_executables()
 
     def authenticate(self, executables_directory: str, password: str):
@@ -78,7 +83,8 @@ class IrodsBaseExecutablesController(DefinedExecutablesController):
                 command, image=self._image_with_compatible_icommands,
                 get_path_arguments_to_mount=IrodsBaseExecutablesController._GET_POSITIONAL_ARGUMENTS_TO_MOUNT,
                 mounts=self._run_container_commands_builder.mounts,
-                other_docker=self._run_container_commands_builder.other_docker)
+                other_docker=self._run_container_commands_builder.other_docker,
+                network=self._run_container_commands_builder.network)
             return Executable(commands_builder, False)
 
         # Note: if `-` is the second positional argument with `iget`, `-` is suspected as a file, relative to the
@@ -12,6 +12,7 @@ from typing import List, Union, Dict, Set
 from uuid import uuid4
 
 from useintest.modules.irods.models import IrodsResource, IrodsUser, Version
+from useintest.ownership import mark_owned
 
 
 @unique
@@ -62,6 +63,7 @@ class IrodsSetupHelper:
 
         temp_directory_path = mkdtemp(dir=temp_root)
         atexit.register(remove_temp_folder, temp_directory_path)
+        mark_owned(temp_directory_path)
 
         temp_file_path = os.path.join(temp_directory_path, name)
         os.chmod(temp_directory_path, 0o770)
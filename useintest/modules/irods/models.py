@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional, Set
 
 import semantic_version
 
@@ -44,3 +44,6 @@ class IrodsDockerisedService(DockerisedServiceWithUsers[IrodsUser]):
     def __init__(self):
         super().__init__()
         self.version: Version = None
+        # Names of the users and resources that exist once the service has started (used to reset the service)
+        self.started_user_names: Optional[Set[str]] = None
+        self.started_resource_names: Optional[Set[str]] = None
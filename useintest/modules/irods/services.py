@@ -3,16 +3,31 @@ import logging
 import math
 import os
 from abc import abstractmethod, ABCMeta
-from typing import List, Type, Callable, Sequence
+from typing import List, Type, Sequence
+from uuid import uuid4
 
 from useintest.modules.irods.models import IrodsUser, IrodsDockerisedService, Version
 from useintest.services.controllers import DockerisedServiceController
+from useintest.services.detectors import LogDetector
+from useintest.services.tenancy import Tenancy
 
 _DOCKER_REPOSITORY = "mercury/icat"
+_IRODS_SERVICE_ACCOUNT = "irods"
 
 _logger = logging.getLogger(__name__)
 
 
+def _run_icommand(service: IrodsDockerisedService, arguments: List[str]) -> List[str]:
+    """
+    Runs the given icommand as the iRODS administrator, inside the container of the given service.
+    :param service: the iRODS service
+    :param arguments: the icommand and its arguments
+    :raises ContainerCommandError: if the icommand fails
+    :return: the non-blank lines output by the icommand, stripped of surrounding whitespace
+    """
+    output = service.run_command(arguments, user=_IRODS_SERVICE_ACCOUNT)
+    return [line.strip() for line in output.splitlines() if line.strip() != ""]
+
 
 class IrodsBaseServiceController(DockerisedServiceController[IrodsDockerisedService], metaclass=ABCMeta):
     """
@@ -27,17 +42,10 @@ class IrodsBaseServiceController(DockerisedServiceController[IrodsDockerisedServ
         :param service: the Dockerized iRODS service
         """
 
-    @staticmethod
-    def _persistent_error_log_detector(line: str) -> bool:
-        """
-        TODO
-        :param line:
-        :return:
-        """
-        return "No space left on device" in line
+    _PERSISTENT_ERROR_LOG_DETECTOR = "No space left on device"
 
     def __init__(self, version: Version, users: Sequence[IrodsUser], config_file_name: str,
-                 repository: str, tag: str, ports: List[int], start_log_detector: Callable[[str], bool], **kwargs):
+                 repository: str, tag: str, ports: List[int], start_log_detector: LogDetector, **kwargs):
         """
         Constructor.
         :param version:
@@ -47,22 +55,47 @@ class IrodsBaseServiceController(DockerisedServiceController[IrodsDockerisedServ
         :param tag:
         :param ports:
         :param start_log_detector:
-        :param kwargs:
+        :param kwargs: other named arguments given to `DockerisedServiceController.__init__` (services are reset in place
+        unless a different `resetter` is given)
         """
+        kwargs.setdefault("resetter", self._reset_in_place)
         super().__init__(
             IrodsDockerisedService, repository, tag, ports, start_log_detector=start_log_detector, **kwargs)
         self.config_file_name = config_file_name
         self._version = version
         self._users = users
 
-    def start_service(self) -> IrodsDockerisedService:
-        service = super().start_service()
+    def _post_start(self, service: IrodsDockerisedService):
+        super()._post_start(service)
         for user in self._users:
             if user.admin:
                 service.root_user = user
             service.users.add(user)
         service.version = self._version
-        return service
+        service.started_user_names = set(_run_icommand(service, ["iadmin", "lu"]))
+        service.started_resource_names = set(_run_icommand(service, ["iadmin", "lr"]))
+
+    def _reset_in_place(self, service: IrodsDockerisedService):
+        """
+        Resets the given service by removing everything in the administrator's home collection, along with the users and
+        resources that did not exist once the service had started.
+        :param service: the service to reset
+        :raises ValueError: if the state of the service once started is not known
+        :raises ContainerCommandError: if an icommand fails (e.g. because a user to be removed still owns data)
+        """
+        if service.started_user_names is None or service.started_resource_names is None:
+            raise ValueError(f"State of service {service.name} once started is not known")
+        home = f"/{service.root_user.zone}/home/{service.root_user.username}"
+        paths = []
+        for line in _run_icommand(service, ["ils", home])[1:]:
+            # Collections are listed as "C- <path>" and data objects by name
+            paths.append(line[3:] if line.startswith("C- ") else f"{home}/{line}")
+        if len(paths) > 0:
+            _run_icommand(service, ["irm", "-rf"] + paths)
+        for user in set(_run_icommand(service, ["iadmin", "lu"])) - service.started_user_names:
+            _run_icommand(service, ["iadmin", "rmuser", user])
+        for resource in set(_run_icommand(service, ["iadmin", "lr"])) - service.started_resource_names:
+            _run_icommand(service, ["iadmin", "rmresc", resource])
 
 
 class Irods4ServiceController(IrodsBaseServiceController, metaclass=ABCMeta):
@@ -80,6 +113,8 @@ class Irods4ServiceController(IrodsBaseServiceController, metaclass=ABCMeta):
     _AUTHENTICATION_SCHEME_PARAMETER_NAME = "irods_authentication_scheme"
 
     _USERS = [IrodsUser("rods", "testZone", "irods123", admin=True)]
+    # The catalogue database is set up when the image is built, so only the vault can be mounted as tmpfs
+    _TMPFS = {"/var/lib/irods/iRODS/Vault": "1g"}
 
     # TODO: These connection settings will not work with port-mapping to localhost
     @staticmethod
@@ -99,7 +134,7 @@ class Irods4ServiceController(IrodsBaseServiceController, metaclass=ABCMeta):
             settings_file.write(config_as_json)
 
     def __init__(self, docker_repository: str, docker_tag: str, start_timeout: int=math.inf, start_tries: int=10,
-                 version: Version=None):
+                 version: Version=None, **kwargs):
         """
         Constructor.
         :param docker_repository: name of the Docker repository
@@ -107,15 +142,37 @@ class Irods4ServiceController(IrodsBaseServiceController, metaclass=ABCMeta):
         :param start_timeout: see `ContainerisedServiceController.__init__`
         :param start_tries: see `ContainerisedServiceController.__init__`
         :param version: exact version of the iRODS 4 sever (will use `docker_tag` if not supplied)
+        :param kwargs: other named arguments (e.g. pool settings) given to `DockerisedServiceController.__init__` (the
+        vault is mounted as tmpfs unless a different `tmpfs` is given)
         """
         version = version if version is not None else Version(docker_tag)
+        kwargs.setdefault("tmpfs", Irods4ServiceController._TMPFS)
         super().__init__(version, Irods4ServiceController._USERS, Irods4ServiceController._CONFIG_FILE_NAME,
                          docker_repository, docker_tag, [Irods4ServiceController._PORT],
-                         start_log_detector=lambda line: "iRODS server started successfully!" in line,
-                         transient_error_log_detector=lambda line: "iRODS server failed to start." in line
-                                                                   or "RuntimeError:" in line,
-                         persistent_error_log_detector=IrodsBaseServiceController._persistent_error_log_detector,
-                         start_timeout=start_timeout, start_tries=start_tries)
+                         start_log_detector="iRODS server started successfully!",
+                         transient_error_log_detector=["iRODS server failed to start.", "RuntimeError:"],
+                         persistent_error_log_detector=IrodsBaseServiceController._PERSISTENT_ERROR_LOG_DETECTOR,
+                         start_timeout=start_timeout, start_tries=start_tries, **kwargs)
+
+
+class IrodsTenancy(Tenancy[IrodsDockerisedService]):
+    """
+    Gives each tenant of a shared iRODS service its own user, named by the tenant's namespace, whose home collection
+    (`/{zone}/home/{namespace}`) is the tenant's collection. The user and everything in their home collection are
+    removed when the tenant is released.
+    """
+    def create_namespace(self, service: IrodsDockerisedService, tenant: IrodsDockerisedService):
+        user = IrodsUser(tenant.namespace, service.root_user.zone, uuid4().hex)
+        _run_icommand(service, ["iadmin", "mkuser", f"{user.username}#{user.zone}", "rodsuser"])
+        _run_icommand(service, ["iadmin", "moduser", f"{user.username}#{user.zone}", "password", user.password])
+        # Replaces the user from any previous creation of the namespace (i.e. if the tenant has been reset)
+        tenant.users = {existing for existing in tenant.users if existing.username != user.username}
+        tenant.users.add(user)
+
+    def remove_namespace(self, service: IrodsDockerisedService, tenant: IrodsDockerisedService):
+        zone = service.root_user.zone
+        _run_icommand(service, ["irm", "-rf", f"/{zone}/home/{tenant.namespace}"])
+        _run_icommand(service, ["iadmin", "rmuser", f"{tenant.namespace}#{zone}"])
 
 
 # TODO: Why not use DockerisedServiceControllerTypeBuilder?
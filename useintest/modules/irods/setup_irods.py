@@ -33,7 +33,7 @@ def setup_irods(irods_service_controller: Type[IrodsBaseServiceController]=Irods
 
     # Setup iRODS executables
     ExecutablesController = irods_executables_controllers_and_versions[service.version]
-    icommands_controller = ExecutablesController(service.name, settings_directory)
+    icommands_controller = ExecutablesController(service.name, settings_directory, network=service.network)
     icommands_location = icommands_controller.write_executables_and_authenticate(service.root_user.password)
 
     return icommands_location, service, icommands_controller, icat_controller
@@ -1,2 +1,2 @@
 from useintest.modules.mongo.mongo import mongo_service_controllers, MongoServiceController, Mongo3ServiceController, \
-    MongoLatestDockerisedServiceController, Mongo3DockerisedServiceController, common_setup
+    MongoLatestDockerisedServiceController, Mongo3DockerisedServiceController, MongoTenancy, common_setup
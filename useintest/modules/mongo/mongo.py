@@ -1,11 +1,45 @@
 from useintest.services.builders import DockerisedServiceControllerTypeBuilder
+from useintest.services.models import DockerisedService
+from useintest.services.tenancy import Tenancy
+
+# Newer images only have `mongosh`, older images only have `mongo`
+_MONGO_SHELL_COMMAND = "if command -v mongosh > /dev/null; then exec mongosh --quiet --eval \"$0\"; " \
+                       "else exec mongo --quiet --eval \"$0\"; fi"
+_MONGO_SYSTEM_DATABASES = ["admin", "config", "local"]
+
+
+def _reset_mongo(service: DockerisedService):
+    """
+    Resets the given Mongo service by dropping all databases other than the system databases.
+    :param service: the Mongo service
+    :raises ContainerCommandError: if the databases could not be dropped
+    """
+    service.run_command(["sh", "-c", _MONGO_SHELL_COMMAND,
+                         f"db.getMongo().getDBNames().forEach(function (name) {{ "
+                         f"if ({_MONGO_SYSTEM_DATABASES!r}.indexOf(name) < 0) {{ db.getSiblingDB(name).dropDatabase(); }} "
+                         f"}})"])
+
+
+class MongoTenancy(Tenancy[DockerisedService]):
+    """
+    Gives each tenant of a shared Mongo service its own database, named by the tenant's namespace.
+    """
+    def create_namespace(self, service: DockerisedService, tenant: DockerisedService):
+        # Mongo creates databases when they are first written to
+        pass
+
+    def remove_namespace(self, service: DockerisedService, tenant: DockerisedService):
+        service.run_command(["sh", "-c", _MONGO_SHELL_COMMAND,
+                             f"db.getSiblingDB(\"{tenant.namespace}\").dropDatabase()"])
+
 
 common_setup = {
     "repository": "mongo",
-    "start_log_detector": lambda log_line: "waiting for connections on port" in log_line,
-    "persistent_error_log_detector": lambda log_line: "error creating journal dir" in log_line
-                                                      or "No space left on device" in log_line,
-    "ports": [27017]
+    "start_log_detector": "waiting for connections on port",
+    "persistent_error_log_detector": ["error creating journal dir", "No space left on device"],
+    "ports": [27017],
+    "tmpfs": {"/data/db": "1g"},
+    "resetter": _reset_mongo
 }
 
 Mongo3DockerisedServiceController = DockerisedServiceControllerTypeBuilder(
@@ -0,0 +1,112 @@
+import atexit
+import os
+from threading import Lock
+from typing import Dict, Iterable
+
+from useintest._logging import create_logger
+from useintest.engines import DockerEngine, default_docker_engine, default_engine_scheduler
+from useintest.ownership import get_session_id, get_session_pid, get_owner_labels
+from useintest.reaper import default_reaper
+
+SESSION_NETWORK_ENVIRONMENT_VARIABLE = "USEINTEST_SESSION_NETWORK"
+SESSION_NETWORK_NAME_PREFIX = "useintest-session"
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+logger = create_logger(__name__)
+
+# Engines on which the session's network is known to exist, by name
+_created: Dict[str, DockerEngine] = dict()
+_created_lock = Lock()
+
+
+def is_session_network_enabled() -> bool:
+    """
+    Gets whether services and execution containers join the session's network by default (`USEINTEST_SESSION_NETWORK`).
+    :return: `True` if the session network is used by default
+    """
+    return os.environ.get(SESSION_NETWORK_ENVIRONMENT_VARIABLE, "").strip().lower() in _TRUE_VALUES
+
+
+def get_session_network_name() -> str:
+    """
+    Gets the name of the user-defined bridge network shared by the containers of the session (see
+    `useintest.ownership.get_session_id`), on which containers reach each other by their name.
+    :return: the network name
+    """
+    return f"{SESSION_NETWORK_NAME_PREFIX}-{get_session_id()}"
+
+
+def ensure_session_network(engine: DockerEngine=None) -> str:
+    """
+    Creates the session's network on the given Docker engine, unless it has already been created (by any process of the
+    session).
+    :param engine: the Docker engine (defaults to that configured by the environment)
+    :return: the network name
+    """
+    from docker.errors import APIError, NotFound
+    engine = engine if engine is not None else default_docker_engine
+    name = get_session_network_name()
+    with _created_lock:
+        if engine.name in _created:
+            return name
+        client = engine.get_client()
+        try:
+            client.networks.get(name)
+        except NotFound:
+            try:
+                client.networks.create(name, driver="bridge", labels=get_owner_labels())
+                logger.info(f"Created session network {name} on Docker engine {engine.name}")
+            except APIError as e:
+                # Created by another process of the session in the meantime
+                if e.status_code != 409:
+                    raise
+        _created[engine.name] = engine
+    return name
+
+
+def remove_session_network(engines: Iterable[DockerEngine]=None):
+    """
+    Removes the session's network from the given Docker engines. Networks that still have containers attached are not
+    removed (they are removed as orphans once the session has ended, see `useintest.orphans`).
+    :param engines: the Docker engines (defaults to those configured by the environment and those on which this process
+    has used the network)
+    """
+    from docker.errors import APIError, NotFound
+    if engines is None:
+        with _created_lock:
+            engines = {default_docker_engine, *_created.values()}
+        if default_engine_scheduler is not None:
+            engines.update(default_engine_scheduler.engines)
+    name = get_session_network_name()
+    for engine in engines:
+        with _created_lock:
+            _created.pop(engine.name, None)
+        try:
+            engine.get_client().networks.get(name).remove()
+        except NotFound:
+            pass
+        except APIError as e:
+            logger.warning(f"Could not remove session network {name} from Docker engine {engine.name}: {e}")
+
+
+def _remove_session_network_on_exit():
+    """
+    Removes the session's network on exit, if this process owns the session and the network has been used by any process
+    of it.
+    """
+    with _created_lock:
+        used = len(_created) > 0
+    if get_session_pid() != os.getpid() or not (used or is_session_network_enabled()):
+        return
+    # Containers attached to the network must be removed first
+    default_reaper.flush()
+    try:
+        remove_session_network()
+    except Exception as e:
+        logger.warning(f"Could not remove session network on exit: {e!r}")
+
+
+# Registered on import, before the stopping of services on exit is registered by the controllers, so that it is called
+# after services have been stopped
+atexit.register(_remove_session_network_on_exit)
@@ -0,0 +1,45 @@
+import argparse
+import math
+
+from useintest.orphans.sweeper import sweep_orphans, DEFAULT_SWEEP_CONCURRENCY
+
+
+def _parse_arguments() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Removes the containers, temp directories and networks created by useintest whose owner died "
+                    "without removing them (e.g. test runs that were killed)")
+    parser.add_argument("--dry-run", action="store_true", help="only list the orphans, without removing them")
+    parser.add_argument("--include-reusable", action="store_true",
+                        help="also remove containers that were left running for reuse")
+    parser.add_argument("--max-age", type=float, default=math.inf,
+                        help="seconds after which containers and temp directories owned by processes on other hosts "
+                             "(which cannot be checked) are taken to be orphaned")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_SWEEP_CONCURRENCY,
+                        help="number of temp directories to remove at once")
+    return parser.parse_args()
+
+
+def main():
+    """
+    Sweeps orphans.
+    """
+    arguments = _parse_arguments()
+    result = sweep_orphans(include_reusable=arguments.include_reusable, max_age=arguments.max_age,
+                           dry_run=arguments.dry_run, max_concurrency=arguments.concurrency)
+    action = "Found" if arguments.dry_run else "Removed"
+    for container in result.containers:
+        print(f"{action} orphaned container: {container}")
+    for temp_directory in result.temp_directories:
+        print(f"{action} orphaned temp directory: {temp_directory}")
+    for network in result.networks:
+        print(f"{action} orphaned network: {network}")
+    print(f"{action} {len(result.containers)} container(s), {len(result.temp_directories)} temp directory(s) and "
+          f"{len(result.networks)} network(s)")
+
+
+if __name__ == "__main__":
+    main()
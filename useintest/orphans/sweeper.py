@@ -0,0 +1,187 @@
+import math
+import os
+import shutil
+import socket
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Dict, List, Optional, Iterable, Tuple, TYPE_CHECKING
+
+from useintest._logging import create_logger
+from useintest.common import UseInTestModel, MOUNTABLE_TEMP_DIRECTORY
+from useintest.engines import DockerEngine, default_docker_engine, default_engine_scheduler
+from useintest.ownership import read_owner, OWNER_PID_LABEL, OWNER_HOST_LABEL, OWNER_CREATED_LABEL
+from useintest.reaper import ContainerReaper, default_reaper
+from useintest.services.reuse import REUSE_KEY_LABEL
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+    from docker.models.networks import Network
+
+DEFAULT_SWEEP_CONCURRENCY = 8
+
+# Process start times are only known to the resolution of the kernel's clock ticks
+_PROCESS_START_TIME_TOLERANCE = 1.0
+
+logger = create_logger(__name__)
+
+
+def _get_process_start_time(pid: int) -> Optional[float]:
+    """
+    Gets when the given process started, if it can be found out (only on Linux).
+    :param pid: the process identifier
+    :return: when the process started (seconds since the epoch) or `None` if not known
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # The command name (field 2) can contain spaces but is in brackets
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/stat") as file:
+            boot_time = next(int(line.split()[1]) for line in file if line.startswith("btime "))
+        return boot_time + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+def is_owner_alive(owner_labels: Dict[str, str], max_age: float=math.inf) -> bool:
+    """
+    Gets whether the owner of something with the given owner labels (see `useintest.ownership`) is alive. Owners on
+    other hosts cannot be checked, so they are taken to be alive until what they own is older than the given age.
+    :param owner_labels: the owner labels
+    :param max_age: maximum number of seconds that something owned by a process on another host is expected to exist
+    :return: whether the owner is (taken to be) alive
+    """
+    created_at = float(owner_labels.get(OWNER_CREATED_LABEL, 0))
+    if owner_labels.get(OWNER_HOST_LABEL) != socket.gethostname():
+        return time() - created_at <= max_age
+    pid = int(owner_labels[OWNER_PID_LABEL])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Process exists but belongs to another user
+        pass
+    started_at = _get_process_start_time(pid)
+    # The owner's identifier has been reused if the process with it started after the owner created something
+    return started_at is None or started_at <= created_at + _PROCESS_START_TIME_TOLERANCE
+
+
+def find_orphaned_containers(include_reusable: bool=False, max_age: float=math.inf,
+                             engine: DockerEngine=None) -> List["Container"]:
+    """
+    Finds the containers created by `useintest` whose owner has died without removing them.
+    :param include_reusable: whether to include containers that were left running for reuse (see
+    `DockerisedServiceController.reuse`), which outlive their owner by design
+    :param max_age: see `is_owner_alive`
+    :param engine: the Docker engine on which to look for containers (defaults to that configured by the environment)
+    :return: the orphaned containers
+    """
+    engine = engine if engine is not None else default_docker_engine
+    orphans = []
+    for container in engine.get_client().containers.list(all=True, filters={"label": OWNER_PID_LABEL}):
+        labels = container.labels
+        if OWNER_PID_LABEL not in labels or (not include_reusable and REUSE_KEY_LABEL in labels):
+            continue
+        if not is_owner_alive(labels, max_age):
+            orphans.append(container)
+    return orphans
+
+
+def find_orphaned_networks(max_age: float=math.inf, engine: DockerEngine=None) -> List["Network"]:
+    """
+    Finds the networks created by `useintest` (see `useintest.networks`) whose owner has died without removing them.
+    :param max_age: see `is_owner_alive`
+    :param engine: the Docker engine on which to look for networks (defaults to that configured by the environment)
+    :return: the orphaned networks
+    """
+    engine = engine if engine is not None else default_docker_engine
+    orphans = []
+    for network in engine.get_client().networks.list(filters={"label": OWNER_PID_LABEL}):
+        labels = network.attrs.get("Labels") or {}
+        if OWNER_PID_LABEL in labels and not is_owner_alive(labels, max_age):
+            orphans.append(network)
+    return orphans
+
+
+def find_orphaned_temp_directories(locations: Iterable[str]=None, max_age: float=math.inf) -> List[str]:
+    """
+    Finds the temp directories created by `useintest` whose owner has died without removing them.
+    :param locations: the directories in which temp directories are created (defaults to those used by `useintest`)
+    :param max_age: see `is_owner_alive`
+    :return: the locations of the orphaned temp directories
+    """
+    if locations is None:
+        locations = {MOUNTABLE_TEMP_DIRECTORY, tempfile.gettempdir()}
+    orphans = []
+    for location in set(locations):
+        try:
+            entries = list(os.scandir(location))
+        except OSError as e:
+            logger.warning(f"Could not look for orphaned temp directories in {location}: {e}")
+            continue
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            owner_labels = read_owner(entry.path)
+            if owner_labels is not None and not is_owner_alive(owner_labels, max_age):
+                orphans.append(entry.path)
+    return orphans
+
+
+class SweepResult(UseInTestModel):
+    """
+    Orphans found, and removed unless only looked for, by a sweep.
+    """
+    def __init__(self, containers: List[str], temp_directories: List[str], networks: List[str]=None):
+        """
+        Constructor.
+        :param containers: the identifiers of the orphaned containers
+        :param temp_directories: the locations of the orphaned temp directories
+        :param networks: the names of the orphaned networks
+        """
+        self.containers = containers
+        self.temp_directories = temp_directories
+        self.networks = networks if networks is not None else []
+
+
+def sweep_orphans(include_reusable: bool=False, max_age: float=math.inf, temp_locations: Iterable[str]=None,
+                  dry_run: bool=False, reaper: ContainerReaper=None, max_concurrency: int=DEFAULT_SWEEP_CONCURRENCY,
+                  engines: Iterable[DockerEngine]=None) -> SweepResult:
+    """
+    Finds and removes, in parallel, the containers (along with their anonymous volumes), temp directories and networks
+    created by `useintest` whose owner died without removing them (e.g. because it was killed).
+    :param include_reusable: see `find_orphaned_containers`
+    :param max_age: see `is_owner_alive`
+    :param temp_locations: see `find_orphaned_temp_directories`
+    :param dry_run: whether to only find the orphans, without removing them
+    :param reaper: reaper that removes the orphaned containers (defaults to the reaper shared by all controllers)
+    :param max_concurrency: maximum number of temp directories to remove in parallel
+    :param engines: the Docker engines on which to look for containers and networks (defaults to those configured by the
+    environment, see `DockerisedServiceController.engine_scheduler`)
+    :return: the orphans found
+    """
+    from docker.errors import APIError
+    reaper = reaper if reaper is not None else default_reaper
+    if engines is None:
+        engines = default_engine_scheduler.engines if default_engine_scheduler is not None else [default_docker_engine]
+    containers: List[Tuple[str, DockerEngine]] = [
+        (container.id, engine) for engine in engines
+        for container in find_orphaned_containers(include_reusable, max_age, engine)]
+    networks = [(network, engine) for engine in engines for network in find_orphaned_networks(max_age, engine)]
+    temp_directories = find_orphaned_temp_directories(temp_locations, max_age)
+    if not dry_run:
+        removals = [reaper.remove(container, kill=True, engine=engine) for container, engine in containers]
+        if len(temp_directories) > 0:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(temp_directories))) as executor:
+                list(executor.map(lambda location: shutil.rmtree(location, ignore_errors=True), temp_directories))
+        for removal in removals:
+            removal.result()
+        # Networks can only be removed once the containers attached to them have been
+        for network, engine in networks:
+            try:
+                network.remove()
+            except APIError as e:
+                logger.warning(f"Could not remove network {network.name} from Docker engine {engine.name}: {e}")
+    return SweepResult([container for container, _ in containers], temp_directories,
+                       [network.name for network, _ in networks])
@@ -0,0 +1,83 @@
+import json
+import os
+import socket
+from time import time
+from typing import Dict, Optional
+from uuid import uuid4
+
+SESSION_ID_ENVIRONMENT_VARIABLE = "USEINTEST_SESSION_ID"
+SESSION_PID_ENVIRONMENT_VARIABLE = "USEINTEST_SESSION_PID"
+
+OWNER_PID_LABEL = "useintest.owner.pid"
+OWNER_HOST_LABEL = "useintest.owner.host"
+OWNER_SESSION_LABEL = "useintest.owner.session"
+OWNER_CREATED_LABEL = "useintest.owner.created"
+
+OWNER_FILE_NAME = ".useintest-owner.json"
+
+_PROCESS_SESSION_ID = uuid4().hex
+
+
+def get_session_id() -> str:
+    """
+    Gets the identifier of the session that owns what this process creates. Processes share a session if it is set in
+    their environment (`USEINTEST_SESSION_ID`, e.g. by the pytest plugin for pytest-xdist workers), otherwise each
+    process is its own session.
+    :return: the session identifier
+    """
+    return os.environ.get(SESSION_ID_ENVIRONMENT_VARIABLE, _PROCESS_SESSION_ID)
+
+
+def get_session_pid() -> int:
+    """
+    Gets the identifier of the process whose lifetime bounds the session (`USEINTEST_SESSION_PID`, defaults to this
+    process).
+    :return: the process identifier
+    """
+    return int(os.environ.get(SESSION_PID_ENVIRONMENT_VARIABLE, os.getpid()))
+
+
+def start_session():
+    """
+    Starts a session that is shared by this process and the processes it later starts (e.g. pytest-xdist workers), so
+    that what they create is owned by this process. Does nothing if this process is already part of a session.
+    """
+    if SESSION_ID_ENVIRONMENT_VARIABLE not in os.environ:
+        os.environ[SESSION_ID_ENVIRONMENT_VARIABLE] = _PROCESS_SESSION_ID
+        os.environ[SESSION_PID_ENVIRONMENT_VARIABLE] = str(os.getpid())
+
+
+def get_owner_labels() -> Dict[str, str]:
+    """
+    Gets the labels that identify the owner of something being created now (e.g. a container), so that it can be found
+    and removed if its owner dies without removing it.
+    :return: the owner labels
+    """
+    return {
+        OWNER_PID_LABEL: str(get_session_pid()),
+        OWNER_HOST_LABEL: socket.gethostname(),
+        OWNER_SESSION_LABEL: get_session_id(),
+        OWNER_CREATED_LABEL: str(time())
+    }
+
+
+def mark_owned(directory: str):
+    """
+    Marks the given (temp) directory with the owner labels, in a file within it.
+    :param directory: the directory
+    """
+    with open(os.path.join(directory, OWNER_FILE_NAME), "w") as file:
+        json.dump(get_owner_labels(), file)
+
+
+def read_owner(directory: str) -> Optional[Dict[str, str]]:
+    """
+    Reads the owner labels of the given directory, marked by `mark_owned`.
+    :param directory: the directory
+    :return: the owner labels or `None` if the directory is not marked
+    """
+    try:
+        with open(os.path.join(directory, OWNER_FILE_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,374 @@
+import importlib
+import inspect
+import os
+import pickle
+import pkgutil
+import re
+import shutil
+import tempfile
+import types
+from contextlib import contextmanager
+from threading import Lock, Thread
+from time import monotonic
+from typing import Dict, Type, Iterator, Callable, Any, Optional
+
+import pytest
+
+import useintest.modules
+from useintest._logging import create_logger
+from useintest.executables.controllers import ExecutablesController
+from useintest.orphans.sweeper import sweep_orphans
+from useintest.ownership import start_session, mark_owned
+from useintest.services.controllers import ServiceController
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FIXTURES_INI_OPTION = "useintest_fixtures"
+SWEEP_ORPHANS_INI_OPTION = "useintest_sweep_orphans"
+SCOPES = ("function", "module", "session")
+
+_PLUGIN_NAME = "useintest-controllers"
+_FIXTURES_PLUGIN_NAME = "useintest-fixtures"
+_CONTROLLERS_ATTRIBUTE_PATTERN = re.compile(r".+_(service|executables?)_controllers$")
+_CONTROLLER_NAME_PATTERN = re.compile(r"^(.+?)(Dockerised)?(ServiceController|ExecutablesController)$")
+_SHARED_SERVICE_DIRECTORY_PREFIX = "useintest-shared-services-"
+_SHARED_SERVICE_DIRECTORY_KEY = "useintest_shared_services"
+_WORKER_OUTPUT_KEY = "useintest_timings"
+
+logger = create_logger(__name__)
+
+
+def _to_snake_case(name: str) -> str:
+    """
+    Converts the given camel case name to snake case.
+    :param name: the camel case name
+    :return: the snake case name
+    """
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+
+def _get_fixture_base_name(controller_name: str) -> str:
+    """
+    Gets the name of the function-scoped fixture for the controller with the given name.
+    :param controller_name: the name of the controller (e.g. "MongoServiceController")
+    :return: the fixture name (e.g. "mongo_service")
+    """
+    match = _CONTROLLER_NAME_PATTERN.match(controller_name)
+    if match is None:
+        return _to_snake_case(controller_name)
+    suffix = "service" if match.group(3) == "ServiceController" else "executables_controller"
+    return f"{_to_snake_case(match.group(1))}_{suffix}"
+
+
+def get_fixture_name(base_name: str, scope: str) -> str:
+    """
+    Gets the name of the fixture with the given base name and scope.
+    :param base_name: name of the function-scoped fixture (e.g. "mongo_service")
+    :param scope: the scope of the fixture
+    :return: the name of the fixture (e.g. "mongo_service_session")
+    """
+    return base_name if scope == "function" else f"{base_name}_{scope}"
+
+
+def discover_controllers() -> Dict[str, Type]:
+    """
+    Discovers the service and executables controllers in the sets of controllers (e.g. `mongo_service_controllers`)
+    defined by each of `useintest.modules`. Modules that cannot be imported are skipped.
+    :return: the controllers, by the base name of their fixtures
+    """
+    controllers = {}
+    for module_info in pkgutil.iter_modules(useintest.modules.__path__):
+        module_name = f"{useintest.modules.__name__}.{module_info.name}"
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Could not import {module_name} to discover its controllers: {e!r}")
+            continue
+        for attribute_name, value in sorted(vars(module).items()):
+            if not _CONTROLLERS_ATTRIBUTE_PATTERN.match(attribute_name):
+                continue
+            for controller in value:
+                # Fixtures are named after the names by which the module exports the controller (e.g. aliases)
+                names = {name for name, exported in vars(module).items()
+                         if exported is controller and _CONTROLLER_NAME_PATTERN.match(name)}
+                for name in names if len(names) > 0 else {controller.__name__}:
+                    controllers.setdefault(_get_fixture_base_name(name), controller)
+    return controllers
+
+
+@contextmanager
+def _file_lock(location: str) -> Iterator[None]:
+    """
+    Context manager that holds an exclusive lock on the given file, which is shared between processes.
+    :param location: location of the lock file
+    """
+    with open(location, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class ServiceTimings:
+    """
+    Time spent starting and stopping the services (or setting up executables) of a fixture.
+    """
+    def __init__(self, started: int=0, start_seconds: float=0.0, stop_seconds: float=0.0):
+        self.started = started
+        self.start_seconds = start_seconds
+        self.stop_seconds = stop_seconds
+
+    def merge(self, other: "ServiceTimings"):
+        """
+        Adds the given timings to these timings.
+        :param other: the timings to add
+        """
+        self.started += other.started
+        self.start_seconds += other.start_seconds
+        self.stop_seconds += other.stop_seconds
+
+
+class UseInTestPlugin:
+    """
+    Pytest plugin that registers fixtures for the controllers of `useintest.modules` in each scope.
+
+    Fixtures of service controllers give a started service, which is stopped at the end of the fixture's scope (e.g.
+    `mongo_service`, `mongo_service_module` and `mongo_service_session`). Fixtures of executables controllers (that can
+    be created without arguments) give the controller, which is torn down at the end of the fixture's scope (e.g.
+    `samtools_executables_controller`). Under pytest-xdist, session-scoped services are started once and shared by all
+    workers, then stopped once all workers have finished.
+    """
+    def __init__(self, config: pytest.Config, controllers: Dict[str, Type]):
+        """
+        Constructor.
+        :param config: the pytest configuration
+        :param controllers: the controllers to register fixtures for, by the base name of their fixtures
+        """
+        self.config = config
+        self.controllers = controllers
+        self.timings: Dict[str, ServiceTimings] = {}
+        self.fixtures = types.ModuleType(_FIXTURES_PLUGIN_NAME)
+        self._timings_lock = Lock()
+        # Created by the controlling process when the first worker is configured, then given to each worker
+        self._shared_service_directory: Optional[str] = \
+            config.workerinput.get(_SHARED_SERVICE_DIRECTORY_KEY) if self.is_worker else None
+        for base_name, controller in controllers.items():
+            for scope in SCOPES:
+                if issubclass(controller, ServiceController):
+                    fixture = self._create_service_fixture(base_name, controller, scope)
+                elif issubclass(controller, ExecutablesController) and _can_create_without_arguments(controller):
+                    fixture = self._create_executables_controller_fixture(base_name, controller, scope)
+                else:
+                    continue
+                name = get_fixture_name(base_name, scope)
+                setattr(self.fixtures, name, pytest.fixture(scope=scope, name=name)(fixture))
+
+    @property
+    def is_worker(self) -> bool:
+        """
+        Whether pytest is running as a pytest-xdist worker.
+        :return: whether running as a worker
+        """
+        return hasattr(self.config, "workerinput")
+
+    @property
+    def is_distributing(self) -> bool:
+        """
+        Whether pytest is distributing tests to pytest-xdist workers (from the controlling process).
+        :return: whether distributing tests
+        """
+        return not self.is_worker and getattr(self.config.option, "dist", "no") != "no"
+
+    def record(self, base_name: str, timings: ServiceTimings):
+        """
+        Records time spent on the services of the fixture with the given base name.
+        :param base_name: the base name of the fixture
+        :param timings: the time spent
+        """
+        with self._timings_lock:
+            self.timings.setdefault(base_name, ServiceTimings()).merge(timings)
+
+    def pytest_plugin_registered(self, plugin: Any, manager: pytest.PytestPluginManager):
+        # Pytest only finds fixtures defined on (the types of) plugins, so they are registered as a plugin of their own
+        if plugin is self and not manager.is_registered(self.fixtures):
+            manager.register(self.fixtures, f"{_FIXTURES_PLUGIN_NAME}-{id(self)}")
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        if self.is_worker:
+            self.config.workeroutput[_WORKER_OUTPUT_KEY] = {
+                base_name: vars(timings) for base_name, timings in self.timings.items()}
+        elif self.is_distributing:
+            self._stop_shared_services()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node: Any):
+        if fcntl is None:
+            return
+        if self._shared_service_directory is None:
+            self._shared_service_directory = tempfile.mkdtemp(prefix=_SHARED_SERVICE_DIRECTORY_PREFIX)
+            mark_owned(self._shared_service_directory)
+        node.workerinput[_SHARED_SERVICE_DIRECTORY_KEY] = self._shared_service_directory
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node: Any, error: Any):
+        for base_name, timings in getattr(node, "workeroutput", {}).get(_WORKER_OUTPUT_KEY, {}).items():
+            self.record(base_name, ServiceTimings(**timings))
+
+    def pytest_terminal_summary(self, terminalreporter: Any):
+        if self.is_worker or len(self.timings) == 0:
+            return
+        terminalreporter.write_sep("=", "useintest services")
+        for base_name, timings in sorted(self.timings.items(), key=lambda item: -item[1].start_seconds):
+            terminalreporter.write_line(
+                f"{base_name}: {timings.started} started in {timings.start_seconds:.2f}s, "
+                f"stopped in {timings.stop_seconds:.2f}s")
+
+    def _create_service_fixture(self, base_name: str, controller_type: Type[ServiceController], scope: str) \
+            -> Callable:
+        """
+        Creates the fixture function of the given service controller in the given scope.
+        :param base_name: the base name of the fixture
+        :param controller_type: the type of service controller
+        :param scope: the scope of the fixture
+        :return: the fixture function
+        """
+        def service_fixture() -> Iterator:
+            if scope == "session" and self._shared_service_directory is not None:
+                yield self._get_shared_service(base_name, controller_type)
+                return
+            controller = controller_type()
+            started_at = monotonic()
+            service = controller.start_service()
+            self.record(base_name, ServiceTimings(started=1, start_seconds=monotonic() - started_at))
+            try:
+                yield service
+            finally:
+                started_at = monotonic()
+                controller.stop_service(service)
+                self.record(base_name, ServiceTimings(stop_seconds=monotonic() - started_at))
+
+        service_fixture.__doc__ = f"Service started by `{controller_type.__name__}` ({scope} scope)."
+        return service_fixture
+
+    def _create_executables_controller_fixture(self, base_name: str, controller_type: Type[ExecutablesController],
+                                               scope: str) -> Callable:
+        """
+        Creates the fixture function of the given executables controller in the given scope.
+        :param base_name: the base name of the fixture
+        :param controller_type: the type of executables controller
+        :param scope: the scope of the fixture
+        :return: the fixture function
+        """
+        def executables_controller_fixture() -> Iterator:
+            started_at = monotonic()
+            controller = controller_type()
+            self.record(base_name, ServiceTimings(started=1, start_seconds=monotonic() - started_at))
+            try:
+                yield controller
+            finally:
+                started_at = monotonic()
+                controller.tear_down()
+                self.record(base_name, ServiceTimings(stop_seconds=monotonic() - started_at))
+
+        executables_controller_fixture.__doc__ = f"`{controller_type.__name__}` ({scope} scope)."
+        return executables_controller_fixture
+
+    def _get_shared_service(self, base_name: str, controller_type: Type[ServiceController]) -> Any:
+        """
+        Gets the session-scoped service of the given controller that is shared by all pytest-xdist workers, starting it
+        if no worker has. The service is stopped by the controlling process once all workers have finished.
+        :param base_name: the base name of the service's fixture
+        :param controller_type: the type of service controller
+        :return: the shared service
+        """
+        location = os.path.join(self._shared_service_directory, f"{base_name}.pickle")
+        with _file_lock(f"{location}.lock"):
+            if os.path.exists(location):
+                with open(location, "rb") as file:
+                    return pickle.load(file)
+            started_at = monotonic()
+            controller = controller_type()
+            # Stopped by the controlling process, rather than when this worker exits
+            controller.stop_on_exit = False
+            service = controller.start_service()
+            self.record(base_name, ServiceTimings(started=1, start_seconds=monotonic() - started_at))
+            with open(location, "wb") as file:
+                pickle.dump(service, file)
+            return service
+
+    def _stop_shared_services(self):
+        """
+        Stops the session-scoped services that have been shared by pytest-xdist workers.
+        """
+        directory = self._shared_service_directory
+        if directory is None:
+            return
+        for file_name in sorted(os.listdir(directory)):
+            base_name, extension = os.path.splitext(file_name)
+            if extension != ".pickle" or base_name not in self.controllers:
+                continue
+            location = os.path.join(directory, file_name)
+            try:
+                with open(location, "rb") as file:
+                    service = pickle.load(file)
+                started_at = monotonic()
+                self.controllers[base_name]().stop_service(service)
+                self.record(base_name, ServiceTimings(stop_seconds=monotonic() - started_at))
+            except Exception as e:
+                logger.warning(f"Could not stop shared service {base_name}: {e!r}")
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _can_create_without_arguments(controller_type: Type) -> bool:
+    """
+    Gets whether the given type of controller can be created without arguments.
+    :param controller_type: the type of controller
+    :return: whether the controller can be created without arguments
+    """
+    for cls in controller_type.__mro__:
+        if "__init__" not in vars(cls):
+            continue
+        parameters = list(inspect.signature(vars(cls)["__init__"]).parameters.values())[1:]
+        # Constructors of built types pass their arguments on to those of their superclasses
+        if all(parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+               for parameter in parameters):
+            continue
+        return all(parameter.default is not inspect.Parameter.empty
+                   or parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+                   for parameter in parameters)
+    return True
+
+
+def _sweep_orphans():
+    """
+    Sweeps the orphans left by earlier sessions, logging (rather than raising) any error.
+    """
+    try:
+        result = sweep_orphans()
+        if len(result.containers) + len(result.temp_directories) > 0:
+            logger.info(f"Removed {len(result.containers)} orphaned container(s) and {len(result.temp_directories)} "
+                        f"orphaned temp directory(s)")
+    except Exception as e:
+        logger.warning(f"Could not sweep orphans: {e!r}")
+
+
+def pytest_addoption(parser: pytest.Parser):
+    parser.addini(FIXTURES_INI_OPTION, "Whether to register fixtures for the controllers of useintest's modules",
+                  type="bool", default=True)
+    parser.addini(SWEEP_ORPHANS_INI_OPTION, "Whether to remove, in the background at the start of the session, the "
+                                            "containers and temp directories left by runs that died",
+                  type="bool", default=False)
+
+
+def pytest_configure(config: pytest.Config):
+    if not hasattr(config, "workerinput"):
+        # What pytest-xdist workers create is owned by this process, which outlives them
+        start_session()
+        if config.getini(SWEEP_ORPHANS_INI_OPTION):
+            Thread(target=_sweep_orphans, daemon=True).start()
+    if config.getini(FIXTURES_INI_OPTION):
+        config.pluginmanager.register(UseInTestPlugin(config, discover_controllers()), _PLUGIN_NAME)
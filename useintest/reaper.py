@@ -0,0 +1,104 @@
+import atexit
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from threading import Lock
+from time import monotonic
+from typing import Set, Dict, TYPE_CHECKING
+
+from useintest._logging import create_logger
+from useintest.common import get_docker_client
+from useintest.metrics import STOP_CONTAINER_PHASE, REMOVE_CONTAINER_PHASE
+
+if TYPE_CHECKING:
+    from useintest.engines import DockerEngine
+
+DEFAULT_REAPER_MAX_WORKERS = 8
+DEFAULT_STOP_TIMEOUT = 10
+
+logger = create_logger(__name__)
+
+
+class ContainerReaper:
+    """
+    Stops and removes containers in the background.
+    """
+    def __init__(self, max_workers: int=DEFAULT_REAPER_MAX_WORKERS, stop_timeout: int=DEFAULT_STOP_TIMEOUT):
+        """
+        Constructor.
+        :param max_workers: maximum number of containers to remove in parallel
+        :param stop_timeout: number of seconds to wait for a container to stop (when not killing it) before it is killed
+        """
+        self.stop_timeout = stop_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending: Set[Future] = set()
+        self._lock = Lock()
+
+    def remove(self, container: str, kill: bool=False, engine: "DockerEngine"=None) -> Future:
+        """
+        Removes the given container in the background.
+        :param container: the identifier or name of the container to remove
+        :param kill: whether to kill the container, instead of giving it the chance to stop gracefully
+        :param engine: the Docker engine that the container is on (defaults to that configured by the environment)
+        :return: future that completes once the container has been removed, with the number of seconds spent stopping
+        and removing it
+        """
+        try:
+            future = self._executor.submit(self._remove, container, kill, engine)
+        except RuntimeError:
+            # Work cannot be scheduled once the interpreter has started to shut down (e.g. when stopping services on
+            # exit), so the container is removed straight away
+            future = Future()
+            future.set_result(self._remove(container, kill, engine))
+            return future
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def flush(self, timeout: float=None):
+        """
+        Blocks until all containers that are being removed have been removed.
+        :param timeout: maximum number of seconds to wait
+        """
+        with self._lock:
+            pending = set(self._pending)
+        wait(pending, timeout=timeout)
+
+    def _remove(self, container: str, kill: bool, engine: "DockerEngine"=None) -> Dict[str, float]:
+        """
+        Removes the given container.
+        :param container: the identifier or name of the container to remove
+        :param kill: whether to kill the container, instead of giving it the chance to stop gracefully
+        :param engine: the Docker engine that the container is on (defaults to that configured by the environment)
+        :return: the number of seconds spent in each phase of removing the container
+        """
+        from docker.errors import NotFound, APIError
+        client = engine.get_client() if engine is not None else get_docker_client()
+        timings = {}
+        started_at = monotonic()
+        try:
+            if not kill:
+                client.api.stop(container, timeout=self.stop_timeout)
+                timings[STOP_CONTAINER_PHASE] = monotonic() - started_at
+                started_at = monotonic()
+            # Anonymous volumes (e.g. declared by the image) are removed with the container, so they do not build up
+            client.api.remove_container(container, force=True, v=True)
+            timings[REMOVE_CONTAINER_PHASE] = monotonic() - started_at
+        except NotFound:
+            pass
+        except APIError as e:
+            if e.status_code != 409:
+                logger.warning(f"Could not remove container {container}: {e}")
+        return timings
+
+    def _discard(self, future: Future):
+        """
+        Stops tracking the given future.
+        :param future: the completed future
+        """
+        with self._lock:
+            self._pending.discard(future)
+
+
+default_reaper = ContainerReaper()
+# Registered on import so it is called after anything registered later (e.g. the stopping of services) on exit
+atexit.register(default_reaper.flush)
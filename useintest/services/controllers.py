@@ -1,46 +1,185 @@
+import asyncio
 import atexit
+import calendar
+import functools
+import logging
 import math
-import socket
+import re
 from abc import ABCMeta, abstractmethod
-from inspect import signature
-from typing import Dict, Iterator, List, Callable, TypeVar, Generic, Type, Union, Any
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Iterator, List, Callable, TypeVar, Generic, Type, Union, Any, Set, Tuple, Sequence, \
+    Optional, Iterable, Awaitable, TYPE_CHECKING
 from uuid import uuid4
 
-import requests
-from docker.errors import NotFound
-from requests import Response
-from time import sleep
-from timeout_decorator import timeout_decorator
+from time import strptime
 
 from useintest._logging import create_logger
-from useintest.common import docker_client
-from useintest.executables.common import pull_docker_image
+from useintest.engines import DockerEngine, EngineScheduler, default_docker_engine, default_engine_scheduler
+from useintest.images import ImageCache, default_image_cache
+from useintest.networks import is_session_network_enabled, get_session_network_name, ensure_session_network
+from useintest.metrics import MetricsSink, Timings, default_metrics_sink, START_KIND, STOP_KIND, RESET_KIND, \
+    RESOLVE_IMAGE_PHASE, CREATE_CONTAINER_PHASE, START_CONTAINER_PHASE, READINESS_PHASE, RETRY_PHASE, POST_START_PHASE, \
+    STOP_PHASE, RESET_PHASE, REPLACE_CONTAINER_PHASE, REUSE_PHASE
+from useintest.ownership import get_owner_labels
+from useintest.reaper import ContainerReaper, default_reaper
+from useintest.services.deadlines import Deadline
+from useintest.services.detectors import LogListener, LogDetector, CompiledLogDetector, LogDetection, \
+    combine_log_detectors
 from useintest.services.exceptions import ServiceStartError, TransientServiceStartError, PersistentServiceStartError
-from useintest.services.models import Service, DockerisedService, DockerisedServiceWithUsers
+from useintest.services.health import Healthcheck, ContainerHealthWaiter, to_docker_healthcheck
+from useintest.services.models import Service, DockerisedService, DockerisedServiceWithUsers, ServiceStartResult
+from useintest.services.pools import ServicePool
+from useintest.services.ports import PortAllocator, default_port_allocator
+from useintest.services.reuse import ReusableContainer, get_reuse_key, get_reuse_labels, REUSE_KEY_LABEL, \
+    REUSE_IMAGE_LABEL, REUSE_CREATED_LABEL
+from useintest.services.probes import Probe, HttpProbe, Backoff, DEFAULT_PROBE_TIMEOUT, wait_until_probe_succeeds, \
+    wait_until_probe_succeeds_async
+from useintest.services.snapshots import get_snapshot_key, get_snapshot, create_snapshot
+from useintest.services.tenancy import Tenancy, SharedService
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+    from requests import Response
 
 ServiceType = TypeVar("ServiceType", bound=Service)
 DockerisedServiceType = TypeVar("DockerisedServiceType", bound=DockerisedService)
 DockerisedServiceWithUsersType = TypeVar("DockerisedServiceWithUsersType", bound=DockerisedServiceWithUsers)
-LogListener = Union[Callable[[str, DockerisedService], bool], Callable[[str], bool]]
 
 logger = create_logger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 4
+
 _DOCKER_LOG_ENCODING = "utf-8"
+_DOCKER_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+_RUNNING_CONTAINER_STATUSES = {"created", "running", "restarting"}
+_ASYNC_POLL_INTERVAL = 0.1
+# Services run out of space quickly when their data is written to size-limited tmpfs mounts
+_NO_SPACE_LOG_DETECTOR = re.compile("no space left on device|enospc", re.IGNORECASE)
+
+
+def _close_log_stream(log_stream: Any):
+    """
+    Closes the given log stream, if it can be closed.
+    :param log_stream: the log stream returned by docker-py
+    """
+    close = getattr(log_stream, "close", None)
+    if close is not None:
+        try:
+            close()
+        except (OSError, ValueError, AttributeError) as e:
+            logger.debug(f"Could not close log stream: {e!r}")
+
+
+def _wait_for_all(waits: Sequence[Callable[[Deadline], Any]], deadline: Deadline):
+    """
+    Blocks until all of the given waits, which are run at the same time, have returned. If a wait raises an error, the
+    others are cancelled (via the deadline they are given) and the error is raised.
+    :param waits: the waits, which are given the deadline by which they must complete
+    :param deadline: the deadline by which all the waits must complete
+    :raises TimeoutError: raised if the waits have not completed by the deadline
+    """
+    if len(waits) <= 1:
+        for wait in waits:
+            wait(deadline)
+        return
+
+    cancellable_deadline = Deadline(deadline.remaining)
+    errors: List[BaseException] = []
+    errors_lock = Lock()
+
+    def run(wait: Callable[[Deadline], Any]):
+        try:
+            wait(cancellable_deadline)
+        except BaseException as e:
+            with errors_lock:
+                errors.append(e)
+            cancellable_deadline.cancel()
+
+    threads = [Thread(target=run, args=(wait, ), daemon=True) for wait in waits[1:]]
+    for thread in threads:
+        thread.start()
+    run(waits[0])
+    for thread in threads:
+        thread.join()
+    if len(errors) > 0:
+        # The first error is the cause of any others
+        raise errors[0]
+
+
+async def _wait_for_all_async(waits: Sequence[Awaitable]):
+    """
+    Waits until all of the given waits, which are run at the same time, have completed. If a wait raises an error, the
+    others are cancelled and the error is raised.
+    :param waits: the waits
+    """
+    if len(waits) == 0:
+        return
+    tasks = [asyncio.ensure_future(wait) for wait in waits]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _register_stop_on_exit(controller: "ServiceController", service: Service):
+    """
+    Registers the given service to be stopped by the given controller on exit.
+    :param controller: the controller of the service
+    :param service: the service to stop on exit
+    """
+    with _services_to_stop_on_exit_lock:
+        _services_to_stop_on_exit[service] = controller
 
 
-def _get_open_port() -> int:
+def _unregister_stop_on_exit(service: Service):
     """
-    Gets a PORT that will (probably) be available on the machine.
-    It is possible that in-between the time in which the open PORT of found and when it is used, another process may
-    bind to it instead.
-    :return: the (probably) available PORT
+    Unregisters the given service from being stopped on exit.
+    :param service: the service not to stop on exit
     """
-    free_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    free_socket.bind(("", 0))
-    free_socket.listen(1)
-    port = free_socket.getsockname()[1]
-    free_socket.close()
-    return port
+    with _services_to_stop_on_exit_lock:
+        _services_to_stop_on_exit.pop(service, None)
+
+
+def _stop_services_on_exit():
+    """
+    Stops, in parallel, all services that have been registered to be stopped on exit.
+    """
+    with _services_to_stop_on_exit_lock:
+        to_stop = list(_services_to_stop_on_exit.items())
+        _services_to_stop_on_exit.clear()
+    if len(to_stop) == 0:
+        return
+    # Threads are used directly, as executors cannot be used once the interpreter has started to shut down
+    remaining = iter(to_stop)
+    remaining_lock = Lock()
+
+    def stop_remaining():
+        while True:
+            with remaining_lock:
+                service, controller = next(remaining, (None, None))
+            if service is None:
+                return
+            try:
+                controller.stop_service(service)
+            except Exception as e:
+                logger.warning(f"Could not stop service on exit: {e!r}")
+
+    threads = [Thread(target=stop_remaining) for _ in range(min(DEFAULT_MAX_CONCURRENCY, len(to_stop)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    default_reaper.flush()
+
+
+_services_to_stop_on_exit: Dict[Service, "ServiceController"] = dict()
+_services_to_stop_on_exit_lock = Lock()
+atexit.register(_stop_services_on_exit)
 
 
 class ServiceController(Generic[ServiceType], metaclass=ABCMeta):
@@ -71,6 +210,51 @@ class ServiceController(Generic[ServiceType], metaclass=ABCMeta):
         :param service: model of the service to stop
         """
 
+    def start_services(self, number: int=None, runtime_configurations: Sequence[Dict]=None,
+                       max_concurrency: int=DEFAULT_MAX_CONCURRENCY) -> List[ServiceStartResult[ServiceType]]:
+        """
+        Starts a number of services in parallel.
+        :param number: the number of services to start (defaults to the number of runtime configurations given)
+        :param runtime_configurations: additional runtime configuration for each of the services to start
+        :param max_concurrency: the maximum number of services to start at the same time
+        :return: the result of starting each service, in the same order as any given runtime configurations
+        """
+        if runtime_configurations is None:
+            if number is None:
+                raise ValueError("Either the number of services or their runtime configurations must be given")
+            runtime_configurations = [None] * number
+        elif number is not None and number != len(runtime_configurations):
+            raise ValueError(f"Number of services to start ({number}) does not match the number of runtime "
+                             f"configurations given ({len(runtime_configurations)})")
+
+        def start(runtime_configuration: Optional[Dict]) -> ServiceStartResult[ServiceType]:
+            try:
+                if runtime_configuration is None:
+                    return ServiceStartResult(service=self.start_service())
+                return ServiceStartResult(service=self.start_service(runtime_configuration))
+            except Exception as e:
+                logger.warning(f"Failed to start service: {e!r}")
+                return ServiceStartResult(error=e)
+
+        if len(runtime_configurations) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(runtime_configurations))) as executor:
+            return list(executor.map(start, runtime_configurations))
+
+    def stop_services(self, services: Iterable[ServiceType], max_concurrency: int=DEFAULT_MAX_CONCURRENCY):
+        """
+        Stops the given services in parallel. All services are attempted to be stopped before any error is raised.
+        :param services: models of the services to stop
+        :param max_concurrency: the maximum number of services to stop at the same time
+        """
+        services = list(services)
+        if len(services) == 0:
+            return
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(services))) as executor:
+            futures = [executor.submit(self.stop_service, service) for service in services]
+        for future in futures:
+            future.result()
+
 
 class ContainerisedServiceController(Generic[ServiceType], ServiceController[ServiceType], metaclass=ABCMeta):
     """
@@ -85,14 +269,17 @@ class ContainerisedServiceController(Generic[ServiceType], ServiceController[Ser
         """
 
     @abstractmethod
-    def _stop(self, service: Service):
+    def _stop(self, service: Service) -> Optional[Future]:
         """
         Stops the given container.
         :param service: model of the service to stop
+        :return: (optional) future that completes, with the number of seconds spent in each phase of stopping, once the
+        container has stopped (for containers that are stopped in the background)
         """
 
     def __init__(self, service_model: Type[ServiceType], start_timeout: float=math.inf, start_tries: int=10,
-                 stop_on_exit: bool=True, startup_monitor: Callable[[ServiceType], bool]=None):
+                 stop_on_exit: bool=True, startup_monitor: Callable[[ServiceType], bool]=None,
+                 resetter: Callable[[ServiceType], None]=None, metrics_sink: MetricsSink=None):
         """
         Constructor.
         :param stop_on_exit: see `Container.__init__`
@@ -102,53 +289,161 @@ class ContainerisedServiceController(Generic[ServiceType], ServiceController[Ser
         :param stop_on_exit: whether to stop all started containers on exit
         :param startup_monitor: callable that should block until the service, given as the first parameter is known to
         have started and is ready for use. Should raise a `ServiceStartException` if service is not going to start
+        :param resetter: callable that resets the service, given as the first parameter, in place to the state it was in
+        once started (e.g. by dropping all databases). Services are reset by replacing their container if not set
+        :param metrics_sink: sink to which the timings of starting, stopping and resetting services are recorded
+        (defaults to the sink configured by the environment, if any)
         """
         super().__init__(service_model)
         self.start_timeout = start_timeout
         self.start_tries = start_tries
         self.stop_on_exit = stop_on_exit
         self.startup_monitor = startup_monitor
+        self.resetter = resetter
+        self.metrics_sink = metrics_sink if metrics_sink is not None else default_metrics_sink
+        self._runtime_configurations: Dict[Service, Dict] = dict()
 
     def start_service(self, runtime_configuration: Dict=None) -> ServiceType:
-        service = self._service_model()
+        return self._start_new_service(runtime_configuration)
+
+    def stop_service(self, service: ServiceType):
+        _unregister_stop_on_exit(service)
+        self._runtime_configurations.pop(service, None)
+        timings = Timings()
+        service.stop_timings = timings
+        try:
+            with timings.time(STOP_PHASE):
+                stopping = self._stop(service)
+        except BaseException:
+            self._record_timings(STOP_KIND, timings, succeeded=False)
+            raise
+        if stopping is None:
+            self._record_timings(STOP_KIND, timings, succeeded=True)
+        else:
+            stopping.add_done_callback(functools.partial(self._record_background_stop_timings, timings))
+
+    def reset_service(self, service: ServiceType):
+        """
+        Resets the given service to the state it was in once started, so that it can be reused (e.g. by the next test)
+        rather than a new service being started. The service is reset in place by the `resetter`, if there is one.
+        Otherwise, or if the resetter fails, the service's container is replaced, which changes its name and ports.
+        :param service: model of the service to reset
+        :raises ServiceStartException: the service's container had to be replaced and the new container could not be
+        started
+        """
+        timings = Timings()
+        if self.resetter is not None:
+            try:
+                with timings.time(RESET_PHASE):
+                    self.resetter(service)
+                self._record_timings(RESET_KIND, timings, succeeded=True)
+                return
+            except Exception as e:
+                logger.warning(f"Could not reset service in place, replacing its container instead: {e!r}")
+        try:
+            with timings.time(REPLACE_CONTAINER_PHASE):
+                self._stop(service)
+                self._start_new_service(self._runtime_configurations.get(service), service=service)
+        except BaseException:
+            self._record_timings(RESET_KIND, timings, succeeded=False)
+            raise
+        self._record_timings(RESET_KIND, timings, succeeded=True)
+
+    def _start_new_service(self, runtime_configuration: Dict=None, service: ServiceType=None) -> ServiceType:
+        """
+        Starts a new containerised service, retrying as configured.
+        :param runtime_configuration: additional runtime configuration
+        :param service: (optional) model of a stopped service to start again, instead of a new model
+        :raises ServiceStartException: service could not be started (see logs for more information)
+        :return: model of the started service
+        """
+        if service is None:
+            service = self._service_model()
         assert service is not None
+        timings = Timings()
+        service.start_timings = timings
         if self.stop_on_exit:
-            atexit.register(self.stop_service, service)
+            _register_stop_on_exit(self, service)
 
-        tries = 0
-        while tries < self.start_tries:
-            if tries > 0:
-                self._stop(service)
-            self._start(service, runtime_configuration if runtime_configuration is not None else {})
-            try:
-                if self.start_timeout is not math.inf:
-                    @timeout_decorator.timeout(self.start_timeout, timeout_exception=TimeoutError)
-                    def _wrapped_wait_until_started(service: ServiceType) -> bool:
-                        return self._wait_until_started(service)
-                    _wrapped_wait_until_started(service)
-                else:
-                    self._wait_until_started(service)
-                return service
-            except TimeoutError as e:
-                logger.warning(e)
-            except TransientServiceStartError as e:
-                logger.warning(e)
-            tries += 1
+        try:
+            while timings.tries < self.start_tries:
+                if timings.tries > 0:
+                    with timings.time(RETRY_PHASE):
+                        self._stop(service)
+                timings.tries += 1
+                try:
+                    self._start(service, runtime_configuration if runtime_configuration is not None else {})
+                    with timings.time(READINESS_PHASE):
+                        self._wait_until_started(service, Deadline(self.start_timeout))
+                    with timings.time(POST_START_PHASE):
+                        self._post_start(service)
+                    if runtime_configuration is not None:
+                        self._runtime_configurations[service] = runtime_configuration
+                    self._record_timings(START_KIND, timings, succeeded=True)
+                    return service
+                except TimeoutError as e:
+                    logger.warning(e)
+                except TransientServiceStartError as e:
+                    logger.warning(e)
+            raise ServiceStartError()
+        except BaseException:
+            # Do not leave the container of a service that failed to start running
+            self._stop(service)
+            self._record_timings(START_KIND, timings, succeeded=False)
+            raise
 
-        raise ServiceStartError()
+    def _get_metrics_labels(self) -> Dict[str, str]:
+        """
+        Gets the labels that identify services started by this controller in recorded metrics.
+        :return: the labels
+        """
+        return dict(controller=type(self).__name__)
 
-    def stop_service(self, service: ServiceType):
-        self._stop(service)
+    def _record_timings(self, kind: str, timings: Timings, succeeded: bool):
+        """
+        Ends the given timings and records them to the metrics sink, if there is one.
+        :param kind: what the timings are of (`START_KIND`, `STOP_KIND` or `RESET_KIND`)
+        :param timings: the timings
+        :param succeeded: whether the service was started or stopped successfully
+        """
+        timings.end(succeeded)
+        if self.metrics_sink is None:
+            return
+        try:
+            self.metrics_sink.record(kind, self._get_metrics_labels(), timings)
+        except Exception as e:
+            logger.warning(f"Could not record metrics: {e!r}")
+
+    def _record_background_stop_timings(self, timings: Timings, stopping: Future):
+        """
+        Records the timings of stopping a service in the background, once it has stopped.
+        :param timings: the timings of stopping the service (so far)
+        :param stopping: the completed future of stopping the service
+        """
+        succeeded = stopping.exception() is None
+        if succeeded and stopping.result() is not None:
+            for phase, seconds in stopping.result().items():
+                timings.add(phase, seconds)
+        self._record_timings(STOP_KIND, timings, succeeded=succeeded)
+
+    def _post_start(self, service: ServiceType):
+        """
+        Called once the given service has started, before it is given out for use. Subclasses can override this method
+        to complete the set up of the service.
+        :param service: the started service
+        """
 
-    def _wait_until_started(self, service: ServiceType):
+    def _wait_until_started(self, service: ServiceType, deadline: Deadline):
         """
         Blocks until the given container has started.
         :raises ServiceStartException: raised if service cannot be started
+        :raises TimeoutError: raised if the service has not started by the deadline
         :param service: the service
+        :param deadline: the deadline by which the service must have started
         """
         if self.startup_monitor is None:
             raise ValueError("No startup monitor set")
-        return self.startup_monitor(service)
+        return deadline.run(self.startup_monitor, service)
 
 
 class DockerisedServiceController(
@@ -156,31 +451,45 @@ class DockerisedServiceController(
     """
     Controller of Docker containers running a service brought up for testing.
     """
-    @staticmethod
-    def _call_detector_with_correct_arguments(detector: Callable, line: str, service: DockerisedServiceType) -> bool:
-        """
-        Calls the given detector with either line as the only argument or both line and service, depending on the
-        detector's signature.
-        :param detector: the detector to call
-        :param line: the log line to give to the detector
-        :param service: the service being started
-        :return: the detector's return value
-        """
-        number_of_parameters = len(signature(detector).parameters)
-        if number_of_parameters == 1:
-            return detector(line)
-        else:
-            return detector(line, service)
+    # Keyed by the controller type, service model and configuration of the containers that are started (see
+    # `_get_configuration_key`), so that differently configured controllers of the same type do not share services
+    _pools: Dict[Tuple[type, type, str], ServicePool] = dict()
+    _pools_lock = Lock()
+    _shared_services: Dict[Tuple[type, type, str], SharedService] = dict()
+    _shared_services_lock = Lock()
 
     def __init__(self, service_model: Type[ServiceType], repository: str, tag: str, ports: List[int], *,
                  start_timeout: int=math.inf, start_tries: int=math.inf, additional_run_settings: Dict[str, Any]=None,
+                 tmpfs: Dict[str, str]=None,
                  pull: bool=True,
-                 start_log_detector: LogListener=None,
-                 persistent_error_log_detector: LogListener=None,
-                 transient_error_log_detector: LogListener=None,
+                 start_log_detector: LogDetector=None,
+                 persistent_error_log_detector: LogDetector=None,
+                 transient_error_log_detector: LogDetector=None,
+                 healthcheck: Healthcheck=None,
+                 start_health_detection: bool=None,
                  startup_monitor: Callable[[ServiceType], bool]=None,
-                 start_http_detector: Callable[[Response], bool]=None,
-                 start_http_detection_endpoint: str=""):
+                 start_http_detector: Callable[["Response"], bool]=None,
+                 start_http_detection_endpoint: str="",
+                 start_probe: Probe=None,
+                 start_probe_timeout: float=DEFAULT_PROBE_TIMEOUT,
+                 start_probe_backoff: Backoff=None,
+                 pool_size: int=0,
+                 pool_max_idle_time: float=math.inf,
+                 pool_refill_concurrency: int=1,
+                 tenancy: Tenancy=None,
+                 snapshot: bool=False,
+                 snapshot_start_log_detector: LogDetector=None,
+                 reuse: bool=False,
+                 reuse_max_age: float=math.inf,
+                 engine_scheduler: EngineScheduler=None,
+                 session_network: bool=None,
+                 publish_ports: bool=True,
+                 port_allocator: PortAllocator=None,
+                 image_cache: ImageCache=None,
+                 kill_on_stop: bool=False,
+                 reaper: ContainerReaper=None,
+                 resetter: Callable[[ServiceType], None]=None,
+                 metrics_sink: MetricsSink=None):
         """
         Constructor.
         :param service_model: see `ServiceController.__init__`
@@ -190,109 +499,653 @@ class DockerisedServiceController(
         :param start_timeout: timeout for starting containers
         :param start_tries: number of times to try starting the containerised service
         :param additional_run_settings: other run settings (see https://docker-py.readthedocs.io/en/1.2.3/api/#create_container)
-        :param pull: whether to always pull from source repository
-        :param start_log_detector: callable that detects if the service is ready for use from the logs
-        :param persistent_error_log_detector: callable that detects if the service is unable to start
-        :param transient_error_log_detector: callable that detects if the service encountered a transient error
+        :param tmpfs: directories in containers to mount as tmpfs (e.g. data directories, which do not need to be durable
+        for testing) mapped to the size limit of each mount (e.g. "512m"). Data written to them is held in memory.
+        Services that run out of space in them when starting fail with a `PersistentServiceStartError`
+        :param pull: whether to pull from source repository (pulls within the image cache's TTL, or of images that
+        have not changed in the repository, are skipped)
+        :param start_log_detector: detects if the service is ready for use from the logs. Either a substring, a
+        (compiled) regular expression or an iterable of substrings and regular expressions, which are all compiled into
+        a single matcher that is applied to undecoded log lines, or a callable (taking the log line and optionally the
+        service) that is called with every decoded log line
+        :param persistent_error_log_detector: detects if the service is unable to start (same form as
+        `start_log_detector`)
+        :param transient_error_log_detector: detects if the service encountered a transient error (same form as
+        `start_log_detector`)
+        :param healthcheck: healthcheck injected into the service's container when it is created. Either a command run
+        in a shell, a command (sequence) run directly or a healthcheck in the form taken by Docker. Failed checks do not
+        make the container unhealthy within `start_timeout` of it starting (see `to_docker_healthcheck`)
+        :param start_health_detection: whether the service is ready for use only once its container is healthy, which is
+        detected from Docker events (defaults to whether `healthcheck` is set; set to use a HEALTHCHECK in the image)
         :param start_http_detector: callable that detects if the service is ready for use based on given HTTP response
         :param start_http_detection_endpoint: endpoint to call that should respond if the service has started
+        :param start_probe: probe that detects if the service is ready for use (cannot be used with
+        `start_http_detector`, which is shorthand for a `HttpProbe` making HEAD requests). Probing is done at the same
+        time as detection from the logs and health status: the service is ready once all indicate it has started
+        :param start_probe_timeout: maximum number of seconds each probe can take
+        :param start_probe_backoff: backoff between probes (defaults to `Backoff()`)
+        :param pool_size: number of ready services to keep in a pool shared by all controllers of this type with the
+        same repository, tag, ports and run settings (services are only taken from the pool if no runtime configuration
+        is given when starting a service). Disabled if 0
+        :param pool_max_idle_time: maximum number of seconds a service can be held in the pool before it is replaced
+        :param pool_refill_concurrency: maximum number of services that are started in parallel to refill the pool
+        :param tenancy: if set, a single service is shared by all controllers of this type with the same configuration
+        (see `pool_size`) and each service "started" is a tenant of it, with its own namespace (`Service.namespace`)
+        that is removed in the background when the tenant is stopped (tenants are only leased if no runtime
+        configuration is given when starting a service)
+        :param snapshot: whether to commit the container of the first service to start into a local "ready" image,
+        from which later services (with the same repository, tag and run settings) are started. The snapshot is
+        replaced if the repository's image changes. Data written to volumes declared by the image is not captured
+        :param snapshot_start_log_detector: detects if a service started from a snapshot is ready for use from the logs
+        (same form as `start_log_detector`; defaults to `start_log_detector`)
+        :param reuse: whether services are left running when stopped (including on exit), so that later services with
+        the same repository, tag, ports and run settings (in this or another process on the same machine) can use them
+        rather than starting a new container. Reused services are reset in place by the `resetter`, if there is one,
+        and their containers are removed if they cannot be reset
+        :param reuse_max_age: maximum number of seconds since a container was created for it to be reused (older
+        containers are removed)
+        :param engine_scheduler: scheduler that places each service on one of a set of Docker engines (defaults to the
+        scheduler of the engines configured by the environment, `USEINTEST_DOCKER_ENGINES`, if any, otherwise services
+        are placed on the engine configured by the environment, e.g. `DOCKER_HOST`)
+        :param session_network: whether containers join the user-defined bridge network of the session (see
+        `useintest.networks`), on which other containers of the session (services and executables) reach them by their
+        name (`DockerisedService.network`), rather than through links or published ports (defaults to whether
+        `USEINTEST_SESSION_NETWORK` is set). Services are then only reused (see `reuse`) within the same session
+        :param publish_ports: whether the ports the service exposes are published to ports on the Docker engine's host.
+        If not, the service can only be reached on the session network: `host` is the service's name and `ports` map
+        the exposed ports to themselves
+        :param port_allocator: allocates the host ports to which the service's ports are published (defaults to the
+        allocator configured by the environment, `USEINTEST_PORT_ALLOCATION`, which by default leaves the Docker engine
+        to assign them). Allocators that can only be used with local Docker engines (e.g. `PortRangeAllocator`) cannot
+        be used if the engine scheduler has remote engines
+        :param image_cache: cache of image resolutions (defaults to the cache shared by all controllers)
+        :param kill_on_stop: whether to kill containers when stopping services, instead of giving them the chance to
+        stop gracefully
+        :param reaper: reaper that removes the containers of stopped services in the background (defaults to the reaper
+        shared by all controllers)
+        :param resetter: see `ContainerisedServiceController.__init__`. Tenants of a shared service are instead reset by
+        recreating their namespace
+        :param metrics_sink: see `ContainerisedServiceController.__init__`
         """
+        if start_health_detection is None:
+            start_health_detection = healthcheck is not None
         if startup_monitor and (start_log_detector or persistent_error_log_detector or transient_error_log_detector or
-                                start_http_detector):
+                                start_http_detector or start_probe or start_health_detection):
             raise ValueError("Cannot set `startup_monitor` in conjunction with any other detector")
+        if start_http_detector and start_probe:
+            raise ValueError("Cannot set `start_probe` in conjunction with `start_http_detector`")
+        for log_detector in (start_log_detector, persistent_error_log_detector, transient_error_log_detector,
+                             snapshot_start_log_detector):
+            if isinstance(log_detector, (list, tuple, set, frozenset)) and len(log_detector) == 0:
+                raise ValueError("Log detectors cannot be empty (use `None` to not detect from the logs)")
+        if session_network is None:
+            session_network = is_session_network_enabled()
+        if not publish_ports and not session_network:
+            raise ValueError("Ports must be published if the service is not on the session network")
 
-        super().__init__(service_model, start_timeout, start_tries, startup_monitor=startup_monitor)
+        super().__init__(service_model, start_timeout, start_tries, startup_monitor=startup_monitor,
+                         resetter=resetter, metrics_sink=metrics_sink)
         self.repository = repository
         self.tag = tag
         self.ports = ports
         self.run_settings = additional_run_settings if additional_run_settings is not None else {}
+        self.tmpfs = tmpfs if tmpfs is not None else {}
         self.pull = pull
+        self.image_cache = image_cache if image_cache is not None else default_image_cache
+        self.kill_on_stop = kill_on_stop
+        self.reaper = reaper if reaper is not None else default_reaper
         self.start_log_detector = start_log_detector
         self.persistent_error_log_detector = persistent_error_log_detector
         self.transient_error_log_detector = transient_error_log_detector
+        self.healthcheck = healthcheck
+        self.start_health_detection = start_health_detection
         self.start_http_detector = start_http_detector
         self.start_http_detection_endpoint = start_http_detection_endpoint
+        self.start_probe = start_probe if start_http_detector is None \
+            else HttpProbe(start_http_detector, start_http_detection_endpoint)
+        self.start_probe_timeout = start_probe_timeout
+        self.start_probe_backoff = start_probe_backoff
+        self.pool_size = pool_size
+        self.pool_max_idle_time = pool_max_idle_time
+        self.pool_refill_concurrency = pool_refill_concurrency
+        self.tenancy = tenancy
+        self.snapshot = snapshot
+        self.snapshot_start_log_detector = snapshot_start_log_detector
+        self.reuse = reuse
+        self.reuse_max_age = reuse_max_age
+        self.engine_scheduler = engine_scheduler if engine_scheduler is not None else default_engine_scheduler
+        self.session_network = session_network
+        self.publish_ports = publish_ports
+        self.port_allocator = port_allocator if port_allocator is not None else default_port_allocator
+        if self.publish_ports and self.port_allocator.local_only:
+            remote_engines = [engine.name for engine in self._get_engines() if not engine.is_local]
+            if len(remote_engines) > 0:
+                raise ValueError(f"Port allocator {type(self.port_allocator).__name__} can only be used with local "
+                                 f"Docker engines (remote engines: {', '.join(remote_engines)})")
 
         self._log_iterator: Dict[Service, Iterator] = dict()
+        self._from_snapshot: Set[Service] = set()
+        self._snapshots_to_create: Dict[Service, Tuple[str, str]] = dict()
+        self._compiled_log_detectors: Dict[Tuple[int, int, int, bool], CompiledLogDetector] = dict()
+        self._reuse_claims: Dict[Service, ReusableContainer] = dict()
+        self._allocated_ports: Dict[Service, List[int]] = dict()
+
+    def start_service(self, runtime_configuration: Dict=None) -> DockerisedServiceType:
+        if self.tenancy is not None and not runtime_configuration:
+            return self._lease_tenant()
+        if self.pool_size > 0 and not runtime_configuration:
+            return self._get_pool().acquire()
+        if self.reuse:
+            service = self._reuse_service(runtime_configuration)
+            if service is not None:
+                return service
+        return super().start_service(runtime_configuration)
+
+    def stop_service(self, service: DockerisedServiceType):
+        if service.namespace is not None:
+            # Tenants share the container of the shared service, so are only ever released (once) rather than stopped
+            if self.tenancy is None or not self._get_shared_service().is_tenant(service):
+                logger.debug(f"Tenant {service.namespace} has already been released")
+                return
+            timings = Timings()
+            service.stop_timings = timings
+            releasing = self._get_shared_service().release(service)
+            releasing.add_done_callback(functools.partial(self._record_background_stop_timings, timings))
+            return
+        claim = self._reuse_claims.get(service)
+        if claim is not None and claim.age <= self.reuse_max_age:
+            # Left running for reuse
+            del self._reuse_claims[service]
+            # The ports stay allocated whilst the container is left running
+            self._allocated_ports.pop(service, None)
+            _unregister_stop_on_exit(service)
+            self._runtime_configurations.pop(service, None)
+            claim.release(service)
+            return
+        super().stop_service(service)
+
+    def reset_service(self, service: DockerisedServiceType):
+        if service.namespace is not None:
+            if self.tenancy is None:
+                raise ValueError(f"Not a tenant of a service shared by this controller: {service.namespace}")
+            timings = Timings()
+            try:
+                with timings.time(RESET_PHASE):
+                    self._get_shared_service().reset(service)
+            except BaseException:
+                self._record_timings(RESET_KIND, timings, succeeded=False)
+                raise
+            self._record_timings(RESET_KIND, timings, succeeded=True)
+            return
+        super().reset_service(service)
+
+    def _get_pool(self) -> ServicePool[DockerisedServiceType]:
+        """
+        Gets the pool of ready services shared by controllers of this type with the same configuration, creating it if
+        required.
+        :return: the service pool
+        """
+        key = self._get_configuration_key()
+        with DockerisedServiceController._pools_lock:
+            pool = DockerisedServiceController._pools.get(key)
+            if pool is None:
+                pool = ServicePool(self._start_new_service, self._stop, self.pool_size,
+                                   max_idle_time=self.pool_max_idle_time,
+                                   refill_concurrency=self.pool_refill_concurrency)
+                DockerisedServiceController._pools[key] = pool
+            return pool
+
+    def _get_shared_service(self) -> SharedService[DockerisedServiceType]:
+        """
+        Gets the service shared by the tenants of controllers of this type with the same configuration, creating it if
+        required (the service itself is started when the first tenant is leased).
+        :return: the shared service
+        """
+        key = self._get_configuration_key()
+        with DockerisedServiceController._shared_services_lock:
+            shared_service = DockerisedServiceController._shared_services.get(key)
+            if shared_service is None:
+                shared_service = SharedService(self._start_new_service, self._stop, self.tenancy)
+                DockerisedServiceController._shared_services[key] = shared_service
+            return shared_service
+
+    def _get_configuration_key(self) -> Tuple[type, type, str]:
+        """
+        Gets the key that identifies the services this controller starts without runtime configuration (as are pooled
+        and shared services), from its type, service model and the configuration of the containers it creates.
+        :return: the configuration key
+        """
+        return type(self), self._service_model, get_reuse_key(self.repository, self.tag, self.ports,
+                                                              self._get_create_kwargs({}))
+
+    def _lease_tenant(self) -> DockerisedServiceType:
+        """
+        Leases a tenant of the service shared by controllers of this type with the same configuration.
+        :return: the tenant
+        """
+        tenant = self._get_shared_service().lease()
+        tenant.controller = self
+        self._record_timings(START_KIND, tenant.start_timings, succeeded=True)
+        return tenant
+
+    async def start_service_async(self, runtime_configuration: Dict=None) -> DockerisedServiceType:
+        """
+        Starts a service without blocking the event loop. Calls to Docker are made in the event loop's default executor
+        and the container's logs are polled, rather than streamed, to detect when the service has started.
+        :param runtime_configuration: additional runtime configuration
+        :raises ServiceStartException: service could not be started (see logs for more information)
+        :return: model of the started service
+        """
+        loop = asyncio.get_event_loop()
+        if self.tenancy is not None and not runtime_configuration:
+            return await loop.run_in_executor(None, self._lease_tenant)
+        if self.pool_size > 0 and not runtime_configuration:
+            return await loop.run_in_executor(None, self._get_pool().acquire)
+        if self.reuse:
+            service = await loop.run_in_executor(None, self._reuse_service, runtime_configuration)
+            if service is not None:
+                return service
+        runtime_configuration = runtime_configuration if runtime_configuration is not None else {}
+
+        service = self._service_model()
+        timings = Timings()
+        service.start_timings = timings
+        if self.stop_on_exit:
+            _register_stop_on_exit(self, service)
+
+        try:
+            while timings.tries < self.start_tries:
+                if timings.tries > 0:
+                    with timings.time(RETRY_PHASE):
+                        await loop.run_in_executor(None, self._stop, service)
+                timings.tries += 1
+                try:
+                    await loop.run_in_executor(None, self._start, service, runtime_configuration)
+                    deadline = Deadline(self.start_timeout)
+                    with timings.time(READINESS_PHASE):
+                        await asyncio.wait_for(self._wait_until_started_async(service, deadline),
+                                               deadline.remaining_or_none)
+                    with timings.time(POST_START_PHASE):
+                        await loop.run_in_executor(None, self._post_start, service)
+                    if runtime_configuration:
+                        self._runtime_configurations[service] = runtime_configuration
+                    self._record_timings(START_KIND, timings, succeeded=True)
+                    return service
+                except (asyncio.TimeoutError, TimeoutError):
+                    logger.warning(f"Service did not start within {self.start_timeout}s")
+                except TransientServiceStartError as e:
+                    logger.warning(e)
+            raise ServiceStartError()
+        except BaseException:
+            # Do not leave the container of a service that failed to start running
+            await loop.run_in_executor(None, self._stop, service)
+            self._record_timings(START_KIND, timings, succeeded=False)
+            raise
+
+    async def stop_service_async(self, service: DockerisedServiceType):
+        """
+        Stops the given service without blocking the event loop.
+        :param service: model of the service to stop
+        """
+        await asyncio.get_event_loop().run_in_executor(None, self.stop_service, service)
+
+    def _post_start(self, service: DockerisedServiceType):
+        super()._post_start(service)
+        if service in self._snapshots_to_create:
+            key, base_image_id = self._snapshots_to_create.pop(service)
+            logger.info(f"Creating snapshot of {self.repository}:{self.tag} from started service {service.name}")
+            create_snapshot(service.container, self.repository, key, base_image_id)
+
+    def _get_metrics_labels(self) -> Dict[str, str]:
+        return dict(super()._get_metrics_labels(), repository=self.repository, tag=self.tag)
 
     def _start(self, service: DockerisedServiceType, runtime_configuration: Dict):
-        if self.pull:
-            image = docker_client.images.pull(self.repository, tag=self.tag)
-        else:
-            image = docker_client.images.get(f"{self.repository}:{self.tag}")
+        from bidict import bidict
+        timings = service.start_timings if service.start_timings is not None else Timings()
+        engine = self.engine_scheduler.select() if self.engine_scheduler is not None else default_docker_engine
+        with timings.time(RESOLVE_IMAGE_PHASE):
+            image_id = self.image_cache.resolve(self.repository, self.tag, pull=self.pull, engine=engine)
 
         service.name = f"{self.repository.split('/')[-1]}-{uuid4()}"
-        service.ports = {port: _get_open_port() for port in self.ports}
         service.controller = self
+        service.engine = engine
+        create_kwargs = self._get_create_kwargs(runtime_configuration)
+        service.network = create_kwargs.get("network")
+        if self.session_network and service.network == get_session_network_name():
+            ensure_session_network(engine)
+        if self.publish_ports:
+            host_ports = self.port_allocator.allocate(len(self.ports))
+            self._allocated_ports[service] = [port for port in host_ports if port is not None]
+            published_ports = dict(zip(self.ports, host_ports))
+            # Set once the container has started, when ports assigned by the Docker engine are known
+            service.ports = bidict()
+            service.host = engine.host
+        else:
+            service.ports = bidict({port: port for port in self.ports})
+            service.host = service.name
+
+        reuse_labels = get_reuse_labels(get_reuse_key(self.repository, self.tag, self.ports, create_kwargs), image_id) \
+            if self.reuse else {}
+
+        self._from_snapshot.discard(service)
+        self._snapshots_to_create.pop(service, None)
+        if self.snapshot:
+            # Snapshots are shared between sessions, so are not of containers on a particular session's network
+            key = get_snapshot_key(self.repository, self.tag, {
+                name: value for name, value in create_kwargs.items() if name != "network"})
+            snapshot_image = get_snapshot(self.repository, key, image_id, engine)
+            if snapshot_image is not None:
+                self._from_snapshot.add(service)
+                image_id = snapshot_image.id
+            else:
+                self._snapshots_to_create[service] = (key, image_id)
+        create_kwargs["labels"] = dict(create_kwargs.get("labels", {}), **reuse_labels, **get_owner_labels())
+        if self.publish_ports:
+            create_kwargs["ports"] = published_ports
+
+        with timings.time(CREATE_CONTAINER_PHASE):
+            container = engine.get_client().containers.create(
+                image=image_id,
+                name=service.name,
+                detach=True,
+                **create_kwargs)
+        service.container = container
+        if len(reuse_labels) > 0:
+            claim = ReusableContainer.claim(container.id, float(reuse_labels[REUSE_CREATED_LABEL]))
+            if claim is not None:
+                self._reuse_claims[service] = claim
+
+        with timings.time(START_CONTAINER_PHASE):
+            container.start()
+            if self.publish_ports:
+                service.ports = bidict(self._get_published_ports(container, published_ports))
 
+    @staticmethod
+    def _get_published_ports(container: "Container", published_ports: Dict[int, Optional[int]]) -> Dict[int, int]:
+        """
+        Gets the host ports to which the ports of the given started container are published, reading back those that
+        were assigned by the Docker engine.
+        :param container: the started container
+        :param published_ports: the ports the container exposes mapped to the host ports they were published to, or
+        `None` if the Docker engine was left to assign them
+        :raises TransientServiceStartError: if the Docker engine has not published a port (e.g. as the container exited)
+        :return: the ports the container exposes mapped to the host ports they are published to
+        """
+        if all(host_port is not None for host_port in published_ports.values()):
+            return published_ports
+        container.reload()
+        bindings = container.ports
+        ports = {}
+        for port, host_port in published_ports.items():
+            if host_port is None:
+                port_bindings = bindings.get(f"{port}/tcp") or []
+                if len(port_bindings) == 0:
+                    raise TransientServiceStartError(f"Port {port} of container {container.id} has not been published")
+                host_port = int(port_bindings[0]["HostPort"])
+            ports[port] = host_port
+        return ports
+
+    def _get_create_kwargs(self, runtime_configuration: Dict) -> Dict[str, Any]:
+        """
+        Gets the settings with which to create the container of a service.
+        :param runtime_configuration: additional runtime configuration
+        :return: the settings
+        """
         create_kwargs = dict(self.run_settings)
         create_kwargs.update(runtime_configuration)
-        container = docker_client.containers.create(
-            image=image.id,
-            name=service.name,
-            ports=service.ports,
-            detach=True,
-            **create_kwargs)
-        service.container = container
+        if self.healthcheck is not None:
+            create_kwargs.setdefault(
+                "healthcheck", to_docker_healthcheck(self.healthcheck, start_period=self.start_timeout))
+        if len(self.tmpfs) > 0:
+            tmpfs = {directory: f"size={size}" for directory, size in self.tmpfs.items()}
+            create_kwargs["tmpfs"] = dict(tmpfs, **create_kwargs.get("tmpfs", {}))
+        if self.session_network:
+            create_kwargs.setdefault("network", get_session_network_name())
+        return create_kwargs
+
+    def _reuse_service(self, runtime_configuration: Dict=None) -> Optional[DockerisedServiceType]:
+        """
+        Reuses the service of a running container that was left for reuse with the same configuration, if there is one.
+        Containers that are too old, are from an out of date image or cannot be reset are removed.
+        :param runtime_configuration: additional runtime configuration
+        :return: model of the reused service or `None` if there is no container that can be reused
+        """
+        key = get_reuse_key(self.repository, self.tag, self.ports,
+                            self._get_create_kwargs(runtime_configuration if runtime_configuration is not None else {}))
+        for engine in self._get_engines():
+            timings = Timings()
+            with timings.time(RESOLVE_IMAGE_PHASE):
+                image_id = self.image_cache.resolve(self.repository, self.tag, pull=self.pull, engine=engine)
+
+            for container in engine.get_client().containers.list(filters={"label": f"{REUSE_KEY_LABEL}={key}"}):
+                if container.labels.get(REUSE_KEY_LABEL) != key:
+                    continue
+                claim = ReusableContainer.claim(container.id, float(container.labels.get(REUSE_CREATED_LABEL, 0)))
+                if claim is None:
+                    # In use by another process
+                    continue
+                service = claim.load_service()
+                if service is None or container.labels.get(REUSE_IMAGE_LABEL) != image_id \
+                        or claim.age > self.reuse_max_age:
+                    logger.info(f"Removing container that cannot be reused: {container.id}")
+                    claim.discard()
+                    self.reaper.remove(container.id, kill=self.kill_on_stop, engine=engine)
+                    continue
+                service.controller = self
+                service.engine = engine
+                service.start_timings = timings
+                service.stop_timings = None
+                try:
+                    with timings.time(REUSE_PHASE):
+                        if self.resetter is not None:
+                            self.resetter(service)
+                except Exception as e:
+                    logger.warning(f"Could not reset service in container {container.id} for reuse, removing it: {e!r}")
+                    claim.discard()
+                    self.reaper.remove(container.id, kill=self.kill_on_stop, engine=engine)
+                    continue
+                self._reuse_claims[service] = claim
+                if runtime_configuration is not None:
+                    self._runtime_configurations[service] = runtime_configuration
+                if self.stop_on_exit:
+                    _register_stop_on_exit(self, service)
+                self._record_timings(START_KIND, timings, succeeded=True)
+                return service
+        return None
 
-        container.start()
+    def _get_engines(self) -> List[DockerEngine]:
+        """
+        Gets the Docker engines on which this controller places services.
+        :return: the engines
+        """
+        return self.engine_scheduler.engines if self.engine_scheduler is not None else [default_docker_engine]
 
-    def _stop(self, service: DockerisedServiceType):
+    def _stop(self, service: DockerisedServiceType) -> Optional[Future]:
+        if service.namespace is not None:
+            # The container of a tenant is that of the shared service, which other tenants are still using
+            return None
         if service in self._log_iterator:
             del self._log_iterator[service]
-        if service.container:
-            try:
-                service.container.stop()
-                service.container.remove(force=True)
-            except NotFound:
-                pass
+        self._from_snapshot.discard(service)
+        self._snapshots_to_create.pop(service, None)
+        claim = self._reuse_claims.pop(service, None)
+        if claim is not None:
+            claim.discard()
+        allocated_ports = self._allocated_ports.pop(service, [])
+        if service.container_id is not None:
+            removal = self.reaper.remove(service.container_id, kill=self.kill_on_stop, engine=service.engine)
+            service.invalidate_container(removed=True)
+            # The ports stay published until the container has been removed
+            removal.add_done_callback(lambda _: self.port_allocator.release(allocated_ports))
+            return removal
+        self.port_allocator.release(allocated_ports)
 
-    def _wait_until_started(self, service: DockerisedServiceType):
+    def _wait_until_started(self, service: DockerisedServiceType, deadline: Deadline):
         if self.startup_monitor is not None:
-            return self.startup_monitor(service)
+            return deadline.run(self.startup_monitor, service)
         else:
+            waits = []
+            if self.start_health_detection:
+                waits.append(functools.partial(self._wait_until_healthy, service))
             if self.start_log_detector:
-                self._wait_until_log_indicates_start(service)
-            if self.start_http_detector:
-                self._wait_until_http_indicates_start(service)
+                waits.append(functools.partial(self._wait_until_log_indicates_start, service))
+            if self.start_probe:
+                waits.append(functools.partial(
+                    wait_until_probe_succeeds, self.start_probe, service, backoff=self.start_probe_backoff,
+                    timeout=self.start_probe_timeout))
+            _wait_for_all(waits, deadline)
 
-    def _wait_until_log_indicates_start(self, service: DockerisedServiceType):
+    async def _wait_until_started_async(self, service: DockerisedServiceType, deadline: Deadline):
+        """
+        Waits until the given container has started.
+        :raises ServiceStartException: raised if service cannot be started
+        :param service: the service
+        :param deadline: the deadline by which the service must have started
+        """
+        if self.startup_monitor is not None:
+            await asyncio.get_event_loop().run_in_executor(None, deadline.run, self.startup_monitor, service)
+        else:
+            waits = []
+            if self.start_health_detection:
+                waits.append(self._wait_until_healthy_async(service))
+            if self.start_log_detector:
+                waits.append(self._wait_until_log_indicates_start_async(service))
+            if self.start_probe:
+                waits.append(wait_until_probe_succeeds_async(
+                    self.start_probe, service, deadline, backoff=self.start_probe_backoff,
+                    timeout=self.start_probe_timeout))
+            await _wait_for_all_async(waits)
+
+    @staticmethod
+    def _wait_until_healthy(service: DockerisedServiceType, deadline: Deadline):
+        """
+        Blocks until the container of the given service is healthy.
+        :param service: starting service
+        :param deadline: the deadline by which the service must have started
+        :raises ServiceStartException: raised if service cannot be started
+        :raises TimeoutError: raised if the service has not started by the deadline
+        """
+        with ContainerHealthWaiter(service.container_id, engine=service.engine) as health_waiter:
+            health_waiter.wait(deadline)
+
+    @staticmethod
+    async def _wait_until_healthy_async(service: DockerisedServiceType):
+        """
+        Waits until the container of the given service is healthy.
+        :param service: starting service
+        :raises ServiceStartException: raised if service cannot be started
+        """
+        with ContainerHealthWaiter(service.container_id, engine=service.engine) as health_waiter:
+            await health_waiter.wait_async()
+
+    def _get_log_detector(self, service: DockerisedServiceType) -> CompiledLogDetector:
+        """
+        Gets the (compiled) detector that determines from the logs whether the given service has started.
+
+        Detectors are compiled once and recompiled only if the controller's detectors are changed.
+        Running out of space is detected as a persistent error if directories are mounted as tmpfs.
+        :param service: the starting service
+        :return: the log detector
+        """
+        start_log_detector = self.start_log_detector
+        if service in self._from_snapshot and self.snapshot_start_log_detector is not None:
+            start_log_detector = self.snapshot_start_log_detector
+        detectors = (start_log_detector, self.transient_error_log_detector, self.persistent_error_log_detector)
+        key = tuple(id(detector) for detector in detectors) + (len(self.tmpfs) > 0, )
+        compiled = self._compiled_log_detectors.get(key)
+        if compiled is None:
+            if len(self.tmpfs) > 0:
+                detectors = detectors[:2] + (combine_log_detectors(detectors[2], _NO_SPACE_LOG_DETECTOR), )
+            compiled = CompiledLogDetector(*detectors)
+            self._compiled_log_detectors[key] = compiled
+        return compiled
+
+    def _log_line_indicates_start(self, line: bytes, service: DockerisedServiceType,
+                                  log_detector: CompiledLogDetector) -> bool:
+        """
+        Checks whether the given log line indicates that the service has started.
+        :param line: the (undecoded) log line
+        :param service: the starting service
+        :param log_detector: the detector that determines whether the service has started
+        :raises ServiceStartException: raised if the log line indicates that the service cannot be started
+        :return: whether the service has started
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(line.decode(_DOCKER_LOG_ENCODING, errors="replace"))
+        detection = log_detector.detect(line, service)
+        if detection == LogDetection.PERSISTENT_ERROR:
+            raise PersistentServiceStartError(line.decode(_DOCKER_LOG_ENCODING, errors="replace"))
+        elif detection == LogDetection.TRANSIENT_ERROR:
+            raise TransientServiceStartError(line.decode(_DOCKER_LOG_ENCODING, errors="replace"))
+        return detection == LogDetection.STARTED
+
+    def _wait_until_log_indicates_start(self, service: DockerisedServiceType, deadline: Deadline):
         """
         Blocks until container log indicates that the service has started.
         :param service: starting service
+        :param deadline: the deadline by which the service must have started (the log stream is closed when it passes)
         :raises ServiceStartException: raised if service cannot be started
+        :raises TimeoutError: raised if the service has not started by the deadline
         """
-        log_stream = service.container.logs(stream=True)
-        for line in log_stream:
-            # XXX: Although non-streamed logs are returned as a string, the generator returns bytes!?
-            # http://docker-py.readthedocs.io/en/stable/containers.html#docker.models.containers.Container.logs
-            line = line.decode(_DOCKER_LOG_ENCODING)
-            logger.debug(line)
-
-            if self.persistent_error_log_detector is not None \
-                    and self._call_detector_with_correct_arguments(self.persistent_error_log_detector, line, service):
-                raise PersistentServiceStartError(line)
-            elif self.transient_error_log_detector is not None \
-                    and self._call_detector_with_correct_arguments(self.transient_error_log_detector, line, service):
-                raise TransientServiceStartError(line)
-            elif self._call_detector_with_correct_arguments(self.start_log_detector, line, service):
-                return
+        from requests import RequestException
+        from urllib3.exceptions import ProtocolError
+        log_detector = self._get_log_detector(service)
+        with service.streaming_docker_client() as client:
+            log_stream = client.api.logs(service.container_id, stream=True)
+            try:
+                with deadline.on_expiry(lambda: _close_log_stream(log_stream)):
+                    for line in log_stream:
+                        # Lines are matched without being decoded (the stream returns bytes)
+                        if self._log_line_indicates_start(line, service, log_detector):
+                            return
+            except (OSError, ValueError, AttributeError, RequestException, ProtocolError) as e:
+                # Reading from a log stream that has been closed from another thread can fail in a number of ways
+                deadline.check()
+                raise TransientServiceStartError(f"Could not read logs: {e!r}") from e
+            finally:
+                _close_log_stream(log_stream)
+        deadline.check()
 
         logs = service.container.logs()
         raise TransientServiceStartError(f"No error detected in logs but the container has stopped. Log dump: "
                                          f"{logs.decode(_DOCKER_LOG_ENCODING)}")
 
-    def _wait_until_http_indicates_start(self, service: DockerisedServiceType):
+    async def _wait_until_log_indicates_start_async(self, service: DockerisedServiceType):
         """
-        Blocks until http endpoint indicates that the service has started.
+        Waits until container log indicates that the service has started, polling the logs so that no log stream (or
+        thread) is held whilst waiting.
         :param service: starting service
+        :raises ServiceStartException: raised if service cannot be started
         """
-        started = False
-        while not started:
-            try:
-                response = requests.head(f"http://{service.host}:{service.port}/{self.start_http_detection_endpoint}")
-                started = self.start_http_detector(response)
-            except requests.exceptions.ConnectionError:
-                pass
-            if not started:
-                sleep(0.1)
+        loop = asyncio.get_event_loop()
+        log_detector = self._get_log_detector(service)
+        container = await loop.run_in_executor(None, lambda: service.container)
+        if container is None:
+            raise TransientServiceStartError(f"Container of service {service.name} no longer exists")
+
+        since: Optional[int] = None
+        seen_in_last_second: Set[bytes] = set()
+        while True:
+            await loop.run_in_executor(None, container.reload)
+            stopped = container.status not in _RUNNING_CONTAINER_STATUSES
+            logs = await loop.run_in_executor(
+                None, functools.partial(container.logs, timestamps=True, since=since))
+
+            for timestamped_line in logs.splitlines():
+                if timestamped_line in seen_in_last_second:
+                    continue
+                timestamp, _, line = timestamped_line.partition(b" ")
+                timestamp = timestamp[:19].decode(_DOCKER_LOG_ENCODING)
+                second = calendar.timegm(strptime(timestamp, _DOCKER_TIMESTAMP_FORMAT))
+                if second != since:
+                    since = second
+                    seen_in_last_second.clear()
+                seen_in_last_second.add(timestamped_line)
+                if self._log_line_indicates_start(line, service, log_detector):
+                    return
+
+            if stopped:
+                logs = await loop.run_in_executor(None, container.logs)
+                raise TransientServiceStartError(f"No error detected in logs but the container has stopped. Log dump: "
+                                                 f"{logs.decode(_DOCKER_LOG_ENCODING)}")
+            await asyncio.sleep(_ASYNC_POLL_INTERVAL)
@@ -0,0 +1,158 @@
+import math
+from contextlib import contextmanager
+from threading import Timer, Thread, Event, Lock
+from time import monotonic
+from typing import Callable, Any, Optional, Iterator, List
+
+
+class Deadline:
+    """
+    Point in time by which something must complete.
+
+    Unlike signal based timeouts, deadlines can be used from any thread (or event loop). A deadline can also be cancelled,
+    which brings it forward to now (e.g. to stop other waits once one of them has failed).
+    """
+    @property
+    def remaining(self) -> float:
+        """
+        Gets the number of seconds left until the deadline.
+        :return: the number of seconds remaining (`math.inf` if there is no deadline)
+        """
+        if self._cancelled.is_set():
+            return 0.0
+        if self._end is math.inf:
+            return math.inf
+        return max(0.0, self._end - monotonic())
+
+    @property
+    def remaining_or_none(self) -> Optional[float]:
+        """
+        Gets the number of seconds left until the deadline, in the form used by timeouts in the standard library.
+        :return: the number of seconds remaining (`None` if there is no deadline)
+        """
+        remaining = self.remaining
+        return remaining if remaining is not math.inf else None
+
+    @property
+    def expired(self) -> bool:
+        """
+        Whether the deadline has passed.
+        :return: `True` if the deadline has passed
+        """
+        return self.remaining <= 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Whether the deadline has been cancelled.
+        :return: `True` if cancelled
+        """
+        return self._cancelled.is_set()
+
+    def __init__(self, timeout: float=math.inf):
+        """
+        Constructor.
+        :param timeout: the number of seconds from now until the deadline (`math.inf` for no deadline)
+        """
+        self.timeout = timeout
+        self._end = monotonic() + timeout if timeout is not math.inf else math.inf
+        self._cancelled = Event()
+        self._expiry_callbacks: List[Callable[[], Any]] = []
+        self._lock = Lock()
+
+    def cancel(self):
+        """
+        Cancels the deadline, so that it passes now. Callbacks registered with `on_expiry` are called.
+        """
+        with self._lock:
+            self._cancelled.set()
+            callbacks = list(self._expiry_callbacks)
+            self._expiry_callbacks.clear()
+        for callback in callbacks:
+            callback()
+
+    def check(self):
+        """
+        Checks that the deadline has not passed.
+        :raises TimeoutError: if the deadline has passed
+        """
+        if self.cancelled:
+            raise TimeoutError("Deadline has been cancelled")
+        if self.expired:
+            raise TimeoutError(f"Deadline of {self.timeout}s has passed")
+
+    def sleep(self, seconds: float):
+        """
+        Sleeps for the given number of seconds, waking early if the deadline passes or is cancelled.
+        :param seconds: the number of seconds to sleep for
+        """
+        self._cancelled.wait(min(seconds, self.remaining))
+
+    @contextmanager
+    def on_expiry(self, callback: Callable[[], Any]) -> Iterator[None]:
+        """
+        Context manager that calls the given callback (from another thread) if the deadline passes, or is cancelled,
+        before the context is exited. Useful to cancel blocking operations, e.g. by closing the stream that is being read.
+        :param callback: the callback to call on expiry (called at most once)
+        """
+        called = Event()
+
+        def call_once():
+            with self._lock:
+                if called.is_set():
+                    return
+                called.set()
+            callback()
+
+        with self._lock:
+            cancelled = self._cancelled.is_set()
+            if not cancelled:
+                self._expiry_callbacks.append(call_once)
+        if cancelled:
+            call_once()
+
+        timer = None
+        if self.remaining is not math.inf:
+            timer = Timer(self.remaining, call_once)
+            timer.daemon = True
+            timer.start()
+        try:
+            yield
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                if call_once in self._expiry_callbacks:
+                    self._expiry_callbacks.remove(call_once)
+
+    def run(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs the given function, giving up waiting for it to return if the deadline passes.
+
+        If there is a deadline, the function is run in a daemon thread, which is abandoned (not stopped) if the
+        deadline passes.
+        :param function: the function to run
+        :param args: positional arguments to call the function with
+        :param kwargs: named arguments to call the function with
+        :raises TimeoutError: if the deadline passes before the function returns
+        :return: the value returned by the function
+        """
+        if self.remaining is math.inf:
+            return function(*args, **kwargs)
+
+        outcome = {}
+
+        def call():
+            try:
+                outcome["result"] = function(*args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        thread = Thread(target=call, daemon=True)
+        thread.start()
+        thread.join(self.remaining)
+        if thread.is_alive():
+            raise TimeoutError(f"Deadline of {self.timeout}s passed whilst waiting for {function}")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("result")
@@ -0,0 +1,193 @@
+import re
+from enum import Enum, unique
+from inspect import signature
+from typing import Callable, Union, Pattern, Iterable, Optional, List, Tuple, Any
+
+LogListener = Union[Callable[[str, Any], bool], Callable[[str], bool]]
+LogPatterns = Union[str, bytes, Pattern, Iterable[Union[str, bytes, Pattern]]]
+LogDetector = Union[LogListener, LogPatterns]
+
+_LOG_ENCODING = "utf-8"
+
+# Flags that can be applied to part of a pattern using scoped inline flags, e.g. `(?i:...)`
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+# Inline flags that apply to the whole of a pattern, which must be at its start
+_GLOBAL_FLAGS_PATTERN = re.compile(rb"^(?:\(\?[aiLmsux]+\))+")
+
+
+@unique
+class LogDetection(Enum):
+    """
+    What a log line indicates about the starting of a service.
+    """
+    STARTED = "started"
+    TRANSIENT_ERROR = "transient-error"
+    PERSISTENT_ERROR = "persistent-error"
+
+
+def _to_byte_pattern(pattern: Union[str, bytes, Pattern]) -> Pattern:
+    """
+    Converts the given substring or regular expression into a compiled byte regular expression.
+    :param pattern: the substring or (compiled) regular expression
+    :return: the equivalent byte regular expression
+    """
+    if isinstance(pattern, str):
+        return re.compile(re.escape(pattern.encode(_LOG_ENCODING)))
+    if isinstance(pattern, bytes):
+        return re.compile(re.escape(pattern))
+    if isinstance(pattern.pattern, bytes):
+        return pattern
+    return re.compile(pattern.pattern.encode(_LOG_ENCODING), pattern.flags & ~re.UNICODE)
+
+
+def _to_alternative(pattern: Pattern) -> Optional[bytes]:
+    """
+    Converts the given byte regular expression into one that can be joined with others as alternatives (with `|`)
+    without changing what it matches.
+    :param pattern: the byte regular expression
+    :return: the alternative or `None` if the regular expression cannot be joined with others (its groups would be
+    renumbered, changing the meaning of backreferences, and named groups could clash)
+    """
+    if pattern.groups > 0:
+        return None
+    # Flags are applied to the alternative as scoped flags, as global flags are only allowed at the start of a pattern
+    expression = _GLOBAL_FLAGS_PATTERN.sub(b"", pattern.pattern)
+    flags = "".join(flag for value, flag in _SCOPED_FLAGS if pattern.flags & value)
+    alternative = b"(?%s:%s)" % (flags.encode(), expression) if flags else b"(?:%s)" % expression
+    try:
+        re.compile(alternative)
+    except re.error:
+        return None
+    return alternative
+
+
+def _to_listener(detector: LogListener) -> Callable[[str, Any], bool]:
+    """
+    Converts the given detector into a callable that takes both the log line and the service.
+    :param detector: the detector, which takes either just the log line or both the log line and the service
+    :return: the callable taking both the log line and the service
+    """
+    if len(signature(detector).parameters) == 1:
+        return lambda line, service: detector(line)
+    return detector
+
+
+class _CompiledDetector:
+    """
+    A detector compiled into either byte regular expressions or a callable.
+    """
+    def __init__(self, detector: Optional[LogDetector]):
+        """
+        Constructor.
+        :param detector: the detector to compile
+        :raises ValueError: if the detector is an empty iterable of patterns (which would match every log line)
+        """
+        self.patterns: List[Pattern] = []
+        self.listener: Optional[Callable[[str, Any], bool]] = None
+        if detector is None:
+            return
+        if callable(detector) and not isinstance(detector, (str, bytes)) and not hasattr(detector, "pattern"):
+            self.listener = _to_listener(detector)
+        else:
+            patterns = [detector] if isinstance(detector, (str, bytes)) or hasattr(detector, "pattern") \
+                else list(detector)
+            if len(patterns) == 0:
+                raise ValueError("Log detector has no patterns (use `None` to not detect from the logs)")
+            self.patterns = [_to_byte_pattern(pattern) for pattern in patterns]
+
+    def search(self, line: bytes) -> bool:
+        """
+        Searches the given log line for any of the detector's patterns.
+        :param line: the (undecoded) log line
+        :return: whether any pattern was found
+        """
+        return any(pattern.search(line) is not None for pattern in self.patterns)
+
+
+def combine_log_detectors(*detectors: Optional[LogDetector]) -> Optional[LogDetector]:
+    """
+    Combines the given detectors into a single detector that detects a log line if any of them do.
+    :param detectors: the detectors (which may be `None`)
+    :return: the combined detector (regular expressions, if none of the detectors are callables) or `None` if no
+    detectors are given
+    """
+    compiled = [_CompiledDetector(detector) for detector in detectors if detector is not None]
+    if len(compiled) == 0:
+        return None
+    if all(detector.listener is None for detector in compiled):
+        return [pattern for detector in compiled for pattern in detector.patterns]
+
+    def detect(line: str, service: Any) -> bool:
+        for detector in compiled:
+            if detector.listener is None:
+                if detector.search(line.encode(_LOG_ENCODING)):
+                    return True
+            elif detector.listener(line, service):
+                return True
+        return False
+
+    return detect
+
+
+class CompiledLogDetector:
+    """
+    Detects, from the log lines of a starting service, whether the service has started or has encountered an error.
+
+    Detectors given as substrings or regular expressions are compiled once into byte-level regular expressions, which are
+    also joined into a single regular expression that is used to filter out the (vast majority of) log lines that match
+    none of them, without the need to decode them. Log lines that pass the filter are matched against the regular
+    expressions of each detector. Detectors given as callables are called with each decoded log line.
+    """
+    def __init__(self, start_detector: Optional[LogDetector], transient_error_detector: Optional[LogDetector]=None,
+                 persistent_error_detector: Optional[LogDetector]=None):
+        """
+        Constructor.
+        :param start_detector: detects if the service is ready for use. Either a callable (taking the log line and
+        optionally the service), a substring, a (compiled) regular expression or an iterable of substrings and regular
+        expressions
+        :param transient_error_detector: detects if the service encountered a transient error (same form as
+        `start_detector`)
+        :param persistent_error_detector: detects if the service is unable to start (same form as `start_detector`)
+        :raises ValueError: if a detector is an empty iterable of patterns
+        """
+        # In order of precedence
+        self._detectors: List[Tuple[LogDetection, _CompiledDetector]] = [
+            (LogDetection.PERSISTENT_ERROR, _CompiledDetector(persistent_error_detector)),
+            (LogDetection.TRANSIENT_ERROR, _CompiledDetector(transient_error_detector)),
+            (LogDetection.STARTED, _CompiledDetector(start_detector))]
+        self._has_listeners = any(detector.listener is not None for _, detector in self._detectors)
+        self._any_pattern = self._create_filter()
+
+    def detect(self, line: bytes, service: Any=None) -> Optional[LogDetection]:
+        """
+        Detects what the given log line indicates about the starting of the given service.
+        :param line: the (undecoded) log line
+        :param service: the starting service
+        :return: what the log line indicates or `None` if it indicates nothing
+        """
+        if not self._has_listeners and self._any_pattern is not None and self._any_pattern.search(line) is None:
+            return None
+
+        decoded_line = None
+        for detection, detector in self._detectors:
+            if len(detector.patterns) > 0:
+                if detector.search(line):
+                    return detection
+            elif detector.listener is not None:
+                if decoded_line is None:
+                    decoded_line = line.decode(_LOG_ENCODING, errors="replace")
+                if detector.listener(decoded_line, service):
+                    return detection
+        return None
+
+    def _create_filter(self) -> Optional[Pattern]:
+        """
+        Creates the regular expression that matches log lines matched by any of the detectors' regular expressions.
+        :return: the regular expression or `None` if log lines cannot be filtered (as there are no regular expressions or
+        some cannot be joined with others)
+        """
+        patterns = [pattern for _, detector in self._detectors for pattern in detector.patterns]
+        alternatives = [_to_alternative(pattern) for pattern in patterns]
+        if len(alternatives) == 0 or None in alternatives:
+            return None
+        return re.compile(b"|".join(alternatives))
@@ -0,0 +1,119 @@
+from threading import Lock, Thread, Event
+from time import sleep
+from typing import Callable, Dict, List, TYPE_CHECKING
+
+from useintest._logging import create_logger
+from useintest.common import streaming_docker_client
+
+if TYPE_CHECKING:
+    from useintest.engines import DockerEngine
+
+EVENTS_MISSED_ACTION = "useintest-events-missed"
+
+ContainerEventListener = Callable[[Dict], None]
+
+logger = create_logger(__name__)
+
+_RECONNECT_DELAY = 1.0
+
+
+class ContainerEventMonitor:
+    """
+    Monitors Docker container events with a single subscription to the Docker daemon, dispatching events to listeners of
+    particular containers.
+
+    If the subscription fails, all listeners are called with an event with the action `EVENTS_MISSED_ACTION` before the
+    subscription is re-established.
+    """
+    def __init__(self, engine: "DockerEngine"=None):
+        """
+        Constructor.
+        :param engine: the Docker engine whose events are monitored (defaults to that configured by the environment)
+        """
+        self.engine = engine
+        self._listeners: Dict[str, List[ContainerEventListener]] = {}
+        self._lock = Lock()
+        self._thread: Thread = None
+        self._started = Event()
+
+    def add_listener(self, container_id: str, listener: ContainerEventListener):
+        """
+        Adds a listener for events about the container with the given identifier.
+
+        Listeners are called on the monitor's thread and should therefore return quickly.
+        :param container_id: the identifier of the container
+        :param listener: the listener, which is given the decoded event
+        """
+        with self._lock:
+            self._listeners.setdefault(container_id, []).append(listener)
+            if self._thread is None:
+                self._thread = Thread(target=self._monitor, daemon=True)
+                self._thread.start()
+
+    def remove_listener(self, container_id: str, listener: ContainerEventListener):
+        """
+        Removes a listener for events about the container with the given identifier.
+        :param container_id: the identifier of the container
+        :param listener: the listener to remove
+        """
+        with self._lock:
+            listeners = self._listeners.get(container_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if len(listeners) == 0:
+                self._listeners.pop(container_id, None)
+
+    @property
+    def subscribed(self) -> bool:
+        """
+        Whether the monitor is currently subscribed to events from the Docker daemon.
+        :return: `True` if subscribed
+        """
+        return self._started.is_set()
+
+    def wait_until_subscribed(self, timeout: float=None) -> bool:
+        """
+        Blocks until the monitor has subscribed to events from the Docker daemon.
+        :param timeout: maximum number of seconds to wait
+        :return: whether the monitor has subscribed
+        """
+        return self._started.wait(timeout)
+
+    def _monitor(self):
+        """
+        Subscribes to container events, dispatching them to listeners (and re-subscribing if the subscription fails).
+        """
+        while True:
+            try:
+                streaming_client = self.engine.streaming_client() if self.engine is not None \
+                    else streaming_docker_client()
+                with streaming_client as client:
+                    events = client.events(decode=True, filters={"type": "container"})
+                    self._started.set()
+                    for event in events:
+                        self._dispatch(event.get("id", event.get("Actor", {}).get("ID")), event)
+            except Exception as e:
+                logger.warning(f"Subscription to Docker events failed: {e!r}")
+            self._started.clear()
+            with self._lock:
+                container_ids = list(self._listeners.keys())
+            for container_id in container_ids:
+                self._dispatch(container_id, {"id": container_id, "Action": EVENTS_MISSED_ACTION})
+            sleep(_RECONNECT_DELAY)
+
+    def _dispatch(self, container_id: str, event: Dict):
+        """
+        Dispatches the given event to the listeners of the given container.
+        :param container_id: the identifier of the container the event is about
+        :param event: the event
+        """
+        with self._lock:
+            listeners = list(self._listeners.get(container_id, []))
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning(f"Container event listener raised an error: {e!r}")
+
+
+container_event_monitor = ContainerEventMonitor()
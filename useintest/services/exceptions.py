@@ -19,6 +19,18 @@ class PersistentServiceStartError(ServiceStartError):
     """
 
 
+class ContainerCommandError(UseInTestError):
+    """
+    Exception for when a command run in the container of a service fails.
+    """
+
+
+class NamespaceError(UseInTestError):
+    """
+    Exception for when a tenant's namespace cannot be created in, or removed from, a shared service.
+    """
+
+
 class UnexpectedNumberOfPortsError(UseInTestError):
     """
     Exception for when the number of ports is not as expected.
@@ -0,0 +1,212 @@
+import asyncio
+import math
+from threading import Condition
+from typing import Union, Sequence, Dict, Optional, List, Callable, TYPE_CHECKING
+
+from useintest.common import get_docker_client
+from useintest.services.deadlines import Deadline
+from useintest.services.events import ContainerEventMonitor, container_event_monitor, EVENTS_MISSED_ACTION
+from useintest.services.exceptions import ServiceStartError, TransientServiceStartError, PersistentServiceStartError
+
+if TYPE_CHECKING:
+    from useintest.engines import DockerEngine
+
+Healthcheck = Union[str, Sequence[str], Dict]
+
+DEFAULT_HEALTHCHECK_INTERVAL = 0.5
+# So that a started service is only unhealthy after failing checks for 5s at the default interval (rather than Docker's
+# default of 3 checks)
+DEFAULT_HEALTHCHECK_RETRIES = 10
+# Docker requires a finite start period, so that of services given as long as they need to start is capped
+MAX_HEALTHCHECK_START_PERIOD = 24 * 60 * 60
+
+_NANOSECONDS_IN_SECOND = 1000000000
+_HEALTHY_ACTION = "health_status: healthy"
+_UNHEALTHY_ACTION = "health_status: unhealthy"
+_DIED_ACTION = "die"
+_OOM_ACTION = "oom"
+_DESTROYED_ACTION = "destroy"
+_HEALTHY_STATUS = "healthy"
+_UNHEALTHY_STATUS = "unhealthy"
+_RUNNING_STATUSES = {"created", "running", "restarting"}
+
+
+def to_docker_healthcheck(healthcheck: Healthcheck, interval: float=DEFAULT_HEALTHCHECK_INTERVAL,
+                          start_period: float=math.inf, retries: int=DEFAULT_HEALTHCHECK_RETRIES) -> Dict:
+    """
+    Converts the given healthcheck into the form taken by Docker when creating a container.
+    :param healthcheck: either a command run in a shell (string), a command run directly (sequence of strings) or a
+    healthcheck in the form taken by Docker (dictionary), which is returned unchanged
+    :param interval: number of seconds between healthchecks (Docker's default of 30s is too slow for testing)
+    :param start_period: number of seconds the container is given to start, during which failed healthchecks do not
+    make it unhealthy (capped at `MAX_HEALTHCHECK_START_PERIOD`). Should be the timeout for starting the service, so
+    that services that are slow to start are not restarted for being unhealthy
+    :param retries: number of consecutive failed healthchecks, after the start period, before the container is unhealthy
+    :return: the healthcheck in the form taken by Docker
+    """
+    if isinstance(healthcheck, dict):
+        return healthcheck
+    test = ["CMD-SHELL", healthcheck] if isinstance(healthcheck, str) else ["CMD"] + list(healthcheck)
+    return {"test": test, "interval": int(interval * _NANOSECONDS_IN_SECOND),
+            "start_period": int(min(start_period, MAX_HEALTHCHECK_START_PERIOD) * _NANOSECONDS_IN_SECOND),
+            "retries": retries}
+
+
+class ContainerHealthWaiter:
+    """
+    Waits for a container to become healthy, using the events from the shared subscription to Docker events rather than
+    polling the container or streaming its logs.
+
+    To be used as a context manager, which listens for events about the container whilst in context.
+    """
+    def __init__(self, container_id: str, monitor: ContainerEventMonitor=None, engine: "DockerEngine"=None):
+        """
+        Constructor.
+        :param container_id: the identifier of the container
+        :param monitor: the monitor of Docker container events (defaults to the engine's monitor)
+        :param engine: the Docker engine that the container is on (defaults to that configured by the environment)
+        """
+        if monitor is None:
+            monitor = engine.event_monitor if engine is not None else container_event_monitor
+        self.container_id = container_id
+        self._monitor = monitor
+        self._engine = engine
+        self._condition = Condition()
+        self._healthy = False
+        self._error: Optional[ServiceStartError] = None
+        # The container's state must be inspected once subscribed, as events may have been missed beforehand
+        self._inspection_required = True
+        self._wakeups: List[Callable[[], None]] = []
+
+    def __enter__(self) -> "ContainerHealthWaiter":
+        self._monitor.add_listener(self.container_id, self._on_event)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._monitor.remove_listener(self.container_id, self._on_event)
+
+    def wait(self, deadline: Deadline):
+        """
+        Blocks until the container is healthy.
+        :param deadline: the deadline by which the container must be healthy
+        :raises ServiceStartError: raised if the container has become unhealthy or has stopped
+        :raises TimeoutError: raised if the container is not healthy by the deadline
+        """
+        with deadline.on_expiry(self._wake):
+            while True:
+                with self._condition:
+                    if self._outcome_known():
+                        return
+                    inspect = self._inspection_required
+                    self._inspection_required = False
+                    if not inspect:
+                        self._condition.wait(deadline.remaining_or_none)
+                        deadline.check()
+                        continue
+                if not self._monitor.wait_until_subscribed(deadline.remaining_or_none):
+                    deadline.check()
+                self._inspect()
+
+    async def wait_async(self):
+        """
+        Waits until the container is healthy without blocking the event loop.
+        :raises ServiceStartError: raised if the container has become unhealthy or has stopped
+        """
+        loop = asyncio.get_event_loop()
+        changed = asyncio.Event()
+        wakeup = lambda: loop.call_soon_threadsafe(changed.set)
+        with self._condition:
+            self._wakeups.append(wakeup)
+        try:
+            while True:
+                changed.clear()
+                with self._condition:
+                    if self._outcome_known():
+                        return
+                    inspect = self._inspection_required
+                    self._inspection_required = False
+                if inspect:
+                    await loop.run_in_executor(None, self._monitor.wait_until_subscribed)
+                    await loop.run_in_executor(None, self._inspect)
+                else:
+                    await changed.wait()
+        finally:
+            with self._condition:
+                self._wakeups.remove(wakeup)
+
+    def _outcome_known(self) -> bool:
+        """
+        Whether it is known if the container has become healthy. Must be called with the condition held.
+        :raises ServiceStartError: raised if the container will not become healthy
+        :return: `True` if the container is healthy
+        """
+        if self._error is not None:
+            raise self._error
+        return self._healthy
+
+    def _inspect(self):
+        """
+        Inspects the state of the container, in case events about it have been missed.
+        """
+        from docker.errors import NotFound
+        try:
+            client = self._engine.get_client() if self._engine is not None else get_docker_client()
+            state = client.api.inspect_container(self.container_id)["State"]
+        except NotFound:
+            self._set_outcome(error=TransientServiceStartError(f"Container {self.container_id} no longer exists"))
+            return
+        health = state.get("Health")
+        if health is None:
+            self._set_outcome(error=PersistentServiceStartError(
+                f"Container {self.container_id} does not have a healthcheck"))
+        elif health.get("Status") == _HEALTHY_STATUS:
+            self._set_outcome(healthy=True)
+        elif health.get("Status") == _UNHEALTHY_STATUS:
+            self._set_outcome(error=TransientServiceStartError(f"Container {self.container_id} is unhealthy"))
+        elif state.get("OOMKilled", False):
+            self._set_outcome(error=PersistentServiceStartError(f"Container {self.container_id} ran out of memory"))
+        elif state.get("Status") not in _RUNNING_STATUSES:
+            self._set_outcome(error=TransientServiceStartError(
+                f"Container {self.container_id} has stopped before becoming healthy"))
+
+    def _on_event(self, event: Dict):
+        """
+        Called when there is a Docker event about the container.
+        :param event: the event
+        """
+        action = event.get("Action")
+        if action == _HEALTHY_ACTION:
+            self._set_outcome(healthy=True)
+        elif action == _UNHEALTHY_ACTION:
+            self._set_outcome(error=TransientServiceStartError(f"Container {self.container_id} is unhealthy"))
+        elif action == _OOM_ACTION:
+            self._set_outcome(error=PersistentServiceStartError(f"Container {self.container_id} ran out of memory"))
+        elif action in (_DIED_ACTION, _DESTROYED_ACTION):
+            self._set_outcome(error=TransientServiceStartError(
+                f"Container {self.container_id} has stopped before becoming healthy"))
+        elif action == EVENTS_MISSED_ACTION:
+            with self._condition:
+                self._inspection_required = True
+            self._wake()
+
+    def _set_outcome(self, healthy: bool=False, error: ServiceStartError=None):
+        """
+        Sets whether the container has become healthy, unless that is already known.
+        :param healthy: whether the container is healthy
+        :param error: the error if the container will not become healthy
+        """
+        with self._condition:
+            if not self._healthy and self._error is None:
+                self._healthy = healthy
+                self._error = error
+        self._wake()
+
+    def _wake(self):
+        """
+        Wakes up anything waiting for the container's health to change.
+        """
+        with self._condition:
+            self._condition.notify_all()
+            wakeups = list(self._wakeups)
+        for wakeup in wakeups:
+            wakeup()
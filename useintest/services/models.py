@@ -1,13 +1,20 @@
-from typing import Set, Optional, Generic, TypeVar
+import weakref
+from typing import Set, Optional, Generic, TypeVar, Dict, Sequence, Callable, ContextManager, TYPE_CHECKING
 
-from bidict import bidict
-from docker.errors import NotFound
-from docker.models.containers import Container
+from useintest.common import UseInTestModel, get_docker_client, streaming_docker_client
+from useintest.metrics import Timings
+from useintest.services.events import ContainerEventMonitor, container_event_monitor
+from useintest.services.exceptions import UnexpectedNumberOfPortsError, ContainerCommandError
 
-from useintest.common import UseInTestModel, docker_client
-from useintest.services.exceptions import UnexpectedNumberOfPortsError
+if TYPE_CHECKING:
+    from docker import DockerClient
+    from docker.models.containers import Container
+    from useintest.engines import DockerEngine
 
 UserType = TypeVar("UserType", bound="User")
+ServiceType = TypeVar("ServiceType", bound="Service")
+
+_CONTAINER_DESTROYED_ACTION = "destroy"
 
 
 class Service(UseInTestModel):
@@ -38,17 +45,31 @@ class Service(UseInTestModel):
         """
         Constructor.
         """
+        # Imported on construction so that importing service modules does not import their dependencies
+        from bidict import bidict
         super().__init__()
-        # FIXME: Assumption about where the Docker machine is accessible (i.e. it could be on a VM)
+        # Set to the host of the Docker engine that a Dockerised service is placed on (see `useintest.engines`)
         self.host = "localhost"
         self.ports = bidict()
+        # Set on tenants of a shared service (see `useintest.services.tenancy`)
+        self.namespace: Optional[str] = None
+        self.start_timings: Optional[Timings] = None
+        self.stop_timings: Optional[Timings] = None
 
     def get_external_port_mapping_to(self, port: int) -> int:
         """
-        Gets the port on localhost to which the given port in the container maps to.
+        Gets the port on the host to which the given port in the container maps to.
         :param port: the port inside the container
         :return: the port outside that maps to that in the container
         """
+        return self.ports[port]
+
+    def get_internal_port_mapping_from(self, port: int) -> int:
+        """
+        Gets the port in the container that the given port on the host maps to.
+        :param port: the port outside the container
+        :return: the port inside the container that the port outside maps to
+        """
         return self.ports.inv[port]
 
 
@@ -57,16 +78,21 @@ class DockerisedService(Service):
     A service running in a Docker container.
     """
     @property
-    def container(self) -> Optional[Container]:
-        if self.container_id is None:
-            return None
-        try:
-            return docker_client.containers.get(self.container_id)
-        except NotFound:
+    def container(self) -> Optional["Container"]:
+        """
+        Gets the handle of the service's container. The handle is cached whilst Docker events are being monitored and no
+        event has been received about the container since it was got.
+        :return: the container or `None` if the container no longer exists
+        """
+        if self.container_id is None or self._container_missing:
             return None
+        container = self._container
+        if container is None:
+            return self.refresh_container()
+        return container
 
     @container.setter
-    def container(self, container: Container):
+    def container(self, container: "Container"):
         self.container_id = container.id
 
     @property
@@ -75,13 +101,153 @@ class DockerisedService(Service):
 
     @container_id.setter
     def container_id(self, container_id: str):
+        if self._container_id is not None:
+            self._get_event_monitor().remove_listener(self._container_id, self._container_event_listener)
         self._container_id = container_id
+        self.invalidate_container()
+        if container_id is not None:
+            self._get_event_monitor().add_listener(container_id, self._container_event_listener)
+
+    @property
+    def engine(self) -> Optional["DockerEngine"]:
+        """
+        Gets the Docker engine that the service's container is on.
+        :return: the engine or `None` if the engine configured by the environment
+        """
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine: Optional["DockerEngine"]):
+        if self._container_id is not None:
+            self._get_event_monitor().remove_listener(self._container_id, self._container_event_listener)
+        self._engine = engine
+        self.invalidate_container()
+        if self._container_id is not None:
+            self._get_event_monitor().add_listener(self._container_id, self._container_event_listener)
 
     def __init__(self):
         super().__init__()
         self.name = None
+        # User-defined network that the container is on, on which other containers reach it by its name
+        self.network: Optional[str] = None
+        self._engine: Optional["DockerEngine"] = None
         self._container_id: str = None
+        self._container: Optional["Container"] = None
+        self._container_missing = False
+        self._container_generation = 0
         self.controller = None
+        self._container_event_listener = self._create_container_event_listener()
+
+    def __getstate__(self) -> Dict:
+        # The container handle, the listener of Docker events and the controller belong to this process, so they are not
+        # kept when the service is copied or serialised (e.g. to share it with another process)
+        state = dict(vars(self))
+        state["_container"] = None
+        state["controller"] = None
+        del state["_container_event_listener"]
+        return state
+
+    def __setstate__(self, state: Dict):
+        vars(self).update(state)
+        vars(self).setdefault("_engine", None)
+        self._container_event_listener = self._create_container_event_listener()
+        if self._container_id is not None:
+            self._get_event_monitor().add_listener(self._container_id, self._container_event_listener)
+
+    def get_docker_client(self) -> "DockerClient":
+        """
+        Gets a client of the Docker engine that the service's container is on.
+        :return: the Docker client
+        """
+        if self._engine is None:
+            return get_docker_client()
+        return self._engine.get_client()
+
+    def streaming_docker_client(self) -> ContextManager["DockerClient"]:
+        """
+        Checks out a client of the Docker engine that the service's container is on for a streaming call, returning it
+        on exit (see `streaming_docker_client`).
+        :return: context manager giving the Docker client
+        """
+        if self._engine is None:
+            return streaming_docker_client()
+        return self._engine.streaming_client()
+
+    def refresh_container(self) -> Optional["Container"]:
+        """
+        Gets the handle of the service's container from Docker, updating the cached handle.
+        :return: the container or `None` if the container no longer exists
+        """
+        self.invalidate_container()
+        if self.container_id is None:
+            return None
+        from docker.errors import NotFound
+        generation = self._container_generation
+        try:
+            container = self.get_docker_client().containers.get(self.container_id)
+        except NotFound:
+            return None
+        if self._get_event_monitor().subscribed and generation == self._container_generation:
+            self._container = container
+        return container
+
+    def run_command(self, command: Sequence[str], user: str=None) -> str:
+        """
+        Runs the given command in the service's container.
+        :param command: the command to run
+        :param user: (optional) the user to run the command as
+        :raises ContainerCommandError: if the command fails
+        :return: the command's output
+        """
+        exit_code, output = self.container.exec_run(list(command), user=user if user is not None else "")
+        output = output.decode("utf-8", errors="replace") if output is not None else ""
+        if exit_code != 0:
+            raise ContainerCommandError(f"Command {command} failed with exit code {exit_code}: {output}")
+        return output
+
+    def invalidate_container(self, removed: bool=False):
+        """
+        Invalidates the cached handle of the service's container, so it is got from Docker when next accessed.
+        :param removed: whether the container has been (or is being) removed, in which case the service will be treated
+        as not having a container
+        """
+        self._container_generation += 1
+        self._container = None
+        self._container_missing = removed
+
+    def _create_container_event_listener(self) -> Callable[[Dict], None]:
+        """
+        Creates the listener of Docker events about the service's container, which does not keep the service alive.
+        :return: the listener
+        """
+        service_reference = weakref.ref(self)
+
+        def on_container_event(event: Dict):
+            service = service_reference()
+            if service is not None:
+                service._on_container_event(event)
+
+        return on_container_event
+
+    def _on_container_event(self, event: Dict):
+        """
+        Called when there is a Docker event about the service's container.
+        :param event: the event
+        """
+        self._container_generation += 1
+        self._container = None
+        if event.get("Action") == _CONTAINER_DESTROYED_ACTION:
+            self._container_missing = True
+            self._get_event_monitor().remove_listener(self._container_id, self._container_event_listener)
+
+    def _get_event_monitor(self) -> ContainerEventMonitor:
+        """
+        Gets the monitor of events from the Docker engine that the service's container is on.
+        :return: the event monitor
+        """
+        if self._engine is None:
+            return container_event_monitor
+        return self._engine.event_monitor
 
     # TODO: Not sure of the best way to specify the type as it could be that of a subclass...
     def __enter__(self):
@@ -141,3 +307,27 @@ class DockerisedServiceWithUsers(Generic[UserType], DockerisedService, ServiceWi
     """
     Service running on Docker with users.
     """
+
+
+class ServiceStartResult(Generic[ServiceType], UseInTestModel):
+    """
+    Result of an attempt to start a service.
+    """
+    @property
+    def started(self) -> bool:
+        """
+        Whether the service was started.
+        :return: `True` if the service was started
+        """
+        return self.error is None
+
+    def __init__(self, service: ServiceType=None, error: Exception=None):
+        """
+        Constructor.
+        :param service: the started service (if started)
+        :param error: the error raised when trying to start the service (if not started)
+        """
+        if (service is None) == (error is None):
+            raise ValueError("Exactly one of the service or the error must be given")
+        self.service = service
+        self.error = error
@@ -0,0 +1,145 @@
+import atexit
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread, Event
+from time import monotonic
+from typing import Generic, TypeVar, Callable, Deque, Tuple
+
+from useintest._logging import create_logger
+from useintest.services.models import Service
+
+ServiceType = TypeVar("ServiceType", bound=Service)
+
+logger = create_logger(__name__)
+
+
+class ServicePool(Generic[ServiceType]):
+    """
+    Pool of services that have been started (and are ready for use) in advance of them being required.
+    """
+    def __init__(self, start: Callable[[], ServiceType], stop: Callable[[ServiceType], None], size: int,
+                 max_idle_time: float=math.inf, refill_concurrency: int=1):
+        """
+        Constructor.
+        :param start: callable that starts a new service, blocking until it is ready for use
+        :param stop: callable that stops the given service
+        :param size: number of ready services that the pool should hold
+        :param max_idle_time: maximum number of seconds a service can wait in the pool before it is replaced
+        :param refill_concurrency: maximum number of services that are started in parallel to refill the pool
+        """
+        if size < 1:
+            raise ValueError(f"Pool size must be positive: {size}")
+        if refill_concurrency < 1:
+            raise ValueError(f"Refill concurrency must be positive: {refill_concurrency}")
+        self.size = size
+        self.max_idle_time = max_idle_time
+        self.refill_concurrency = refill_concurrency
+        self._start = start
+        self._stop = stop
+
+        self._ready: Deque[Tuple[float, ServiceType]] = deque()
+        self._pending = 0
+        self._closed = False
+        self._condition = Condition()
+        self._executor = ThreadPoolExecutor(max_workers=refill_concurrency)
+        self._expiry_stop = Event()
+
+        if max_idle_time is not math.inf:
+            Thread(target=self._expire_continuously, daemon=True).start()
+        atexit.register(self.tear_down)
+        self._refill()
+
+    @property
+    def number_ready(self) -> int:
+        """
+        Gets the number of services that are ready to be acquired from the pool.
+        :return: the number of ready services
+        """
+        with self._condition:
+            return len(self._ready)
+
+    def acquire(self) -> ServiceType:
+        """
+        Acquires a ready service from the pool, which the caller then owns. Blocks if services are being started but
+        none are ready; starts a service on the calling thread if none are being started.
+        :raises ServiceStartError: if a service had to be started and it could not be
+        :return: the acquired service
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Pool has been torn down")
+            self._expire()
+            while len(self._ready) == 0 and self._pending > 0:
+                self._condition.wait()
+                self._expire()
+            service = self._ready.popleft()[1] if len(self._ready) > 0 else None
+            self._refill()
+
+        return service if service is not None else self._start()
+
+    def tear_down(self):
+        """
+        Tears down the pool, stopping all services that are held in it (acquired services are not stopped).
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._expiry_stop.set()
+            to_stop = [service for _, service in self._ready]
+            self._ready.clear()
+        self._executor.shutdown(wait=False)
+        for service in to_stop:
+            self._stop(service)
+
+    def _refill(self):
+        """
+        Schedules the starting of services to bring the pool up to size. Must be called with the lock held.
+        """
+        if self._closed:
+            return
+        for _ in range(self.size - len(self._ready) - self._pending):
+            self._pending += 1
+            self._executor.submit(self._start_into_pool)
+
+    def _start_into_pool(self):
+        """
+        Starts a service and puts it into the pool.
+        """
+        service = None
+        try:
+            service = self._start()
+        except Exception as e:
+            logger.warning(f"Could not start service to refill pool: {e!r}")
+        finally:
+            with self._condition:
+                self._pending -= 1
+                if service is not None and not self._closed:
+                    self._ready.append((monotonic(), service))
+                    service = None
+                self._condition.notify_all()
+        if service is not None:
+            # Pool was torn down whilst the service was starting
+            self._stop(service)
+
+    def _expire(self):
+        """
+        Removes services that have been idle in the pool for longer than allowed and schedules their replacement. Must
+        be called with the lock held.
+        """
+        if self._closed:
+            return
+        now = monotonic()
+        while len(self._ready) > 0 and now - self._ready[0][0] > self.max_idle_time:
+            _, service = self._ready.popleft()
+            self._executor.submit(self._stop, service)
+        self._refill()
+
+    def _expire_continuously(self):
+        """
+        Periodically expires idle services until the pool is torn down.
+        """
+        while not self._expiry_stop.wait(self.max_idle_time):
+            with self._condition:
+                self._expire()
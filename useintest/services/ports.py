@@ -0,0 +1,226 @@
+import fcntl
+import os
+import socket
+import tempfile
+from abc import ABCMeta, abstractmethod
+from threading import Lock
+from typing import List, Optional, Iterable, Tuple, IO, Set
+
+from useintest._logging import create_logger
+from useintest.common import UseInTestError
+
+PORT_ALLOCATION_ENVIRONMENT_VARIABLE = "USEINTEST_PORT_ALLOCATION"
+PORT_RANGE_ENVIRONMENT_VARIABLE = "USEINTEST_PORT_RANGE"
+PORT_LOCK_LOCATION_ENVIRONMENT_VARIABLE = "USEINTEST_PORT_LOCK_LOCATION"
+
+EPHEMERAL_PORT_ALLOCATION = "ephemeral"
+RANGE_PORT_ALLOCATION = "range"
+
+# Below the range from which Linux assigns ephemeral ports (32768-60999), so ports are not taken by outgoing connections
+DEFAULT_PORT_RANGE = (20000, 29999)
+DEFAULT_PORT_BLOCK_SIZE = 100
+DEFAULT_PORT_LOCK_LOCATION = os.path.join(tempfile.gettempdir(), f"useintest-ports-{os.getuid()}")
+
+_LOCK_FILE_EXTENSION = "lock"
+
+logger = create_logger(__name__)
+
+
+class PortAllocationError(UseInTestError):
+    """
+    Raised when no more host ports can be allocated.
+    """
+
+
+class PortAllocator(metaclass=ABCMeta):
+    """
+    Allocates the host ports to which the ports exposed by services' containers are published.
+    """
+    # Whether the allocator can only be used for services on local Docker engines (whose ports are published on this
+    # machine)
+    local_only = False
+
+    @abstractmethod
+    def allocate(self, number: int) -> List[Optional[int]]:
+        """
+        Allocates host ports.
+        :param number: the number of ports to allocate
+        :raises PortAllocationError: if the ports cannot be allocated
+        :return: the allocated ports, with `None` for each port that is to be assigned by the Docker engine when the
+        container is started
+        """
+
+    def release(self, ports: Iterable[int]):
+        """
+        Releases host ports allocated by this allocator, once they are no longer published.
+        :param ports: the ports to release
+        """
+
+
+class EphemeralPortAllocator(PortAllocator):
+    """
+    Leaves the Docker engine to assign free host ports when containers are started, which cannot collide. The ports of
+    a service are only known once its container has started.
+    """
+    def allocate(self, number: int) -> List[Optional[int]]:
+        return [None] * number
+
+
+class PortRangeAllocator(PortAllocator):
+    """
+    Allocates host ports from blocks of a range that are reserved by this process, so that processes sharing the range
+    (e.g. pytest-xdist workers) never allocate the same port.
+
+    Blocks are reserved with locks on files in the lock location (`USEINTEST_PORT_LOCK_LOCATION`), so they are released
+    when the process holding them dies. All processes must use the same range and block size, and only processes on the
+    same machine are coordinated. Ports that are bound by other programs are skipped, which can only be checked on this
+    machine, so the allocator can only be used for services on local Docker engines.
+    """
+    local_only = True
+
+    def __init__(self, start: int=DEFAULT_PORT_RANGE[0], end: int=DEFAULT_PORT_RANGE[1],
+                 block_size: int=DEFAULT_PORT_BLOCK_SIZE, location: str=None):
+        """
+        Constructor.
+        :param start: the first port of the range
+        :param end: the last port of the range (inclusive)
+        :param block_size: the number of ports in each block reserved by a process
+        :param location: the directory in which the lock files of blocks are kept (defaults to
+        `USEINTEST_PORT_LOCK_LOCATION`, if set)
+        """
+        if not 0 < start <= end <= 65535:
+            raise ValueError(f"Invalid port range: {start}-{end}")
+        if block_size < 1:
+            raise ValueError(f"Block size must be positive: {block_size}")
+        self.start = start
+        self.end = end
+        self.block_size = block_size
+        self.location = location if location is not None \
+            else os.environ.get(PORT_LOCK_LOCATION_ENVIRONMENT_VARIABLE, DEFAULT_PORT_LOCK_LOCATION)
+        self._blocks: List[Tuple[int, IO]] = []
+        self._allocated: Set[int] = set()
+        self._last_allocated = start - 1
+        self._pid = os.getpid()
+        self._lock = Lock()
+
+    def allocate(self, number: int) -> List[Optional[int]]:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            ports = []
+            try:
+                for _ in range(number):
+                    ports.append(self._allocate_port())
+            except BaseException:
+                self._allocated.difference_update(ports)
+                raise
+            return ports
+
+    def release(self, ports: Iterable[int]):
+        with self._lock:
+            self._allocated.difference_update(ports)
+
+    def _allocate_port(self) -> int:
+        """
+        Allocates a port from the reserved blocks, reserving another block if they are all in use. Ports are allocated
+        in turn, so that a released port is not allocated again straight away. Must be called with the lock held.
+        :raises PortAllocationError: if all the ports of the blocks that can be reserved are in use
+        :return: the allocated port
+        """
+        reserved = [port for block_start, _ in self._blocks for port in self._get_block_ports(block_start)]
+        candidates = sorted(reserved, key=lambda port: port <= self._last_allocated)
+        while True:
+            for port in candidates:
+                if port not in self._allocated and _is_port_free(port):
+                    self._allocated.add(port)
+                    self._last_allocated = port
+                    return port
+            block_start = self._reserve_block()
+            if block_start is None:
+                raise PortAllocationError(
+                    f"All ports in the blocks of range {self.start}-{self.end} that can be reserved are in use")
+            candidates = self._get_block_ports(block_start)
+
+    def _reserve_block(self) -> Optional[int]:
+        """
+        Reserves a block of the range that is not reserved by any process. Must be called with the lock held.
+        :return: the first port of the reserved block or `None` if all blocks are reserved
+        """
+        os.makedirs(self.location, exist_ok=True)
+        reserved = {block_start for block_start, _ in self._blocks}
+        for block_start in range(self.start, self.end + 1, self.block_size):
+            if block_start in reserved:
+                continue
+            lock_file = open(os.path.join(self.location, f"{block_start}.{_LOCK_FILE_EXTENSION}"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            logger.debug(f"Reserved ports {block_start}-{block_start + self.block_size - 1}")
+            self._blocks.append((block_start, lock_file))
+            return block_start
+        return None
+
+    def _get_block_ports(self, block_start: int) -> List[int]:
+        """
+        Gets the ports in the block starting at the given port.
+        :param block_start: the first port of the block
+        :return: the block's ports
+        """
+        return list(range(block_start, min(block_start + self.block_size, self.end + 1)))
+
+    def _reset_after_fork(self):
+        """
+        Gives up the blocks reserved by the parent in a forked process, which must reserve its own.
+        """
+        for _, lock_file in self._blocks:
+            # The parent's locks are held until the parent also closes the files
+            lock_file.close()
+        self._blocks = []
+        self._allocated = set()
+        self._pid = os.getpid()
+
+
+def _is_port_free(port: int) -> bool:
+    """
+    Gets whether the given port is not bound on this machine.
+    :param port: the port
+    :return: `True` if the port can be bound
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as port_socket:
+        try:
+            port_socket.bind(("", port))
+        except OSError:
+            return False
+    return True
+
+
+def _parse_port_range(specification: str) -> Tuple[int, int]:
+    """
+    Parses a range of ports.
+    :param specification: the range (e.g. `20000-29999`)
+    :return: the first and last port of the range
+    """
+    start, separator, end = specification.partition("-")
+    if separator == "":
+        raise ValueError(f"Invalid port range (expected `start-end`): {specification}")
+    return int(start), int(end)
+
+
+def create_port_allocator() -> PortAllocator:
+    """
+    Creates the port allocator configured by the environment (`USEINTEST_PORT_ALLOCATION`, either `ephemeral`, the
+    default, or `range`, with ports taken from `USEINTEST_PORT_RANGE` if set).
+    :return: the port allocator
+    """
+    strategy = os.environ.get(PORT_ALLOCATION_ENVIRONMENT_VARIABLE, EPHEMERAL_PORT_ALLOCATION).strip().lower()
+    if strategy == EPHEMERAL_PORT_ALLOCATION:
+        return EphemeralPortAllocator()
+    if strategy == RANGE_PORT_ALLOCATION:
+        specification = os.environ.get(PORT_RANGE_ENVIRONMENT_VARIABLE)
+        return PortRangeAllocator(*(_parse_port_range(specification) if specification else DEFAULT_PORT_RANGE))
+    raise ValueError(f"Unknown port allocation strategy (set by `{PORT_ALLOCATION_ENVIRONMENT_VARIABLE}`): {strategy}")
+
+
+default_port_allocator = create_port_allocator()
@@ -0,0 +1,165 @@
+import asyncio
+import socket
+from abc import ABCMeta, abstractmethod
+from random import uniform
+from typing import Callable, Iterator, Optional, TYPE_CHECKING
+
+from useintest.services.deadlines import Deadline
+from useintest.services.models import Service
+
+if TYPE_CHECKING:
+    from requests import Response, Session
+
+DEFAULT_PROBE_TIMEOUT = 1.0
+
+HEAD_METHOD = "HEAD"
+GET_METHOD = "GET"
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter, used to space out probes.
+    """
+    def __init__(self, initial: float=0.05, multiplier: float=2.0, maximum: float=1.0, jitter: float=0.5):
+        """
+        Constructor.
+        :param initial: the number of seconds to wait after the first failed probe
+        :param multiplier: the factor by which the wait increases after each failed probe
+        :param maximum: the maximum number of seconds to wait between probes
+        :param jitter: fraction of each wait that is randomised (0 for no jitter, 1 for "full jitter"), which stops
+        probes of services started at the same time from being synchronised
+        """
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError(f"Jitter must be between 0 and 1: {jitter}")
+        self.initial = initial
+        self.multiplier = multiplier
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def delays(self) -> Iterator[float]:
+        """
+        Generates the number of seconds to wait after each failed probe.
+        :return: infinite iterator of waits
+        """
+        delay = self.initial
+        while True:
+            yield delay - uniform(0.0, delay * self.jitter)
+            delay = min(delay * self.multiplier, self.maximum)
+
+
+class Probe(metaclass=ABCMeta):
+    """
+    Probe of whether a service is ready for use.
+    """
+    @abstractmethod
+    def __call__(self, service: Service, session: "Session", timeout: float) -> bool:
+        """
+        Probes the given service.
+        :param service: the service to probe
+        :param session: HTTP session kept for all probes of the service (so connections are reused)
+        :param timeout: the number of seconds to wait for the probe to complete
+        :return: whether the probe indicates that the service is ready
+        """
+
+    @staticmethod
+    def _get_host_port(service: Service, port: Optional[int]) -> int:
+        """
+        Gets the port on the host to probe.
+        :param service: the service to probe
+        :param port: the port inside the container (`None` if the service only exposes one port)
+        :return: the port on the host
+        """
+        return service.port if port is None else service.ports[port]
+
+
+class HttpProbe(Probe):
+    """
+    Probe that makes a HTTP request to the service.
+    """
+    def __init__(self, detector: Callable[["Response"], bool]=None, endpoint: str="", method: str=HEAD_METHOD,
+                 port: int=None):
+        """
+        Constructor.
+        :param detector: callable that detects if the service is ready for use based on the response (defaults to
+        the service being ready once it responds)
+        :param endpoint: endpoint to call that should respond if the service has started
+        :param method: the HTTP method to make requests with (e.g. `HEAD_METHOD` or `GET_METHOD`)
+        :param port: the port inside the container to make requests to (required if the service exposes more than one)
+        """
+        self.detector = detector
+        self.endpoint = endpoint
+        self.method = method
+        self.port = port
+
+    def __call__(self, service: Service, session: "Session", timeout: float) -> bool:
+        url = f"http://{service.host}:{self._get_host_port(service, self.port)}/{self.endpoint}"
+        from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+        try:
+            response = session.request(self.method, url, timeout=timeout)
+        except (RequestsConnectionError, Timeout):
+            return False
+        return self.detector(response) if self.detector is not None else True
+
+
+class TcpProbe(Probe):
+    """
+    Probe that connects to the service over TCP.
+
+    Note that Docker's userland proxy, if used, accepts connections to published ports before the service is listening.
+    """
+    def __init__(self, port: int=None):
+        """
+        Constructor.
+        :param port: the port inside the container to connect to (required if the service exposes more than one)
+        """
+        self.port = port
+
+    def __call__(self, service: Service, session: "Session", timeout: float) -> bool:
+        try:
+            with socket.create_connection((service.host, self._get_host_port(service, self.port)), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+
+def wait_until_probe_succeeds(probe: Probe, service: Service, deadline: Deadline, backoff: Backoff=None,
+                              timeout: float=DEFAULT_PROBE_TIMEOUT):
+    """
+    Blocks until the given probe indicates that the given service is ready.
+    :param probe: the probe
+    :param service: the service to probe
+    :param deadline: the deadline by which the service must be ready
+    :param backoff: the backoff between probes (defaults to `Backoff()`)
+    :param timeout: the maximum number of seconds each probe can take
+    :raises TimeoutError: raised if the service is not ready by the deadline
+    """
+    from requests import Session
+    backoff = backoff if backoff is not None else Backoff()
+    with Session() as session:
+        for delay in backoff.delays():
+            deadline.check()
+            if probe(service, session, min(timeout, deadline.remaining)):
+                return
+            deadline.sleep(delay)
+
+
+async def wait_until_probe_succeeds_async(probe: Probe, service: Service, deadline: Deadline, backoff: Backoff=None,
+                                          timeout: float=DEFAULT_PROBE_TIMEOUT):
+    """
+    Waits until the given probe indicates that the given service is ready, without blocking the event loop.
+    :param probe: the probe
+    :param service: the service to probe
+    :param deadline: the deadline by which the service must be ready
+    :param backoff: the backoff between probes (defaults to `Backoff()`)
+    :param timeout: the maximum number of seconds each probe can take
+    :raises TimeoutError: raised if the service is not ready by the deadline
+    """
+    loop = asyncio.get_event_loop()
+    from requests import Session
+    backoff = backoff if backoff is not None else Backoff()
+    with Session() as session:
+        for delay in backoff.delays():
+            deadline.check()
+            if await loop.run_in_executor(None, probe, service, session, min(timeout, deadline.remaining)):
+                return
+            await asyncio.sleep(min(delay, deadline.remaining))
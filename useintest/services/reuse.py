@@ -0,0 +1,141 @@
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from time import time
+from typing import Dict, Any, Optional, List, IO
+
+from useintest._logging import create_logger
+from useintest.common import create_private_directory
+from useintest.services.models import Service
+
+REUSE_LOCATION_ENVIRONMENT_VARIABLE = "USEINTEST_REUSE_LOCATION"
+DEFAULT_REUSE_LOCATION = os.path.join(tempfile.gettempdir(), f"useintest-reuse-{os.getuid()}")
+
+REUSE_KEY_LABEL = "useintest.reuse.key"
+REUSE_IMAGE_LABEL = "useintest.reuse.image"
+REUSE_CREATED_LABEL = "useintest.reuse.created"
+
+_LOCK_FILE_EXTENSION = "lock"
+_STATE_FILE_EXTENSION = "pickle"
+
+logger = create_logger(__name__)
+
+
+def get_reuse_key(repository: str, tag: str, ports: List[int], run_settings: Dict[str, Any]) -> str:
+    """
+    Gets the key that identifies containers that can be reused for services started from the given repository, tag,
+    ports and run settings.
+    :param repository: the repository of the image the service is started from
+    :param tag: the tag of the image the service is started from
+    :param ports: the ports the service exposes
+    :param run_settings: the settings used to create the service's container
+    :return: the reuse key
+    """
+    identity = json.dumps([repository, tag, sorted(ports), run_settings], sort_keys=True, default=str)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def get_reuse_labels(key: str, image_id: str) -> Dict[str, str]:
+    """
+    Gets the labels to put on a container so that it can be found for reuse.
+    :param key: the reuse key (see `get_reuse_key`)
+    :param image_id: the identifier of the image the container is created from
+    :return: the labels
+    """
+    return {REUSE_KEY_LABEL: key, REUSE_IMAGE_LABEL: image_id, REUSE_CREATED_LABEL: str(time())}
+
+
+class ReusableContainer:
+    """
+    Claim on a container that can be reused by later processes (whilst claimed, it is used by only this process).
+
+    Claims are held with locks on files in the reuse location (`USEINTEST_REUSE_LOCATION`), so they are released if the
+    process holding them dies. The model of the container's service is stored alongside the lock once the claim is
+    released, so that the process that next claims the container can use the service without starting it.
+    """
+    @staticmethod
+    def claim(container_id: str, created_at: float) -> Optional["ReusableContainer"]:
+        """
+        Claims the given container, if it is not claimed by another process.
+        :param container_id: the container's identifier
+        :param created_at: when the container was created (seconds since the epoch)
+        :return: the claim or `None` if the container is claimed by another process or the reuse location could be
+        accessed by other users
+        """
+        location = os.environ.get(REUSE_LOCATION_ENVIRONMENT_VARIABLE, DEFAULT_REUSE_LOCATION)
+        try:
+            # Stored services are unpickled, so they must only be read from a location that others cannot write to
+            create_private_directory(location)
+        except PermissionError as e:
+            logger.warning(f"Not reusing containers: {e}")
+            return None
+        lock_file = open(os.path.join(location, f"{container_id}.{_LOCK_FILE_EXTENSION}"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return ReusableContainer(container_id, created_at, lock_file, location)
+
+    @property
+    def age(self) -> float:
+        """
+        Gets the age of the container.
+        :return: the number of seconds since the container was created
+        """
+        return time() - self.created_at
+
+    def __init__(self, container_id: str, created_at: float, lock_file: IO, location: str):
+        """
+        Constructor.
+        :param container_id: the container's identifier
+        :param created_at: when the container was created (seconds since the epoch)
+        :param lock_file: the open, locked, lock file
+        :param location: the directory in which the lock file, and the stored service, are kept
+        """
+        self.container_id = container_id
+        self.created_at = created_at
+        self._lock_file = lock_file
+        self._state_location = os.path.join(location, f"{container_id}.{_STATE_FILE_EXTENSION}")
+
+    def load_service(self) -> Optional[Service]:
+        """
+        Loads the model of the container's service, as stored when the container was last released.
+        :return: the service or `None` if no service has been stored (e.g. as the process that used the container died)
+        """
+        try:
+            with open(self._state_location, "rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.warning(f"Could not load stored service of container {self.container_id}: {e!r}")
+            return None
+
+    def release(self, service: Service):
+        """
+        Releases the claim, storing the given model of the container's service for the process that next claims it.
+        :param service: the container's service
+        """
+        temp_location = f"{self._state_location}.{os.getpid()}"
+        with open(temp_location, "wb") as file:
+            pickle.dump(service, file)
+        os.replace(temp_location, self._state_location)
+        self._lock_file.close()
+
+    def discard(self):
+        """
+        Releases the claim without the container being reusable (e.g. because it is being removed).
+        """
+        try:
+            os.remove(self._state_location)
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(self._lock_file.name)
+        except FileNotFoundError:
+            pass
+        self._lock_file.close()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+from useintest._logging import create_logger
+from useintest.common import get_docker_client
+
+if TYPE_CHECKING:
+    from docker.models.containers import Container
+    from docker.models.images import Image
+    from useintest.engines import DockerEngine
+
+SNAPSHOT_REPOSITORY_PREFIX = "useintest-snapshot"
+SNAPSHOT_KEY_LABEL = "useintest.snapshot.key"
+SNAPSHOT_BASE_IMAGE_LABEL = "useintest.snapshot.base-image"
+
+logger = create_logger(__name__)
+
+
+def get_snapshot_key(repository: str, tag: str, run_settings: Dict[str, Any]) -> str:
+    """
+    Gets the key that identifies snapshots of services started from the given repository, tag and run settings.
+    :param repository: the repository of the image the service is started from
+    :param tag: the tag of the image the service is started from
+    :param run_settings: the settings used to create the service's container
+    :return: the snapshot key
+    """
+    identity = json.dumps([repository, tag, run_settings], sort_keys=True, default=str)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def get_snapshot_name(repository: str, key: str, base_image_id: str) -> str:
+    """
+    Gets the name (`repository:tag`) of the snapshot with the given key, taken of a service started from the given image.
+    :param repository: the repository of the image the service is started from
+    :param key: the snapshot key (see `get_snapshot_key`)
+    :param base_image_id: the identifier of the image the service is started from
+    :return: the snapshot image name
+    """
+    base_image_digest = base_image_id.split(":")[-1]
+    return f"{SNAPSHOT_REPOSITORY_PREFIX}/{repository.replace('/', '-')}:{key[:32]}-{base_image_digest[:32]}"
+
+
+def get_snapshot(repository: str, key: str, base_image_id: str, engine: "DockerEngine"=None) -> Optional["Image"]:
+    """
+    Gets the snapshot image with the given key, taken of a service started from the given image. Snapshots with the same
+    key that were taken from a different version of the image are removed.
+    :param repository: the repository of the image the service is started from
+    :param key: the snapshot key (see `get_snapshot_key`)
+    :param base_image_id: the identifier of the image the service is started from
+    :param engine: the Docker engine on which the snapshot is to be used (defaults to that configured by the
+    environment)
+    :return: the snapshot image or `None` if there is no (valid) snapshot
+    """
+    from docker.errors import ImageNotFound, APIError
+    client = engine.get_client() if engine is not None else get_docker_client()
+    for image in client.images.list(filters={"label": f"{SNAPSHOT_KEY_LABEL}={key}"}):
+        if image.labels.get(SNAPSHOT_BASE_IMAGE_LABEL) != base_image_id:
+            logger.info(f"Removing out of date snapshot image: {image.id}")
+            try:
+                client.images.remove(image.id, force=True)
+            except (ImageNotFound, APIError) as e:
+                logger.warning(f"Could not remove out of date snapshot image {image.id}: {e}")
+
+    try:
+        return client.images.get(get_snapshot_name(repository, key, base_image_id))
+    except ImageNotFound:
+        return None
+
+
+def create_snapshot(container: "Container", repository: str, key: str, base_image_id: str) -> "Image":
+    """
+    Creates a snapshot image of the given container.
+
+    Data written to volumes declared by the image is not captured in the snapshot.
+    :param container: the container to take a snapshot of
+    :param repository: the repository of the image the container was created from
+    :param key: the snapshot key (see `get_snapshot_key`)
+    :param base_image_id: the identifier of the image the container was created from
+    :return: the snapshot image
+    """
+    snapshot_repository, snapshot_tag = get_snapshot_name(repository, key, base_image_id).rsplit(":", 1)
+    return container.commit(repository=snapshot_repository, tag=snapshot_tag, changes=[
+        f"LABEL {SNAPSHOT_KEY_LABEL}={key}",
+        f"LABEL {SNAPSHOT_BASE_IMAGE_LABEL}={base_image_id}"
+    ])
@@ -0,0 +1,198 @@
+import atexit
+import copy
+from abc import ABCMeta, abstractmethod
+from collections.abc import MutableMapping, MutableSet, MutableSequence
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+from time import monotonic
+from typing import Generic, TypeVar, Callable, Optional, Dict, Set
+from uuid import uuid4
+
+from useintest._logging import create_logger
+from useintest.metrics import Timings, CREATE_NAMESPACE_PHASE, REMOVE_NAMESPACE_PHASE
+from useintest.services.models import Service
+
+ServiceType = TypeVar("ServiceType", bound=Service)
+
+NAMESPACE_PREFIX = "useintest_"
+DEFAULT_RECLAIM_CONCURRENCY = 4
+
+logger = create_logger(__name__)
+
+
+class Tenancy(Generic[ServiceType], metaclass=ABCMeta):
+    """
+    Way of isolating the tenants of a shared service from each other, by giving each tenant its own namespace in the
+    service (e.g. a database).
+    """
+    @abstractmethod
+    def create_namespace(self, service: ServiceType, tenant: ServiceType):
+        """
+        Creates the tenant's namespace (`tenant.namespace`) in the shared service, setting up anything else the tenant
+        needs to use it (e.g. a user).
+        :param service: the shared service
+        :param tenant: the tenant (a copy of the shared service, which can be modified). The namespace may be created
+        again for the same tenant after being removed, when the tenant is reset
+        :raises UseInTestError: if the namespace could not be created (e.g. `NamespaceError`)
+        """
+
+    @abstractmethod
+    def remove_namespace(self, service: ServiceType, tenant: ServiceType):
+        """
+        Removes the tenant's namespace, and everything in it, from the shared service.
+        :param service: the shared service
+        :param tenant: the tenant
+        :raises UseInTestError: if the namespace could not be removed (e.g. `NamespaceError`)
+        """
+
+
+class SharedService(Generic[ServiceType]):
+    """
+    Service, started on first use, that is shared by tenants that are each leased their own namespace in it.
+    Namespaces are removed in the background once released.
+    """
+    @property
+    def number_of_tenants(self) -> int:
+        """
+        Gets the number of tenants that currently hold a lease.
+        :return: the number of tenants
+        """
+        with self._lock:
+            return len(self._tenants)
+
+    def __init__(self, start: Callable[[], ServiceType], stop: Callable[[ServiceType], None],
+                 tenancy: Tenancy[ServiceType], reclaim_concurrency: int=DEFAULT_RECLAIM_CONCURRENCY):
+        """
+        Constructor.
+        :param start: callable that starts the shared service, blocking until it is ready for use
+        :param stop: callable that stops the shared service
+        :param tenancy: how tenants are given namespaces in the shared service
+        :param reclaim_concurrency: maximum number of released namespaces that are removed in parallel
+        """
+        if reclaim_concurrency < 1:
+            raise ValueError(f"Reclaim concurrency must be positive: {reclaim_concurrency}")
+        self.tenancy = tenancy
+        self._start = start
+        self._stop = stop
+        self._service: Optional[ServiceType] = None
+        self._tenants: Set[ServiceType] = set()
+        self._closed = False
+        self._lock = Lock()
+        self._start_lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=reclaim_concurrency)
+        atexit.register(self.tear_down)
+
+    def lease(self) -> ServiceType:
+        """
+        Leases a namespace in the shared service, starting the shared service if it has not been started.
+        :raises ServiceStartError: if the shared service had to be started and it could not be
+        :raises UseInTestError: if the namespace could not be created
+        :return: the tenant: a copy of the shared service with its own namespace (`namespace`)
+        """
+        service = self._get_service()
+        tenant = copy.copy(service)
+        for name, value in vars(tenant).items():
+            # So that tenancies can modify tenants (e.g. add users) without changing the shared service
+            if isinstance(value, (MutableMapping, MutableSet, MutableSequence)):
+                setattr(tenant, name, copy.copy(value))
+        tenant.namespace = f"{NAMESPACE_PREFIX}{uuid4().hex}"
+        tenant.start_timings = Timings()
+        tenant.stop_timings = None
+        with tenant.start_timings.time(CREATE_NAMESPACE_PHASE):
+            self.tenancy.create_namespace(service, tenant)
+        with self._lock:
+            self._tenants.add(tenant)
+        return tenant
+
+    def release(self, tenant: ServiceType) -> Future:
+        """
+        Releases the given tenant's lease, removing its namespace in the background.
+        :param tenant: the tenant
+        :raises ValueError: if the given service is not a tenant of this shared service
+        :return: future that completes, with the number of seconds spent in each phase of removing the namespace, once
+        the namespace has been removed
+        """
+        with self._lock:
+            if tenant not in self._tenants:
+                raise ValueError(f"Not a tenant of the shared service: {tenant}")
+            self._tenants.remove(tenant)
+            service = self._service
+        try:
+            return self._executor.submit(self._reclaim, service, tenant)
+        except RuntimeError:
+            # Work cannot be scheduled once the shared service is being torn down or the interpreter has started to shut
+            # down (e.g. when releasing tenants on exit), so the namespace is removed straight away
+            reclaimed = Future()
+            try:
+                reclaimed.set_result(self._reclaim(service, tenant))
+            except Exception as e:
+                reclaimed.set_exception(e)
+            return reclaimed
+
+    def reset(self, tenant: ServiceType):
+        """
+        Resets the given tenant by removing its namespace, and everything in it, then creating it again.
+        :param tenant: the tenant
+        :raises ValueError: if the given service is not a tenant of this shared service
+        :raises UseInTestError: if the namespace could not be removed or created
+        """
+        with self._lock:
+            if tenant not in self._tenants:
+                raise ValueError(f"Not a tenant of the shared service: {tenant}")
+            service = self._service
+        self.tenancy.remove_namespace(service, tenant)
+        self.tenancy.create_namespace(service, tenant)
+
+    def is_tenant(self, service: Service) -> bool:
+        """
+        Gets whether the given service is a tenant of this shared service that holds a lease.
+        :param service: the service
+        :return: whether the service is a tenant
+        """
+        with self._lock:
+            return service in self._tenants
+
+    def tear_down(self):
+        """
+        Tears down the shared service, waiting for released namespaces to be removed and then stopping the service
+        (whether or not it still has tenants).
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._tenants.clear()
+        self._executor.shutdown(wait=True)
+        with self._start_lock:
+            service = self._service
+            self._service = None
+        if service is not None:
+            self._stop(service)
+
+    def _get_service(self) -> ServiceType:
+        """
+        Gets the shared service, starting it if it has not been started.
+        :return: the shared service
+        """
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("Shared service has been torn down")
+            if self._service is None:
+                self._service = self._start()
+            return self._service
+
+    def _reclaim(self, service: ServiceType, tenant: ServiceType) -> Dict[str, float]:
+        """
+        Removes the namespace of the given tenant.
+        :param service: the shared service
+        :param tenant: the tenant whose namespace is to be removed
+        :return: the number of seconds spent in each phase of removing the namespace
+        """
+        started_at = monotonic()
+        try:
+            self.tenancy.remove_namespace(service, tenant)
+        except Exception as e:
+            logger.warning(f"Could not remove namespace {tenant.namespace}: {e!r}")
+            raise
+        return {REMOVE_NAMESPACE_PHASE: monotonic() - started_at}
+
@@ -0,0 +1,66 @@
+import math
+import os
+import unittest
+
+from temphelpers import TempManager
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine, use_fake_docker_engine
+from useintest.benchmarks.runner import percentile, benchmark_service_controller, store_results, load_results, \
+    format_results, START_LATENCY, STOPPED_LATENCY, BenchmarkResult
+from useintest.images import ImageCache
+from useintest.metrics import READINESS_PHASE
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.tests.common import clean_up_controllers
+
+_STARTED_LOG_LINE = "started"
+
+
+class TestPercentile(unittest.TestCase):
+    """
+    Tests for `percentile`.
+    """
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(95, percentile(values, 95))
+        self.assertEqual(1, percentile(values, 0))
+
+    def test_percentile_of_nothing(self):
+        self.assertTrue(math.isnan(percentile([], 50)))
+
+
+class TestBenchmarkServiceController(unittest.TestCase):
+    """
+    Tests for `benchmark_service_controller`.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine(create_delay=0.01, log_script=[(0.0, "starting"), (0.01, _STARTED_LOG_LINE)])
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        clean_up_controllers(self)
+
+    def test_benchmark(self):
+        image_cache = ImageCache()
+        with use_fake_docker_engine(self.engine):
+            result = benchmark_service_controller("test", lambda: DockerisedServiceController(
+                DockerisedService, "test", "latest", [], image_cache=image_cache, start_tries=1,
+                start_log_detector=_STARTED_LOG_LINE), iterations=5, concurrency=2)
+        self.assertEqual(5, len(result.samples[START_LATENCY]))
+        self.assertEqual(5, len(result.samples[STOPPED_LATENCY]))
+        self.assertGreater(percentile(result.samples[f"{START_LATENCY}:{READINESS_PHASE}"], 50), 0.0)
+        self.assertGreater(result.throughput, 0.0)
+
+    def test_store_and_compare(self):
+        result = BenchmarkResult("test")
+        result.add_sample(START_LATENCY, 1.0)
+        result.operations = 1
+        result.duration = 1.0
+        directory = os.path.join(self.temp_manager.create_temp_directory(), "results")
+        baseline = load_results(store_results([result], directory))
+        result.add_sample(START_LATENCY, 3.0)
+        self.assertIn("(+200.0%)", format_results([result], baseline))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+import os
+import socket
+import unittest
+from time import monotonic, sleep
+from typing import Callable
+from unittest.mock import patch
+
+from temphelpers import TempManager
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.broker._protocol import create_socket_directory, check_peer
+from useintest.broker.client import BrokerClient
+from useintest.broker.exceptions import BrokerError
+from useintest.broker.server import ServiceBroker
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.tests.common import clean_up_controllers
+
+_CONTROLLER_NAME = "fake"
+_WAIT_TIMEOUT = 10.0
+
+
+def _wait_until(condition: Callable[[], bool]):
+    """
+    Waits until the given condition is true.
+    :param condition: the condition
+    :raises AssertionError: if the condition is not true within the timeout
+    """
+    started_at = monotonic()
+    while not condition():
+        if monotonic() - started_at > _WAIT_TIMEOUT:
+            raise AssertionError("Timed out waiting for condition")
+        sleep(0.01)
+
+
+class TestServiceBroker(unittest.TestCase):
+    """
+    Tests for `ServiceBroker`, using `BrokerClient` to lease services from it.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+
+        self.resets = []
+        controller = DockerisedServiceController(
+            DockerisedService, "fake", "latest", [], image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, resetter=lambda service: self.resets.append(service.name))
+        self.socket_location = os.path.join(self.temp_manager.create_temp_directory(), "broker.sock")
+        self.broker = ServiceBroker({_CONTROLLER_NAME: controller}, self.socket_location, pool_size=1)
+        self.broker.start()
+        self.addCleanup(self.broker.tear_down)
+        self.client = BrokerClient(self.socket_location)
+        self.addCleanup(self.client.close)
+
+    def _get_running_container_names(self):
+        return {container.name for container in self.engine.containers.list()}
+
+    def test_socket_only_accessible_by_user(self):
+        self.assertEqual(0o600, os.stat(self.socket_location).st_mode & 0o777)
+
+    def test_lease(self):
+        service = self.client.lease(_CONTROLLER_NAME)
+        self.assertIn(service.name, self._get_running_container_names())
+        self.assertIsNotNone(service.container)
+        self.assertEqual(1, self.client.get_status()[_CONTROLLER_NAME]["leased"])
+
+    def test_lease_unknown_controller(self):
+        self.assertRaises(BrokerError, self.client.lease, "unknown")
+
+    def test_pool_kept_warm(self):
+        _wait_until(lambda: self.client.get_status()[_CONTROLLER_NAME]["ready"] == 1)
+        self.client.lease(_CONTROLLER_NAME)
+        _wait_until(lambda: self.client.get_status()[_CONTROLLER_NAME]["ready"] == 1)
+
+    def test_release_for_reuse(self):
+        service = self.client.lease(_CONTROLLER_NAME)
+        self.client.release(service)
+        _wait_until(lambda: self.client.get_status()[_CONTROLLER_NAME]["ready"] == 2)
+        self.assertEqual([service.name], self.resets)
+        self.assertEqual(service.name, self.client.lease(_CONTROLLER_NAME).name)
+
+    def test_release_by_context_manager(self):
+        with self.client.lease(_CONTROLLER_NAME) as service:
+            pass
+        _wait_until(lambda: self.resets == [service.name])
+        self.assertEqual(0, self.client.get_status()[_CONTROLLER_NAME]["leased"])
+
+    def test_release_without_reset(self):
+        service = self.client.lease(_CONTROLLER_NAME)
+        self.client.release(service, reset=False)
+        _wait_until(lambda: service.name not in self._get_running_container_names())
+        self.assertEqual([], self.resets)
+
+    def test_release_when_enough_returned(self):
+        services = [self.client.lease(_CONTROLLER_NAME) for _ in range(2)]
+        for service in services:
+            self.client.release(service)
+        _wait_until(lambda: services[1].name not in self._get_running_container_names())
+        self.assertEqual([services[0].name], self.resets)
+
+    def test_release_not_leased(self):
+        self.assertRaises(ValueError, self.client.release, DockerisedService())
+
+    def test_leases_stopped_when_client_closed(self):
+        service = self.client.lease(_CONTROLLER_NAME)
+        self.client.close()
+        _wait_until(lambda: service.name not in self._get_running_container_names())
+
+    def test_second_broker_on_socket(self):
+        broker = ServiceBroker({}, self.socket_location)
+        self.assertRaises(BrokerError, broker.start)
+
+    def test_stale_socket_replaced(self):
+        socket_location = os.path.join(self.temp_manager.create_temp_directory(), "broker.sock")
+        open(socket_location, "w").close()
+        broker = ServiceBroker({}, socket_location)
+        broker.start()
+        broker.tear_down()
+
+    def test_socket_owned_by_another_user(self):
+        with patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertRaises(BrokerError, BrokerClient(self.socket_location).lease, _CONTROLLER_NAME)
+        self.assertEqual(0, self.client.get_status()[_CONTROLLER_NAME]["leased"])
+
+    def test_tear_down(self):
+        service = self.client.lease(_CONTROLLER_NAME)
+        self.broker.tear_down()
+        self.assertFalse(os.path.exists(self.socket_location))
+        _wait_until(lambda: len(self._get_running_container_names()) == 0)
+        self.assertRaises(BrokerError, self.client.lease, _CONTROLLER_NAME)
+        self.assertNotIn(service.name, self._get_running_container_names())
+
+    def test_lease_whilst_tearing_down(self):
+        pool = self.broker._controllers[_CONTROLLER_NAME].pool
+        acquire = pool.acquire
+
+        def tear_down_then_acquire():
+            self.broker.tear_down()
+            return acquire()
+
+        with patch.object(pool, "acquire", side_effect=tear_down_then_acquire):
+            self.assertRaises(BrokerError, self.broker.lease, _CONTROLLER_NAME)
+
+
+class TestSocketSecurity(unittest.TestCase):
+    """
+    Tests for the checks that the broker's socket, and the processes at either end of it, belong to the current user.
+    """
+    def setUp(self):
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+
+    def test_create_socket_directory(self):
+        directory = os.path.join(self.temp_manager.create_temp_directory(), "broker")
+        create_socket_directory(directory)
+        self.assertEqual(0, os.stat(directory).st_mode & 0o077)
+        create_socket_directory(directory)
+
+    def test_create_socket_directory_accessible_by_others(self):
+        directory = self.temp_manager.create_temp_directory()
+        os.chmod(directory, 0o777)
+        self.assertRaises(BrokerError, create_socket_directory, directory)
+
+    def test_create_socket_directory_owned_by_another_user(self):
+        directory = self.temp_manager.create_temp_directory()
+        os.chmod(directory, 0o700)
+        with patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertRaises(BrokerError, create_socket_directory, directory)
+
+    def test_check_peer(self):
+        if not hasattr(socket, "SO_PEERCRED"):
+            self.skipTest("Requires peer credentials")
+        connection, other = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(connection.close)
+        self.addCleanup(other.close)
+        check_peer(connection)
+        with patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertRaises(BrokerError, check_peer, connection)
+
+
+if __name__ == "__main__":
+    unittest.main()
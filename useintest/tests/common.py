@@ -1,6 +1,10 @@
 import re
+from unittest import TestCase
 
 from useintest.common import MOUNTABLE_TEMP_DIRECTORY
+from useintest.reaper import default_reaper
+from useintest.services.controllers import DockerisedServiceController, _services_to_stop_on_exit, \
+    _unregister_stop_on_exit
 
 MOUNTABLE_TEMP_CREATION_KWARGS = {"dir": MOUNTABLE_TEMP_DIRECTORY}
 
@@ -23,3 +27,36 @@ def extract_version_number(string: str) -> str:
     if matched is None:
         raise ValueError("No version number in string")
     return matched.group().replace("_", ".")
+
+
+def clean_up_controllers(test_case: TestCase):
+    """
+    Makes the given test clean up the process-wide state left by the controllers it uses (the cleanup runs after those
+    added later): pools and shared services created during the test are torn down and removed, the default reaper is
+    flushed and services still registered to be stopped on exit are unregistered (else they would be stopped on exit
+    against whichever Docker engine is configured by then).
+    :param test_case: the test
+    """
+    services_to_stop_on_exit = set(_services_to_stop_on_exit.keys())
+    pools = set(DockerisedServiceController._pools.keys())
+    shared_services = set(DockerisedServiceController._shared_services.keys())
+
+    def clean_up():
+        with DockerisedServiceController._pools_lock:
+            created_pools = [DockerisedServiceController._pools.pop(key)
+                             for key in set(DockerisedServiceController._pools.keys()) - pools]
+        for pool in created_pools:
+            pool.tear_down()
+            # Services being started to refill the pool are stopped once started
+            pool._executor.shutdown(wait=True)
+        with DockerisedServiceController._shared_services_lock:
+            created_shared_services = [DockerisedServiceController._shared_services.pop(key)
+                                       for key in set(DockerisedServiceController._shared_services.keys())
+                                       - shared_services]
+        for shared_service in created_shared_services:
+            shared_service.tear_down()
+        default_reaper.flush()
+        for service in set(_services_to_stop_on_exit.keys()) - services_to_stop_on_exit:
+            _unregister_stop_on_exit(service)
+
+    test_case.addCleanup(clean_up)
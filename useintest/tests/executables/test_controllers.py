@@ -14,6 +14,7 @@ from useintest.tests.executables.common import get_builder_for_commands_to_run_p
     UBUNTU_IMAGE_TO_TEST_WITH
 from useintest.tests.common import MOUNTABLE_TEMP_CREATION_KWARGS
 from useintest.common import MOUNTABLE_TEMP_DIRECTORY
+from useintest.ownership import get_session_pid, OWNER_PID_LABEL
 
 _CONTENT = "Hello World!"
 _CAT_MOUNTED_ARGUMENT_PARSER = MountedArgumentParserBuilder(
@@ -100,6 +101,17 @@ class TestExecutablesController(unittest.TestCase):
         out, error = self._run_commands(commands, [_CONTENT])
         self.assertEqual(out, _CONTENT)
 
+    def test_create_executable_commands_labels_container_with_owner(self):
+        commands_builder = CommandsBuilder("echo", image=UBUNTU_IMAGE_TO_TEST_WITH, executable_arguments=[_CONTENT])
+        commands = self.controller.create_executable_commands(Executable(commands_builder, False))
+        self.assertIn(f"--label {OWNER_PID_LABEL}={get_session_pid()}", commands)
+
+    def test_create_executable_commands_joins_network(self):
+        commands_builder = CommandsBuilder("echo", image=UBUNTU_IMAGE_TO_TEST_WITH, executable_arguments=[_CONTENT],
+                                           network="network")
+        commands = self.controller.create_executable_commands(Executable(commands_builder, False))
+        self.assertIn("--network network", commands)
+
     def _run_commands(self, commands: str, arguments: List=None, raise_if_stderr: bool=True) -> Tuple[str, str]:
         """
         Saves the given commands as an executable and runs it with the given arguments.
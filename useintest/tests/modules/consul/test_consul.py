@@ -11,6 +11,7 @@ from useintest.tests.services.common import TestServiceControllerSubclass
 
 _TEST_KEY = "hello"
 _TEST_VALUE = "world"
+_TEST_SERVICE = "test-service"
 
 
 class _TestConsulServiceController(
@@ -30,6 +31,18 @@ class _TestConsulServiceController(
         consul_client = Consul()
         self._test_client(consul_client)
 
+    def test_reset(self):
+        controller = type(self).get_type_to_test()()
+        with controller.start_service() as service:     # type: ConsulDockerisedService
+            consul_client = service.create_consul_client()
+            consul_client.kv.put(_TEST_KEY, _TEST_VALUE)
+            consul_client.agent.service.register(_TEST_SERVICE)
+            container_id = service.container_id
+            controller.reset_service(service)
+            self.assertEqual(container_id, service.container_id)
+            self.assertIsNone(consul_client.kv.get(_TEST_KEY)[1])
+            self.assertNotIn(_TEST_SERVICE, consul_client.agent.services())
+
     def _test_client(self, consul_client: Consul):
         """
         Tests that the given Consul client connects to Consul
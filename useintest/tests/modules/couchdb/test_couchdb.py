@@ -22,6 +22,16 @@ class _TestCouchDBDockerisedServiceController(
         identifier, revision = database.save(posted)
         self.assertEqual(posted, database[identifier])
 
+    def test_reset(self):
+        controller = type(self).get_type_to_test()()
+        with controller.start_service() as service:
+            couch = Server("http://%s:%d" % (service.host, service.port))
+            couch.create("test-database")
+            container_id = service.container_id
+            controller.reset_service(service)
+            self.assertEqual(container_id, service.container_id)
+            self.assertNotIn("test-database", couch)
+
 
 # Setup tests
 globals().update(create_tests(_TestCouchDBDockerisedServiceController, get_classes_to_test(couchdb_service_controllers, CouchDBServiceController)))
@@ -23,6 +23,19 @@ class _TestGitLabBaseServiceController(
         response_payload = json.loads(response.text)
         self.assertEqual(service.root_user.username, response_payload["username"])
 
+    def test_reset(self):
+        controller = type(self).get_type_to_test()()
+        with controller.start_service() as service:
+            url = f"http://{service.host}:{service.ports[80]}/api/v3"
+            response = requests.post(f"{url}/session", data={
+                "login": service.root_user.username, "password": service.root_user.password})
+            headers = {"PRIVATE-TOKEN": response.json()["private_token"]}
+            requests.post(f"{url}/projects", data={"name": "test"}, headers=headers).raise_for_status()
+            container_id = service.container_id
+            controller.reset_service(service)
+            self.assertEqual(container_id, service.container_id)
+            self.assertEqual([], requests.get(f"{url}/projects", headers=headers).json())
+
 
 # Setup tests
 globals().update(create_tests(_TestGitLabBaseServiceController, get_classes_to_test(
@@ -26,6 +26,17 @@ class _TestGogsBaseServiceController(
         self.assertEqual(f"{authentication.username}/{_REPO_NAME}",
                           gogs_connection.get_repo(authentication, authentication.username, _REPO_NAME).full_name)
 
+    def test_reset(self):
+        controller = type(self).get_type_to_test()()
+        with controller.start_service() as service:
+            authentication = UsernamePassword(service.root_user.username, service.root_user.password)
+            gogs_connection = GogsApi(f"http://{service.host}:{service.ports[3000]}")
+            gogs_connection.create_repo(authentication, _REPO_NAME)
+            container_id = service.container_id
+            controller.reset_service(service)
+            self.assertEqual(container_id, service.container_id)
+            self.assertFalse(gogs_connection.repo_exists(authentication, authentication.username, _REPO_NAME))
+
 
 # Setup tests
 globals().update(create_tests(_TestGogsBaseServiceController, get_classes_to_test(
@@ -35,6 +35,17 @@ class _TestIrodsServiceController(
         setup_helper = IrodsSetupHelper(self.icommands_location)
         self.assertEqual(self.service.version, self.setup_helper.get_icat_version())
 
+    def test_reset(self):
+        self.setup_helper.create_data_object("name", "data")
+        self.setup_helper.create_collection("collection")
+        self.setup_helper.create_user("reset-user", self.service.root_user.zone)
+        container_id = self.service.container_id
+        self.icat_controller.reset_service(self.service)
+        self.assertEqual(container_id, self.service.container_id)
+        # Only the (empty) home collection is listed
+        self.assertEqual(1, len(self.setup_helper.run_icommand(["ils"]).strip().splitlines()))
+        self.assertNotIn("reset-user", self.setup_helper.run_icommand(["iadmin", "lu"]))
+
 
 # Setup tests
 globals().update(create_tests(_TestIrodsServiceController, get_classes_to_test(irods_service_controllers, IrodsServiceController)))
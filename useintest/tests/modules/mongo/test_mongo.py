@@ -1,11 +1,12 @@
 import unittest
 from abc import ABCMeta
+from time import sleep
 
 from pymongo import MongoClient
 from testhelpers import create_tests, TypeUsedInTest, get_classes_to_test
 
 from useintest.modules.mongo import Mongo3DockerisedServiceController, MongoLatestDockerisedServiceController, \
-    MongoServiceController, mongo_service_controllers
+    MongoServiceController, mongo_service_controllers, MongoTenancy
 from useintest.services.models import DockerisedServiceWithUsers
 from useintest.tests.services.common import TestDockerisedServiceControllerSubclass
 
@@ -24,6 +25,33 @@ class _TestMongoDockerisedServiceController(
         retrieved = database.posts.find_one({"_id": post_id})
         self.assertEqual(retrieved, posted)
 
+    def test_reset(self):
+        controller = type(self).get_type_to_test()()
+        with controller.start_service() as service:
+            client = MongoClient(service.host, service.port)
+            client["test-database"].posts.insert_one({"this": "value"})
+            container_id = service.container_id
+            controller.reset_service(service)
+            self.assertEqual(container_id, service.container_id)
+            self.assertNotIn("test-database", client.list_database_names())
+
+    def test_tenants(self):
+        controller = type(self).get_type_to_test()(tenancy=MongoTenancy())
+        tenants = [controller.start_service() for _ in range(2)]
+        self.assertEqual(1, len({tenant.container_id for tenant in tenants}))
+        self.assertNotEqual(tenants[0].namespace, tenants[1].namespace)
+
+        client = MongoClient(tenants[0].host, tenants[0].port)
+        client[tenants[0].namespace].posts.insert_one({"this": "value"})
+        self.assertIn(tenants[0].namespace, client.list_database_names())
+        controller.stop_service(tenants[0])
+        controller.stop_service(tenants[1])
+        # Namespaces are removed in the background
+        while tenants[0].stop_timings.succeeded is None:
+            sleep(0.1)
+        self.assertTrue(tenants[0].stop_timings.succeeded)
+        self.assertNotIn(tenants[0].namespace, client.list_database_names())
+
 
 # Setup tests
 CLASSES_TO_TEST = {Mongo3DockerisedServiceController, MongoLatestDockerisedServiceController}
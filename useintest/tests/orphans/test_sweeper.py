@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import unittest
+from time import time
+from typing import Dict
+
+from temphelpers import TempManager
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.orphans.sweeper import is_owner_alive, sweep_orphans
+from useintest.ownership import get_owner_labels, OWNER_PID_LABEL, OWNER_HOST_LABEL, OWNER_CREATED_LABEL, \
+    OWNER_FILE_NAME
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.services.reuse import REUSE_KEY_LABEL
+from useintest.tests.common import clean_up_controllers
+
+
+def _get_dead_owner_labels() -> Dict[str, str]:
+    """
+    Gets owner labels of a process that has exited.
+    :return: the owner labels
+    """
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return dict(get_owner_labels(), **{OWNER_PID_LABEL: str(process.pid)})
+
+
+class TestIsOwnerAlive(unittest.TestCase):
+    """
+    Tests for `is_owner_alive`.
+    """
+    def test_alive(self):
+        self.assertTrue(is_owner_alive(get_owner_labels()))
+
+    def test_dead(self):
+        self.assertFalse(is_owner_alive(_get_dead_owner_labels()))
+
+    def test_identifier_reused(self):
+        labels = dict(get_owner_labels(), **{OWNER_CREATED_LABEL: "0"})
+        self.assertFalse(is_owner_alive(labels))
+
+    def test_other_host(self):
+        labels = dict(get_owner_labels(), **{OWNER_HOST_LABEL: f"not-{socket.gethostname()}",
+                                             OWNER_CREATED_LABEL: str(time() - 60)})
+        self.assertTrue(is_owner_alive(labels))
+        self.assertFalse(is_owner_alive(labels, max_age=30))
+
+
+class TestSweepOrphans(unittest.TestCase):
+    """
+    Tests for `sweep_orphans`.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine()
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+        self.engine.images.pull("fake")
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        self.temp_location = self.temp_manager.create_temp_directory()
+
+    def _create_container(self, labels: Dict[str, str]) -> str:
+        container = self.engine.containers.create("fake:latest", labels=labels)
+        container.start()
+        return container.id
+
+    def _create_temp_directory(self, labels: Dict[str, str]=None) -> str:
+        directory = self.temp_manager.create_temp_directory(dir=self.temp_location)
+        if labels is not None:
+            with open(os.path.join(directory, OWNER_FILE_NAME), "w") as file:
+                json.dump(labels, file)
+        return directory
+
+    def _get_container_ids(self):
+        return {container.id for container in self.engine.containers.list(all=True)}
+
+    def test_sweep(self):
+        alive = self._create_container(get_owner_labels())
+        orphan = self._create_container(_get_dead_owner_labels())
+        unowned = self._create_container({})
+        reusable = self._create_container(dict(_get_dead_owner_labels(), **{REUSE_KEY_LABEL: "key"}))
+        result = sweep_orphans(temp_locations=[self.temp_location])
+        self.assertEqual([orphan], result.containers)
+        self.assertEqual({alive, unowned, reusable}, self._get_container_ids())
+
+    def test_service_containers_owned(self):
+        controller = DockerisedServiceController(DockerisedService, "fake", "latest", [], image_cache=ImageCache(),
+                                                 start_log_detector=lambda line: True, start_tries=1)
+        self.engine.log_script = [(0.0, "started")]
+        service = controller.start_service()
+        self.addCleanup(controller.stop_service, service)
+        self.assertEqual(get_owner_labels()[OWNER_PID_LABEL], service.container.labels[OWNER_PID_LABEL])
+        self.assertEqual([], sweep_orphans(temp_locations=[]).containers)
+
+    def test_sweep_reusable(self):
+        reusable = self._create_container(dict(_get_dead_owner_labels(), **{REUSE_KEY_LABEL: "key"}))
+        self.assertEqual([reusable], sweep_orphans(include_reusable=True, temp_locations=[]).containers)
+
+    def test_sweep_temp_directories(self):
+        alive = self._create_temp_directory(get_owner_labels())
+        orphans = {self._create_temp_directory(_get_dead_owner_labels()) for _ in range(3)}
+        unowned = self._create_temp_directory()
+        result = sweep_orphans(temp_locations=[self.temp_location])
+        self.assertEqual(orphans, set(result.temp_directories))
+        self.assertEqual({alive, unowned}, {entry.path for entry in os.scandir(self.temp_location)})
+
+    def test_sweep_networks(self):
+        self.engine.networks.create("alive", labels=get_owner_labels())
+        self.engine.networks.create("orphan", labels=_get_dead_owner_labels())
+        result = sweep_orphans(temp_locations=[])
+        self.assertEqual(["orphan"], result.networks)
+        self.assertEqual(["alive"], [network.name for network in self.engine.networks.list()])
+
+    def test_dry_run(self):
+        orphan = self._create_container(_get_dead_owner_labels())
+        directory = self._create_temp_directory(_get_dead_owner_labels())
+        result = sweep_orphans(temp_locations=[self.temp_location], dry_run=True)
+        self.assertEqual([orphan], result.containers)
+        self.assertEqual([directory], result.temp_directories)
+        self.assertIn(orphan, self._get_container_ids())
+        self.assertTrue(os.path.exists(directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ from unittest import TestCase
 
 from testhelpers import TypeUsedInTest, TestUsingType
 
-from useintest.common import docker_client
+from useintest.common import get_docker_client
 from useintest.services.models import DockerisedService, Service
 
 ServiceType = TypeVar("ServiceType", bound=Service)
@@ -39,9 +39,10 @@ class TestDockerisedServiceControllerSubclass(Generic[TypeUsedInTest, ServiceTyp
     """
     def test_stop(self):
         service = self._start_service()
-        assert len(docker_client.containers.list(filters=dict(name=service.name))) == 1
+        assert len(get_docker_client().containers.list(filters=dict(name=service.name))) == 1
         self.service_controller.stop_service(service)
-        self.assertEqual(0, len(docker_client.containers.list(filters=dict(name=service.name))))
+        self.service_controller.reaper.flush()
+        self.assertEqual(0, len(get_docker_client().containers.list(filters=dict(name=service.name))))
 
     def test_stop_when_not_started(self):
         service = DockerisedService()
@@ -1,10 +1,23 @@
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import sleep
+from typing import Dict
+from unittest.mock import MagicMock
 
 from docker.errors import NotFound
 
-from useintest.common import docker_client
+from useintest.common import get_docker_client
+from useintest.metrics import RESET_KIND, RESOLVE_IMAGE_PHASE, CREATE_CONTAINER_PHASE, START_CONTAINER_PHASE, READINESS_PHASE, \
+    POST_START_PHASE, REMOVE_CONTAINER_PHASE, RESET_PHASE, REPLACE_CONTAINER_PHASE
 from useintest.services.builders import DockerisedServiceControllerTypeBuilder
-from useintest.services.exceptions import ServiceStartError
+from useintest.services.controllers import ServiceController, _wait_for_all, _wait_for_all_async
+from useintest.services.deadlines import Deadline
+from useintest.services.models import Service
+from useintest.services.exceptions import ServiceStartError, TransientServiceStartError, ContainerCommandError, \
+    PersistentServiceStartError
+from useintest.services.snapshots import SNAPSHOT_KEY_LABEL
 
 NoopServiceController = DockerisedServiceControllerTypeBuilder(
     name="NoopController",
@@ -16,6 +29,95 @@ NoopServiceController = DockerisedServiceControllerTypeBuilder(
 ).build()
 
 
+class _FakeServiceController(ServiceController[Service]):
+    """
+    Controller of fake services, which fail to start if their runtime configuration says so.
+    """
+    def __init__(self):
+        super().__init__(Service)
+        self.running = set()
+        self._lock = Lock()
+
+    def start_service(self, runtime_configuration: Dict=None) -> Service:
+        if runtime_configuration is not None and runtime_configuration.get("fail", False):
+            raise ServiceStartError()
+        service = Service()
+        with self._lock:
+            self.running.add(service)
+        return service
+
+    def stop_service(self, service: Service):
+        with self._lock:
+            self.running.discard(service)
+
+
+class TestServiceController(unittest.TestCase):
+    """
+    Tests for `ServiceController`.
+    """
+    def setUp(self):
+        self._service_controller = _FakeServiceController()
+
+    def test_start_services(self):
+        results = self._service_controller.start_services(5, max_concurrency=2)
+        self.assertEqual(5, len(results))
+        self.assertTrue(all(result.started for result in results))
+        self.assertEqual({result.service for result in results}, self._service_controller.running)
+
+    def test_start_services_with_failures(self):
+        results = self._service_controller.start_services(runtime_configurations=[{}, {"fail": True}, {}])
+        self.assertEqual([True, False, True], [result.started for result in results])
+        self.assertIsInstance(results[1].error, ServiceStartError)
+
+    def test_start_services_with_mismatched_configurations(self):
+        self.assertRaises(ValueError, self._service_controller.start_services, 2, [{}])
+
+    def test_stop_services(self):
+        services = [result.service for result in self._service_controller.start_services(3)]
+        self._service_controller.stop_services(services)
+        self.assertEqual(0, len(self._service_controller.running))
+
+
+class TestWaitForAll(unittest.TestCase):
+    """
+    Tests for `_wait_for_all`.
+    """
+    def test_waits_for_all(self):
+        completed = []
+        _wait_for_all([lambda deadline, i=i: completed.append(i) for i in range(3)], Deadline(5))
+        self.assertEqual({0, 1, 2}, set(completed))
+
+    def test_error_cancels_others(self):
+        def fail(deadline: Deadline):
+            raise TransientServiceStartError()
+
+        def wait_until_cancelled(deadline: Deadline):
+            deadline.sleep(60)
+            deadline.check()
+
+        self.assertRaises(TransientServiceStartError, _wait_for_all, [wait_until_cancelled, fail], Deadline())
+
+    def test_no_waits(self):
+        _wait_for_all([], Deadline(5))
+
+
+class TestWaitForAllAsync(unittest.TestCase):
+    """
+    Tests for `_wait_for_all_async`.
+    """
+    def test_waits_for_all(self):
+        completed = []
+
+        async def complete(i: int):
+            completed.append(i)
+
+        asyncio.get_event_loop().run_until_complete(_wait_for_all_async([complete(i) for i in range(3)]))
+        self.assertEqual({0, 1, 2}, set(completed))
+
+    def test_no_waits(self):
+        asyncio.get_event_loop().run_until_complete(_wait_for_all_async([]))
+
+
 class TestDockerisedServiceController(unittest.TestCase):
     """
     Tests for `DockerisedServiceController`.
@@ -27,12 +129,14 @@ class TestDockerisedServiceController(unittest.TestCase):
         with self._service_controller.start_service() as service:
             self.assertEqual("running", service.container.status)
             container_id = service.container_id
+        self._service_controller.reaper.flush()
         self.assertIsNone(service.container)
-        self.assertRaises(NotFound, docker_client.containers.get, container_id)
+        self.assertRaises(NotFound, get_docker_client().containers.get, container_id)
 
     def test_context_manager_exit_when_service_stopped(self):
         with self._service_controller.start_service() as service:
             self._service_controller.stop_service(service)
+            self._service_controller.reaper.flush()
             self.assertIsNone(service.container)
 
     def test_service_stopped_on_start_detection(self):
@@ -46,8 +150,186 @@ class TestDockerisedServiceController(unittest.TestCase):
         ).build()
         self.assertRaises(ServiceStartError, ExitingController().start_service)
 
+    def test_start_timeout_in_thread(self):
+        NeverStartingController = DockerisedServiceControllerTypeBuilder(
+            name="NeverStartingController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda line: False,
+            start_timeout=1,
+            start_tries=1
+        ).build()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(NeverStartingController().start_service)
+            self.assertRaises(ServiceStartError, future.result, 60)
+
     def test_runtime_configuration(self):
         echoed = "Hello World"
         runtime_configuration = dict(entrypoint=None, command=["echo", echoed])
         with self._service_controller.start_service(runtime_configuration) as service:
             self.assertEqual(echoed, service.container.logs().decode("utf-8").strip())
+
+    def test_start_from_pool(self):
+        PooledController = DockerisedServiceControllerTypeBuilder(
+            name="PooledController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda log_line: log_line.strip() != "",
+            pool_size=2
+        ).build()
+        with PooledController().start_service() as first, PooledController().start_service() as second:
+            self.assertNotEqual(first.container_id, second.container_id)
+            self.assertEqual("running", first.container.status)
+            self.assertEqual("running", second.container.status)
+
+    def test_start_from_snapshot(self):
+        SnapshotController = DockerisedServiceControllerTypeBuilder(
+            name="SnapshotController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda log_line: log_line.strip() != "",
+            snapshot=True
+        ).build()
+        with SnapshotController().start_service():
+            pass
+        with SnapshotController().start_service() as service:
+            self.assertIn(SNAPSHOT_KEY_LABEL, service.container.image.labels)
+
+    def test_start_services(self):
+        results = self._service_controller.start_services(3)
+        services = [result.service for result in results]
+        try:
+            self.assertEqual(3, len({service.container_id for service in services}))
+        finally:
+            self._service_controller.stop_services(services)
+        self._service_controller.reaper.flush()
+        for service in services:
+            self.assertIsNone(service.container)
+
+    def test_start_service_async(self):
+        async def start_and_stop():
+            services = await asyncio.gather(*[self._service_controller.start_service_async() for _ in range(3)])
+            for service in services:
+                self.assertEqual("running", service.container.status)
+            await asyncio.gather(*[self._service_controller.stop_service_async(service) for service in services])
+            self._service_controller.reaper.flush()
+            return services
+
+        services = asyncio.get_event_loop().run_until_complete(start_and_stop())
+        for service in services:
+            self.assertIsNone(service.container)
+
+    def test_timings(self):
+        service = self._service_controller.start_service()
+        self.assertEqual({RESOLVE_IMAGE_PHASE, CREATE_CONTAINER_PHASE, START_CONTAINER_PHASE, READINESS_PHASE,
+                          POST_START_PHASE}, set(service.start_timings.phases.keys()))
+        self.assertTrue(service.start_timings.succeeded)
+        self._service_controller.stop_service(service)
+        self._service_controller.reaper.flush()
+        # Timings are recorded by a callback, which can be called after the reaper has been flushed
+        for _ in range(50):
+            if service.stop_timings.succeeded is not None:
+                break
+            sleep(0.1)
+        self.assertIn(REMOVE_CONTAINER_PHASE, service.stop_timings.phases)
+
+    def test_start_health_detection(self):
+        HealthcheckedController = DockerisedServiceControllerTypeBuilder(
+            name="HealthcheckedController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            healthcheck="test -f /etc/hosts",
+            start_tries=1
+        ).build()
+        with HealthcheckedController().start_service() as service:
+            self.assertEqual("healthy", service.container.attrs["State"]["Health"]["Status"])
+
+    def test_stop_with_kill(self):
+        KillingController = DockerisedServiceControllerTypeBuilder(
+            name="KillingController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda log_line: log_line.strip() != "",
+            kill_on_stop=True
+        ).build()
+        controller = KillingController()
+        service = controller.start_service()
+        controller.stop_service(service)
+        controller.reaper.flush()
+        self.assertIsNone(service.container)
+
+    def test_tmpfs(self):
+        TmpfsController = DockerisedServiceControllerTypeBuilder(
+            name="TmpfsController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda log_line: log_line.strip() != "",
+            tmpfs={"/data": "1m"}
+        ).build()
+        with TmpfsController().start_service() as service:
+            self.assertIn("tmpfs", service.run_command(["sh", "-c", "grep ' /data ' /proc/mounts"]))
+            self.assertRaises(ContainerCommandError, service.run_command,
+                              ["dd", "if=/dev/zero", "of=/data/full", "bs=1M", "count=2"])
+
+    def test_tmpfs_out_of_space(self):
+        OutOfSpaceController = DockerisedServiceControllerTypeBuilder(
+            name="OutOfSpaceController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "sh", "command": [
+                "-c", "dd if=/dev/zero of=/data/full bs=1M count=2; tail -f /dev/null"]},
+            start_log_detector="never",
+            tmpfs={"/data": "1m"},
+            start_tries=1
+        ).build()
+        self.assertRaises(PersistentServiceStartError, OutOfSpaceController().start_service)
+
+    def test_reset_by_replacing_container(self):
+        runtime_configuration = dict(command=["-f", "/etc/hosts", "/etc/hostname"])
+        with self._service_controller.start_service(runtime_configuration) as service:
+            container_id = service.container_id
+            service.run_command(["touch", "/tmp/changed"])
+            self._service_controller.reset_service(service)
+            self.assertNotEqual(container_id, service.container_id)
+            self.assertEqual("running", service.container.status)
+            self.assertEqual(runtime_configuration["command"], service.container.attrs["Args"])
+            self.assertRaises(ContainerCommandError, service.run_command, ["test", "-f", "/tmp/changed"])
+
+    def test_reset_with_resetter(self):
+        resets = []
+        ResettableController = DockerisedServiceControllerTypeBuilder(
+            name="ResettableController",
+            repository="alpine",
+            ports=[],
+            tag="3.6",
+            additional_run_settings={"entrypoint": "tail", "command": ["-f", "/etc/hosts"]},
+            start_log_detector=lambda log_line: log_line.strip() != "",
+            resetter=lambda service: resets.append(service.run_command(["rm", "-f", "/tmp/changed"]))
+        ).build()
+        controller = ResettableController()
+        with controller.start_service() as service:
+            container_id = service.container_id
+            service.run_command(["touch", "/tmp/changed"])
+            metrics_sink = MagicMock()
+            controller.metrics_sink = metrics_sink
+            controller.reset_service(service)
+            self.assertEqual(1, len(resets))
+            self.assertEqual(container_id, service.container_id)
+            self.assertRaises(ContainerCommandError, service.run_command, ["test", "-f", "/tmp/changed"])
+            kind, _, timings = metrics_sink.record.call_args[0]
+            self.assertEqual(RESET_KIND, kind)
+            self.assertIn(RESET_PHASE, timings.phases)
+            self.assertNotIn(REPLACE_CONTAINER_PHASE, timings.phases)
@@ -0,0 +1,79 @@
+import math
+import unittest
+from threading import Event, Timer
+from time import sleep, monotonic
+
+from useintest.services.deadlines import Deadline
+
+
+class TestDeadline(unittest.TestCase):
+    """
+    Tests for `Deadline`.
+    """
+    def test_no_deadline(self):
+        deadline = Deadline()
+        self.assertEqual(math.inf, deadline.remaining)
+        self.assertIsNone(deadline.remaining_or_none)
+        self.assertFalse(deadline.expired)
+        deadline.check()
+
+    def test_expires(self):
+        deadline = Deadline(0.01)
+        sleep(0.02)
+        self.assertTrue(deadline.expired)
+        self.assertEqual(0.0, deadline.remaining)
+        self.assertRaises(TimeoutError, deadline.check)
+
+    def test_on_expiry_called(self):
+        expired = Event()
+        with Deadline(0.01).on_expiry(expired.set):
+            self.assertTrue(expired.wait(5))
+
+    def test_on_expiry_not_called_if_exited(self):
+        expired = Event()
+        with Deadline(0.1).on_expiry(expired.set):
+            pass
+        self.assertFalse(expired.wait(0.2))
+
+    def test_cancel(self):
+        deadline = Deadline()
+        deadline.cancel()
+        self.assertTrue(deadline.cancelled)
+        self.assertTrue(deadline.expired)
+        self.assertRaises(TimeoutError, deadline.check)
+
+    def test_on_expiry_called_on_cancel(self):
+        deadline = Deadline()
+        expired = Event()
+        with deadline.on_expiry(expired.set):
+            deadline.cancel()
+            self.assertTrue(expired.is_set())
+
+    def test_on_expiry_called_if_already_cancelled(self):
+        deadline = Deadline()
+        deadline.cancel()
+        expired = Event()
+        with deadline.on_expiry(expired.set):
+            self.assertTrue(expired.is_set())
+
+    def test_sleep_woken_by_cancel(self):
+        deadline = Deadline()
+        Timer(0.05, deadline.cancel).start()
+        started_at = monotonic()
+        deadline.sleep(5)
+        self.assertLess(monotonic() - started_at, 4)
+
+    def test_run(self):
+        self.assertEqual(3, Deadline(5).run(lambda a, b: a + b, 1, b=2))
+
+    def test_run_raises_error(self):
+        def fail():
+            raise ValueError()
+        self.assertRaises(ValueError, Deadline(5).run, fail)
+
+    def test_run_past_deadline(self):
+        self.assertRaises(TimeoutError, Deadline(0.01).run, sleep, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import re
+import unittest
+
+from useintest.services.detectors import CompiledLogDetector, LogDetection, combine_log_detectors
+
+
+class TestCompiledLogDetector(unittest.TestCase):
+    """
+    Tests for `CompiledLogDetector`.
+    """
+    def test_detect_substring(self):
+        detector = CompiledLogDetector("ready")
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"server ready on port 1"))
+        self.assertIsNone(detector.detect(b"starting"))
+
+    def test_detect_substring_with_special_characters(self):
+        detector = CompiledLogDetector("==> /var/log (x) <==")
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"==> /var/log (x) <=="))
+        self.assertIsNone(detector.detect(b"==> /var/log x <=="))
+
+    def test_detect_regex(self):
+        detector = CompiledLogDetector(re.compile(r"listening on \d+"))
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"listening on 8080"))
+        self.assertIsNone(detector.detect(b"listening on port"))
+
+    def test_detect_regex_keeps_flags(self):
+        detector = CompiledLogDetector([re.compile("ready", re.IGNORECASE), "Started"])
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"READY"))
+        self.assertIsNone(detector.detect(b"started"))
+
+    def test_detect_any_of_multiple(self):
+        detector = CompiledLogDetector(["a", "b"])
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"b"))
+
+    def test_errors_take_precedence(self):
+        detector = CompiledLogDetector("ready", transient_error_detector="retry", persistent_error_detector="fatal")
+        self.assertEqual(LogDetection.TRANSIENT_ERROR, detector.detect(b"ready retry"))
+        self.assertEqual(LogDetection.PERSISTENT_ERROR, detector.detect(b"ready retry fatal"))
+
+    def test_detect_with_callable(self):
+        detector = CompiledLogDetector(lambda line: line.startswith("ready"), persistent_error_detector="fatal")
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"ready"))
+        self.assertEqual(LogDetection.PERSISTENT_ERROR, detector.detect(b"ready but fatal"))
+        self.assertIsNone(detector.detect(b"not ready"))
+
+    def test_detect_with_callable_taking_service(self):
+        service = object()
+        detector = CompiledLogDetector(lambda line, given_service: given_service is service)
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"", service))
+        self.assertIsNone(detector.detect(b"", object()))
+
+    def test_detect_undecodable_line(self):
+        detector = CompiledLogDetector("ready", persistent_error_detector=lambda line: "�" in line)
+        self.assertEqual(LogDetection.PERSISTENT_ERROR, detector.detect(b"\xff ready"))
+
+    def test_detect_regex_with_inline_global_flags(self):
+        detector = CompiledLogDetector(re.compile("(?i)ready"), transient_error_detector="retry")
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"READY"))
+        self.assertEqual(LogDetection.TRANSIENT_ERROR, detector.detect(b"retry"))
+        self.assertIsNone(detector.detect(b"starting"))
+
+    def test_detect_regexes_with_backreferences(self):
+        detector = CompiledLogDetector(re.compile(r"(a)\1"), transient_error_detector=re.compile(r"(b)\1"))
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"aa"))
+        self.assertEqual(LogDetection.TRANSIENT_ERROR, detector.detect(b"bb"))
+        self.assertIsNone(detector.detect(b"ab"))
+
+    def test_detect_regexes_with_same_named_groups(self):
+        detector = CompiledLogDetector(re.compile(r"(?P<port>\d+) ready"),
+                                       persistent_error_detector=re.compile(r"(?P<port>\d+) in use"))
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"8080 ready"))
+        self.assertEqual(LogDetection.PERSISTENT_ERROR, detector.detect(b"8080 in use"))
+
+    def test_no_detectors(self):
+        self.assertIsNone(CompiledLogDetector(None).detect(b"anything"))
+
+    def test_empty_detector(self):
+        self.assertRaises(ValueError, CompiledLogDetector, [])
+        self.assertRaises(ValueError, CompiledLogDetector, "ready", persistent_error_detector=[])
+
+
+class TestCombineLogDetectors(unittest.TestCase):
+    """
+    Tests for `combine_log_detectors`.
+    """
+    def test_combine_patterns(self):
+        detector = CompiledLogDetector(combine_log_detectors(["ready", "up"], re.compile("started", re.IGNORECASE)))
+        for line in (b"ready", b"up", b"STARTED"):
+            self.assertEqual(LogDetection.STARTED, detector.detect(line))
+        self.assertIsNone(detector.detect(b"starting"))
+
+    def test_combine_with_callable(self):
+        detector = CompiledLogDetector(combine_log_detectors("ready", lambda line, service: line == service))
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"ready"))
+        self.assertEqual(LogDetection.STARTED, detector.detect(b"service", "service"))
+        self.assertIsNone(detector.detect(b"starting", "service"))
+
+    def test_combine_nothing(self):
+        self.assertIsNone(combine_log_detectors(None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
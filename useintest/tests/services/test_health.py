@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+from threading import Timer
+from typing import Dict, Callable
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from docker.errors import NotFound
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.engines import DockerEngine, EngineScheduler
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.deadlines import Deadline
+from useintest.services.events import EVENTS_MISSED_ACTION
+from useintest.services.exceptions import TransientServiceStartError, PersistentServiceStartError
+from useintest.services.health import ContainerHealthWaiter, to_docker_healthcheck, DEFAULT_HEALTHCHECK_RETRIES, \
+    MAX_HEALTHCHECK_START_PERIOD
+from useintest.services.models import DockerisedService
+from useintest.tests.common import clean_up_controllers
+
+_CONTAINER_ID = "abc123"
+
+
+class _FakeContainerEventMonitor:
+    """
+    Container event monitor that dispatches events on request.
+    """
+    def __init__(self):
+        self.listeners: Dict[str, Callable] = {}
+
+    def add_listener(self, container_id: str, listener: Callable):
+        self.listeners[container_id] = listener
+
+    def remove_listener(self, container_id: str, listener: Callable):
+        self.listeners.pop(container_id, None)
+
+    def wait_until_subscribed(self, timeout: float=None) -> bool:
+        return True
+
+    def dispatch(self, container_id: str, action: str):
+        self.listeners[container_id]({"id": container_id, "Action": action})
+
+
+def _state(health_status: str="starting", status: str="running", oom_killed: bool=False) -> Dict:
+    return {"State": {"Status": status, "OOMKilled": oom_killed, "Health": {"Status": health_status}}}
+
+
+class TestToDockerHealthcheck(unittest.TestCase):
+    """
+    Tests for `to_docker_healthcheck`.
+    """
+    def test_shell_command(self):
+        self.assertEqual({"test": ["CMD-SHELL", "true"], "interval": 1000000000, "start_period": 60000000000,
+                          "retries": 5}, to_docker_healthcheck("true", interval=1, start_period=60, retries=5))
+
+    def test_default_start_period(self):
+        healthcheck = to_docker_healthcheck("true")
+        self.assertEqual(MAX_HEALTHCHECK_START_PERIOD * 1000000000, healthcheck["start_period"])
+        self.assertEqual(DEFAULT_HEALTHCHECK_RETRIES, healthcheck["retries"])
+
+    def test_command(self):
+        self.assertEqual(["CMD", "test", "-f", "/ready"], to_docker_healthcheck(["test", "-f", "/ready"])["test"])
+
+    def test_docker_healthcheck(self):
+        healthcheck = {"test": ["NONE"]}
+        self.assertIs(healthcheck, to_docker_healthcheck(healthcheck))
+
+
+class TestContainerHealthWaiter(unittest.TestCase):
+    """
+    Tests for `ContainerHealthWaiter`.
+    """
+    def setUp(self):
+        self.monitor = _FakeContainerEventMonitor()
+        self.docker_client = MagicMock()
+        self.docker_client.api.inspect_container.return_value = _state()
+        set_docker_client_factory(lambda **kwargs: self.docker_client)
+        self.addCleanup(set_docker_client_factory, None)
+
+    def _dispatch_later(self, action: str, delay: float=0.05):
+        Timer(delay, self.monitor.dispatch, (_CONTAINER_ID, action)).start()
+
+    def test_healthy_before_waiting(self):
+        self.docker_client.api.inspect_container.return_value = _state("healthy")
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            waiter.wait(Deadline(1))
+
+    def test_healthy_event(self):
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self._dispatch_later("health_status: healthy")
+            waiter.wait(Deadline(5))
+        self.assertNotIn(_CONTAINER_ID, self.monitor.listeners)
+
+    def test_unhealthy_event(self):
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self._dispatch_later("health_status: unhealthy")
+            self.assertRaises(TransientServiceStartError, waiter.wait, Deadline(5))
+
+    def test_oom_then_die_events(self):
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.monitor.dispatch(_CONTAINER_ID, "oom")
+            self.monitor.dispatch(_CONTAINER_ID, "die")
+            self.assertRaises(PersistentServiceStartError, waiter.wait, Deadline(5))
+
+    def test_stopped_before_waiting(self):
+        self.docker_client.api.inspect_container.return_value = _state(status="exited")
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.assertRaises(TransientServiceStartError, waiter.wait, Deadline(1))
+
+    def test_container_missing(self):
+        self.docker_client.api.inspect_container.side_effect = NotFound("")
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.assertRaises(TransientServiceStartError, waiter.wait, Deadline(1))
+
+    def test_no_healthcheck(self):
+        self.docker_client.api.inspect_container.return_value = {"State": {"Status": "running"}}
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.assertRaises(PersistentServiceStartError, waiter.wait, Deadline(1))
+
+    def test_reinspects_when_events_missed(self):
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.docker_client.api.inspect_container.side_effect = [_state(), _state("healthy")]
+            self._dispatch_later(EVENTS_MISSED_ACTION)
+            waiter.wait(Deadline(5))
+        self.assertEqual(2, self.docker_client.api.inspect_container.call_count)
+
+    def test_timeout(self):
+        with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+            self.assertRaises(TimeoutError, waiter.wait, Deadline(0.1))
+
+    def test_wait_async(self):
+        async def wait():
+            with ContainerHealthWaiter(_CONTAINER_ID, self.monitor) as waiter:
+                self._dispatch_later("health_status: healthy")
+                await asyncio.wait_for(waiter.wait_async(), 5)
+
+        asyncio.get_event_loop().run_until_complete(wait())
+
+
+class TestDockerisedServiceControllerHealth(unittest.TestCase):
+    """
+    Tests for the detection of when services started by `DockerisedServiceController` are healthy.
+    """
+    def setUp(self):
+        # Healthchecks, made every 0.5s, fail more times than Docker's default number of retries before passing
+        fake_engine = FakeDockerEngine(log_script=[(2.0, "started")])
+        # Placed on an engine of their own, as the monitor of events from the default engine stays subscribed to the
+        # fake engine of the test that first used it
+        self.engine = DockerEngine(f"health-{uuid4()}", factory=lambda **kwargs: fake_engine)
+        clean_up_controllers(self)
+
+    def _create_controller(self, **kwargs) -> DockerisedServiceController:
+        return DockerisedServiceController(
+            DockerisedService, "fake", "latest", [], image_cache=ImageCache(), healthcheck="true", start_tries=1,
+            engine_scheduler=EngineScheduler([self.engine]), **kwargs)
+
+    def test_healthy_after_failed_checks(self):
+        controller = self._create_controller(start_timeout=10)
+        service = controller.start_service()
+        self.addCleanup(controller.stop_service, service)
+        self.assertEqual("healthy", service.container.attrs["State"]["Health"]["Status"])
+
+    def test_healthy_after_failed_checks_without_timeout(self):
+        controller = self._create_controller()
+        service = controller.start_service()
+        self.addCleanup(controller.stop_service, service)
+        self.assertEqual("healthy", service.container.attrs["State"]["Health"]["Status"])
+
+
+if __name__ == "__main__":
+    unittest.main()
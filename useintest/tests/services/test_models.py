@@ -0,0 +1,100 @@
+import pickle
+import unittest
+from unittest.mock import patch, MagicMock
+from typing import Dict, Callable
+
+from docker.errors import NotFound
+
+from useintest.common import set_docker_client_factory
+from useintest.services.models import DockerisedService
+
+_CONTAINER_ID = "abc123"
+
+
+class _FakeContainerEventMonitor:
+    """
+    Container event monitor that dispatches events on request.
+    """
+    def __init__(self):
+        self.subscribed = True
+        self.listeners: Dict[str, Callable] = {}
+
+    def add_listener(self, container_id: str, listener: Callable):
+        self.listeners[container_id] = listener
+
+    def remove_listener(self, container_id: str, listener: Callable):
+        self.listeners.pop(container_id, None)
+
+    def dispatch(self, container_id: str, action: str):
+        self.listeners[container_id]({"id": container_id, "Action": action})
+
+
+class TestDockerisedService(unittest.TestCase):
+    """
+    Tests for `DockerisedService`.
+    """
+    def setUp(self):
+        self.monitor = _FakeContainerEventMonitor()
+        self.docker_client = MagicMock()
+        set_docker_client_factory(lambda **kwargs: self.docker_client)
+        self.addCleanup(set_docker_client_factory, None)
+        patcher = patch("useintest.services.models.container_event_monitor", self.monitor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = DockerisedService()
+        self.service.container_id = _CONTAINER_ID
+
+    def test_container_cached(self):
+        first = self.service.container
+        self.assertIs(first, self.service.container)
+        self.assertEqual(1, self.docker_client.containers.get.call_count)
+
+    def test_container_not_cached_if_not_subscribed(self):
+        self.monitor.subscribed = False
+        _ = self.service.container
+        _ = self.service.container
+        self.assertEqual(2, self.docker_client.containers.get.call_count)
+
+    def test_container_invalidated_by_event(self):
+        _ = self.service.container
+        self.monitor.dispatch(_CONTAINER_ID, "die")
+        _ = self.service.container
+        self.assertEqual(2, self.docker_client.containers.get.call_count)
+
+    def test_container_missing_after_destroy_event(self):
+        _ = self.service.container
+        self.monitor.dispatch(_CONTAINER_ID, "destroy")
+        self.assertIsNone(self.service.container)
+        self.assertEqual(1, self.docker_client.containers.get.call_count)
+
+    def test_container_missing(self):
+        self.docker_client.containers.get.side_effect = NotFound("")
+        self.assertIsNone(self.service.container)
+
+    def test_refresh_container(self):
+        _ = self.service.container
+        self.service.refresh_container()
+        self.assertEqual(2, self.docker_client.containers.get.call_count)
+
+    def test_invalidate_container_when_removed(self):
+        _ = self.service.container
+        self.service.invalidate_container(removed=True)
+        self.assertIsNone(self.service.container)
+
+    def test_pickle(self):
+        self.service.name = "name"
+        self.service.ports[80] = 8080
+        self.service.controller = MagicMock()
+        _ = self.service.container
+        service = pickle.loads(pickle.dumps(self.service))
+        self.assertEqual("name", service.name)
+        self.assertEqual(8080, service.ports[80])
+        self.assertIsNone(service.controller)
+        _ = service.container
+        self.assertEqual(2, self.docker_client.containers.get.call_count)
+        self.monitor.dispatch(_CONTAINER_ID, "destroy")
+        self.assertIsNone(service.container)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from threading import Lock
+from time import sleep
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import Service, DockerisedService
+from useintest.services.pools import ServicePool
+from useintest.tests.common import clean_up_controllers
+
+
+class _FakeServiceManager:
+    """
+    Creates and stops fake services, recording what has been done.
+    """
+    def __init__(self, start_delay: float=0.0):
+        self.start_delay = start_delay
+        self.started = []
+        self.stopped = []
+        self._lock = Lock()
+
+    def start(self) -> Service:
+        sleep(self.start_delay)
+        service = Service()
+        with self._lock:
+            self.started.append(service)
+        return service
+
+    def stop(self, service: Service):
+        with self._lock:
+            self.stopped.append(service)
+
+
+class TestServicePool(unittest.TestCase):
+    """
+    Tests for `ServicePool`.
+    """
+    def setUp(self):
+        self.manager = _FakeServiceManager()
+        self.pool = None
+
+    def tearDown(self):
+        if self.pool is not None:
+            self.pool.tear_down()
+
+    def test_fills_on_creation(self):
+        self.pool = ServicePool(self.manager.start, self.manager.stop, 3, refill_concurrency=3)
+        self._wait_until(lambda: self.pool.number_ready == 3)
+        self.assertEqual(3, len(self.manager.started))
+
+    def test_acquire_refills(self):
+        self.pool = ServicePool(self.manager.start, self.manager.stop, 2)
+        self._wait_until(lambda: self.pool.number_ready == 2)
+        service = self.pool.acquire()
+        self.assertIn(service, self.manager.started)
+        self._wait_until(lambda: self.pool.number_ready == 2)
+        self.assertEqual(3, len(self.manager.started))
+
+    def test_acquire_waits_for_starting_service(self):
+        self.manager.start_delay = 0.2
+        self.pool = ServicePool(self.manager.start, self.manager.stop, 1)
+        service = self.pool.acquire()
+        self.assertIs(self.manager.started[0], service)
+
+    def test_idle_services_replaced(self):
+        self.pool = ServicePool(self.manager.start, self.manager.stop, 1, max_idle_time=0.1)
+        self._wait_until(lambda: len(self.manager.stopped) >= 1)
+        self._wait_until(lambda: self.pool.number_ready == 1)
+        self.assertGreaterEqual(len(self.manager.started), 2)
+
+    def test_tear_down_stops_ready_services(self):
+        self.pool = ServicePool(self.manager.start, self.manager.stop, 2)
+        self._wait_until(lambda: self.pool.number_ready == 2)
+        acquired = self.pool.acquire()
+        self.pool.tear_down()
+        self.assertNotIn(acquired, self.manager.stopped)
+        self.assertRaises(RuntimeError, self.pool.acquire)
+
+    def _wait_until(self, condition, timeout: float=5.0):
+        """
+        Waits until the given condition holds, failing the test if it does not in time.
+        :param condition: the condition to wait on
+        :param timeout: maximum number of seconds to wait
+        """
+        waited = 0.0
+        while not condition():
+            if waited > timeout:
+                self.fail("Timed out waiting for condition")
+            sleep(0.01)
+            waited += 0.01
+
+
+class TestDockerisedServiceControllerPool(unittest.TestCase):
+    """
+    Tests for the pools of ready services used by `DockerisedServiceController`.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+
+    def _create_controller(self, repository: str) -> DockerisedServiceController:
+        return DockerisedServiceController(
+            DockerisedService, repository, "latest", [], image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, pool_size=1)
+
+    def test_differently_configured_controllers_use_different_pools(self):
+        controller = self._create_controller("fake")
+        other_controller = self._create_controller("other")
+        self.assertIsNot(controller._get_pool(), other_controller._get_pool())
+        service = other_controller.start_service()
+        self.addCleanup(other_controller.stop_service, service)
+        self.assertIn("other:latest", service.container.image.tags)
+
+    def test_same_configured_controllers_share_pool(self):
+        self.assertIs(self._create_controller("fake")._get_pool(), self._create_controller("fake")._get_pool())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import socket
+import unittest
+from unittest.mock import patch
+from uuid import uuid4
+
+from temphelpers import TempManager
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.engines import DockerEngine, EngineScheduler
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.services.ports import EphemeralPortAllocator, PortRangeAllocator, PortAllocationError, \
+    create_port_allocator, PORT_ALLOCATION_ENVIRONMENT_VARIABLE, PORT_RANGE_ENVIRONMENT_VARIABLE
+from useintest.tests.common import clean_up_controllers
+
+_START = 41000
+_PORTS = [80, 443]
+
+
+class _PortRangeTestCase(unittest.TestCase):
+    """
+    Base for tests that reserve blocks of ports.
+    """
+    def setUp(self):
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        self.location = self.temp_manager.create_temp_directory()
+
+    def _create_allocator(self, end: int=_START + 9, block_size: int=5) -> PortRangeAllocator:
+        return PortRangeAllocator(_START, end, block_size, self.location)
+
+
+class TestPortRangeAllocator(_PortRangeTestCase):
+    """
+    Tests for `PortRangeAllocator`.
+    """
+    def test_allocate(self):
+        ports = self._create_allocator().allocate(3)
+        self.assertEqual(3, len(set(ports)))
+        for port in ports:
+            self.assertTrue(_START <= port < _START + 5)
+
+    def test_allocate_from_another_block(self):
+        ports = self._create_allocator().allocate(7)
+        self.assertEqual(7, len(set(ports)))
+        self.assertEqual(5, len([port for port in ports if port < _START + 5]))
+
+    def test_allocators_use_disjoint_blocks(self):
+        allocator = self._create_allocator()
+        ports = allocator.allocate(2)
+        other_ports = self._create_allocator().allocate(2)
+        self.assertTrue(all(port < _START + 5 for port in ports))
+        self.assertTrue(all(port >= _START + 5 for port in other_ports))
+
+    def test_released_ports_allocated_again(self):
+        allocator = self._create_allocator(end=_START + 1, block_size=2)
+        ports = allocator.allocate(2)
+        allocator.release(ports[:1])
+        self.assertEqual(ports[:1], allocator.allocate(1))
+
+    def test_all_ports_in_use(self):
+        allocator = self._create_allocator(end=_START + 1, block_size=2)
+        allocator.allocate(2)
+        self.assertRaises(PortAllocationError, allocator.allocate, 1)
+
+    def test_bound_port_skipped(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as bound_socket:
+            bound_socket.bind(("", _START))
+            self.assertEqual([_START + 1], self._create_allocator().allocate(1))
+
+    def test_invalid_range(self):
+        self.assertRaises(ValueError, PortRangeAllocator, _START, _START - 1)
+
+
+class TestCreatePortAllocator(unittest.TestCase):
+    """
+    Tests for `create_port_allocator`.
+    """
+    def test_default(self):
+        with patch.dict(os.environ, {PORT_ALLOCATION_ENVIRONMENT_VARIABLE: ""}):
+            os.environ.pop(PORT_ALLOCATION_ENVIRONMENT_VARIABLE)
+            self.assertIsInstance(create_port_allocator(), EphemeralPortAllocator)
+
+    def test_range(self):
+        with patch.dict(os.environ, {PORT_ALLOCATION_ENVIRONMENT_VARIABLE: "range",
+                                     PORT_RANGE_ENVIRONMENT_VARIABLE: "30000-30099"}):
+            allocator = create_port_allocator()
+        self.assertIsInstance(allocator, PortRangeAllocator)
+        self.assertEqual((30000, 30099), (allocator.start, allocator.end))
+
+    def test_unknown(self):
+        with patch.dict(os.environ, {PORT_ALLOCATION_ENVIRONMENT_VARIABLE: "other"}):
+            self.assertRaises(ValueError, create_port_allocator)
+
+
+class TestDockerisedServiceControllerPorts(_PortRangeTestCase):
+    """
+    Tests for the publishing of ports by `DockerisedServiceController`.
+    """
+    def setUp(self):
+        super().setUp()
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+
+    def _create_controller(self, **kwargs) -> DockerisedServiceController:
+        return DockerisedServiceController(
+            DockerisedService, "fake", "latest", _PORTS, image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, **kwargs)
+
+    def test_ports_assigned_by_engine(self):
+        controller = self._create_controller(port_allocator=EphemeralPortAllocator())
+        service = controller.start_service()
+        self.addCleanup(controller.stop_service, service)
+        for port in _PORTS:
+            host_port = service.get_external_port_mapping_to(port)
+            self.assertEqual(str(host_port), service.container.ports[f"{port}/tcp"][0]["HostPort"])
+            self.assertEqual(port, service.get_internal_port_mapping_from(host_port))
+
+    def test_ports_from_range(self):
+        allocator = self._create_allocator()
+        controller = self._create_controller(port_allocator=allocator)
+        service = controller.start_service()
+        for port in _PORTS:
+            self.assertTrue(_START <= service.ports[port] < _START + 5)
+        host_ports = set(service.ports.values())
+        controller.stop_service(service)
+        controller.reaper.flush()
+        self.assertEqual(set(), host_ports & allocator._allocated)
+
+    def test_ports_from_range_on_remote_engine(self):
+        engine = DockerEngine(f"remote-{uuid4()}", "tcp://build-1:2375", factory=lambda **kwargs: self.engine)
+        self.assertRaises(ValueError, self._create_controller, port_allocator=self._create_allocator(),
+                          engine_scheduler=EngineScheduler([engine]))
+        self._create_controller(port_allocator=EphemeralPortAllocator(), engine_scheduler=EngineScheduler([engine]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import socket
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from threading import Thread, Timer
+from time import monotonic
+
+from requests import Session
+
+from useintest.services.deadlines import Deadline
+from useintest.services.models import Service
+from useintest.services.probes import Backoff, HttpProbe, TcpProbe, GET_METHOD, wait_until_probe_succeeds, \
+    wait_until_probe_succeeds_async
+
+
+class _StatusRequestHandler(BaseHTTPRequestHandler):
+    """
+    Responds to HEAD and GET requests with the status set on the server.
+    """
+    def do_HEAD(self):
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def do_GET(self):
+        self.do_HEAD()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _create_service(port: int) -> Service:
+    service = Service()
+    service.ports[80] = port
+    return service
+
+
+def _get_unused_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as unused_socket:
+        unused_socket.bind(("localhost", 0))
+        return unused_socket.getsockname()[1]
+
+
+class TestBackoff(unittest.TestCase):
+    """
+    Tests for `Backoff`.
+    """
+    def test_delays_without_jitter(self):
+        delays = Backoff(initial=1, multiplier=2, maximum=5, jitter=0).delays()
+        self.assertEqual([1, 2, 4, 5, 5], [next(delays) for _ in range(5)])
+
+    def test_delays_with_jitter(self):
+        delays = Backoff(initial=1, multiplier=1, jitter=0.5).delays()
+        for _ in range(100):
+            self.assertTrue(0.5 <= next(delays) <= 1)
+
+    def test_invalid_jitter(self):
+        self.assertRaises(ValueError, Backoff, jitter=2)
+
+
+class TestProbes(unittest.TestCase):
+    """
+    Tests for `HttpProbe`, `TcpProbe` and waiting for them to succeed.
+    """
+    def setUp(self):
+        self.server = HTTPServer(("localhost", 0), _StatusRequestHandler)
+        self.server.status = 200
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.service = _create_service(self.server.server_port)
+        self.session = Session()
+        self.addCleanup(self.session.close)
+
+    def test_http_probe(self):
+        self.assertTrue(HttpProbe()(self.service, self.session, 1))
+
+    def test_http_probe_with_detector(self):
+        self.server.status = 401
+        self.assertTrue(HttpProbe(lambda response: response.status_code == 401)(self.service, self.session, 1))
+        self.assertFalse(HttpProbe(lambda response: response.ok, method=GET_METHOD)(self.service, self.session, 1))
+
+    def test_http_probe_when_not_listening(self):
+        self.assertFalse(HttpProbe()(_create_service(_get_unused_port()), self.session, 1))
+
+    def test_tcp_probe(self):
+        self.assertTrue(TcpProbe(80)(self.service, self.session, 1))
+        self.assertFalse(TcpProbe()(_create_service(_get_unused_port()), self.session, 1))
+
+    def test_wait_until_probe_succeeds(self):
+        self.server.status = 503
+        Timer(0.1, setattr, (self.server, "status", 200)).start()
+        wait_until_probe_succeeds(HttpProbe(lambda response: response.ok), self.service, Deadline(5),
+                                  backoff=Backoff(initial=0.01))
+
+    def test_wait_until_probe_succeeds_timeout(self):
+        started_at = monotonic()
+        self.assertRaises(TimeoutError, wait_until_probe_succeeds, TcpProbe(),
+                          _create_service(_get_unused_port()), Deadline(0.2))
+        self.assertLess(monotonic() - started_at, 2)
+
+    def test_wait_until_probe_succeeds_async(self):
+        asyncio.get_event_loop().run_until_complete(
+            wait_until_probe_succeeds_async(HttpProbe(), self.service, Deadline(5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from temphelpers import TempManager
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.metrics import REUSE_PHASE
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.services.reuse import ReusableContainer, get_reuse_key, REUSE_LOCATION_ENVIRONMENT_VARIABLE
+from useintest.tests.common import clean_up_controllers
+
+
+class TestGetReuseKey(unittest.TestCase):
+    """
+    Tests for `get_reuse_key`.
+    """
+    def test_same_configuration(self):
+        self.assertEqual(get_reuse_key("repository", "tag", [1, 2], {"a": 1, "b": 2}),
+                         get_reuse_key("repository", "tag", [2, 1], {"b": 2, "a": 1}))
+
+    def test_different_configuration(self):
+        key = get_reuse_key("repository", "tag", [1], {})
+        self.assertNotEqual(key, get_reuse_key("repository", "other", [1], {}))
+        self.assertNotEqual(key, get_reuse_key("repository", "tag", [2], {}))
+        self.assertNotEqual(key, get_reuse_key("repository", "tag", [1], {"command": "other"}))
+
+
+class _ReuseTestCase(unittest.TestCase):
+    """
+    Base for tests that claim containers for reuse.
+    """
+    def setUp(self):
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        environment = patch.dict(os.environ, {
+            REUSE_LOCATION_ENVIRONMENT_VARIABLE: self.temp_manager.create_temp_directory()})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+
+class TestReusableContainer(_ReuseTestCase):
+    """
+    Tests for `ReusableContainer`.
+    """
+    def test_claim(self):
+        claim = ReusableContainer.claim("container", 0.0)
+        self.assertIsNotNone(claim)
+        self.assertIsNone(ReusableContainer.claim("container", 0.0))
+        claim.discard()
+
+    def test_release(self):
+        service = DockerisedService()
+        service.name = "service"
+        ReusableContainer.claim("container", 0.0).release(service)
+        claim = ReusableContainer.claim("container", 0.0)
+        self.assertEqual("service", claim.load_service().name)
+        claim.discard()
+
+    def test_discard(self):
+        claim = ReusableContainer.claim("container", 0.0)
+        claim.release(DockerisedService())
+        claim = ReusableContainer.claim("container", 0.0)
+        claim.discard()
+        self.assertIsNone(ReusableContainer.claim("container", 0.0).load_service())
+
+    def test_not_claimed_in_location_accessible_by_others(self):
+        os.chmod(os.environ[REUSE_LOCATION_ENVIRONMENT_VARIABLE], 0o777)
+        self.assertIsNone(ReusableContainer.claim("container", 0.0))
+
+    def test_not_claimed_in_location_owned_by_another_user(self):
+        with patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertIsNone(ReusableContainer.claim("container", 0.0))
+
+    def test_location_created_private(self):
+        location = os.path.join(os.environ[REUSE_LOCATION_ENVIRONMENT_VARIABLE], "reuse")
+        with patch.dict(os.environ, {REUSE_LOCATION_ENVIRONMENT_VARIABLE: location}):
+            ReusableContainer.claim("container", 0.0).discard()
+        self.assertEqual(0, os.stat(location).st_mode & 0o077)
+
+
+class TestReuse(_ReuseTestCase):
+    """
+    Tests for the reuse of services by `DockerisedServiceController`.
+    """
+    def setUp(self):
+        super().setUp()
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+        self.image_cache = ImageCache()
+        self.resets = []
+
+    def _create_controller(self, **kwargs) -> DockerisedServiceController:
+        controller = DockerisedServiceController(
+            DockerisedService, "fake", "latest", [], image_cache=self.image_cache, start_log_detector="started",
+            start_tries=1, reuse=True, resetter=lambda service: self.resets.append(service.name), **kwargs)
+        # Reuse location is removed after each test
+        controller.stop_on_exit = False
+        return controller
+
+    def _get_running_container_names(self):
+        return {container.name for container in self.engine.containers.list()}
+
+    def test_reuse(self):
+        service = self._create_controller().start_service()
+        service.controller.stop_service(service)
+        self.assertIn(service.name, self._get_running_container_names())
+        reused = self._create_controller().start_service()
+        self.assertEqual(service.name, reused.name)
+        self.assertEqual(service.container_id, reused.container_id)
+        self.assertEqual([service.name], self.resets)
+        self.assertIn(REUSE_PHASE, reused.start_timings.phases)
+
+    def test_not_reused_whilst_in_use(self):
+        service = self._create_controller().start_service()
+        self.assertNotEqual(service.name, self._create_controller().start_service().name)
+
+    def test_not_reused_with_different_configuration(self):
+        service = self._create_controller().start_service()
+        service.controller.stop_service(service)
+        other = self._create_controller().start_service(dict(command="other"))
+        self.assertNotEqual(service.name, other.name)
+
+    def test_too_old_removed(self):
+        controller = self._create_controller(reuse_max_age=0.0)
+        service = controller.start_service()
+        controller.stop_service(service)
+        controller.reaper.flush()
+        self.assertNotIn(service.name, self._get_running_container_names())
+
+    def test_failed_reset_removes(self):
+        service = self._create_controller().start_service()
+        service.controller.stop_service(service)
+        controller = self._create_controller()
+        controller.resetter = lambda service: 1 / 0
+        other = controller.start_service()
+        controller.reaper.flush()
+        self.assertNotEqual(service.name, other.name)
+        self.assertNotIn(service.name, self._get_running_container_names())
+
+    def test_reset_by_replacing_container_keeps_reusable(self):
+        controller = self._create_controller()
+        controller.resetter = None
+        service = controller.start_service()
+        name = service.name
+        controller.reset_service(service)
+        self.assertNotEqual(name, service.name)
+        controller.stop_service(service)
+        self.assertEqual(service.name, self._create_controller().start_service().name)
+
+
+if __name__ == "__main__":
+    unittest.main()
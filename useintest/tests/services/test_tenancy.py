@@ -0,0 +1,213 @@
+import unittest
+from threading import Lock, Thread, Event
+from unittest.mock import patch
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.metrics import CREATE_NAMESPACE_PHASE, REMOVE_NAMESPACE_PHASE
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.exceptions import NamespaceError
+from useintest.services.models import ServiceWithUsers, User, DockerisedServiceWithUsers
+from useintest.services.tenancy import Tenancy, SharedService, NAMESPACE_PREFIX
+from useintest.tests.common import clean_up_controllers
+
+
+class _FakeServiceManager:
+    """
+    Creates and stops fake services, recording what has been done.
+    """
+    def __init__(self):
+        self.started = []
+        self.stopped = []
+
+    def start(self) -> ServiceWithUsers:
+        service = ServiceWithUsers()
+        service.root_user = User("root", "password")
+        self.started.append(service)
+        return service
+
+    def stop(self, service: ServiceWithUsers):
+        self.stopped.append(service)
+
+
+class _FakeTenancy(Tenancy[ServiceWithUsers]):
+    """
+    Tenancy that records the namespaces that exist and gives each tenant a user.
+    """
+    def __init__(self):
+        self.namespaces = set()
+        self.fail_removal = False
+        self.removal_allowed = Event()
+        self.removal_allowed.set()
+        self._lock = Lock()
+
+    def create_namespace(self, service: ServiceWithUsers, tenant: ServiceWithUsers):
+        with self._lock:
+            self.namespaces.add(tenant.namespace)
+        tenant.users.add(User(tenant.namespace, "password"))
+
+    def remove_namespace(self, service: ServiceWithUsers, tenant: ServiceWithUsers):
+        self.removal_allowed.wait()
+        if self.fail_removal:
+            raise NamespaceError(tenant.namespace)
+        with self._lock:
+            self.namespaces.remove(tenant.namespace)
+
+
+class TestSharedService(unittest.TestCase):
+    """
+    Tests for `SharedService`.
+    """
+    def setUp(self):
+        self.manager = _FakeServiceManager()
+        self.tenancy = _FakeTenancy()
+        self.shared_service = SharedService(self.manager.start, self.manager.stop, self.tenancy)
+
+    def tearDown(self):
+        self.shared_service.tear_down()
+
+    def test_not_started_until_leased(self):
+        self.assertEqual(0, len(self.manager.started))
+
+    def test_lease(self):
+        tenant = self.shared_service.lease()
+        self.assertTrue(tenant.namespace.startswith(NAMESPACE_PREFIX))
+        self.assertIn(tenant.namespace, self.tenancy.namespaces)
+        self.assertIn(CREATE_NAMESPACE_PHASE, tenant.start_timings.phases)
+        self.assertTrue(self.shared_service.is_tenant(tenant))
+        self.assertEqual(1, self.shared_service.number_of_tenants)
+
+    def test_tenants_share_service(self):
+        tenants = []
+        threads = [Thread(target=lambda: tenants.append(self.shared_service.lease())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(self.manager.started))
+        self.assertEqual(5, len({tenant.namespace for tenant in tenants}))
+
+    def test_tenant_changes_do_not_change_shared_service(self):
+        tenant = self.shared_service.lease()
+        service = self.manager.started[0]
+        self.assertEqual(2, len(tenant.users))
+        self.assertEqual({service.root_user}, service.users)
+        self.assertIsNone(service.namespace)
+
+    def test_release(self):
+        tenant = self.shared_service.lease()
+        timings = self.shared_service.release(tenant).result()
+        self.assertIn(REMOVE_NAMESPACE_PHASE, timings)
+        self.assertEqual(set(), self.tenancy.namespaces)
+        self.assertFalse(self.shared_service.is_tenant(tenant))
+        self.assertEqual(0, len(self.manager.stopped))
+
+    def test_release_in_background(self):
+        self.tenancy.removal_allowed.clear()
+        tenant = self.shared_service.lease()
+        releasing = self.shared_service.release(tenant)
+        self.assertFalse(releasing.done())
+        self.tenancy.removal_allowed.set()
+        releasing.result()
+
+    def test_release_after_shutdown(self):
+        tenant = self.shared_service.lease()
+        self.shared_service._executor.shutdown()
+        timings = self.shared_service.release(tenant).result(timeout=0)
+        self.assertIn(REMOVE_NAMESPACE_PHASE, timings)
+        self.assertEqual(set(), self.tenancy.namespaces)
+
+    def test_release_failure_after_shutdown(self):
+        self.tenancy.fail_removal = True
+        tenant = self.shared_service.lease()
+        self.shared_service._executor.shutdown()
+        self.assertRaises(NamespaceError, self.shared_service.release(tenant).result, 0)
+
+    def test_release_failure(self):
+        self.tenancy.fail_removal = True
+        tenant = self.shared_service.lease()
+        self.assertRaises(NamespaceError, self.shared_service.release(tenant).result)
+
+    def test_reset(self):
+        tenant = self.shared_service.lease()
+        self.tenancy.removal_allowed.clear()
+        Thread(target=lambda: self.tenancy.removal_allowed.set()).start()
+        self.shared_service.reset(tenant)
+        self.assertEqual({tenant.namespace}, self.tenancy.namespaces)
+        self.assertTrue(self.shared_service.is_tenant(tenant))
+
+    def test_reset_non_tenant(self):
+        self.assertRaises(ValueError, self.shared_service.reset, ServiceWithUsers())
+
+    def test_release_non_tenant(self):
+        self.assertRaises(ValueError, self.shared_service.release, ServiceWithUsers())
+
+    def test_tear_down(self):
+        tenant = self.shared_service.lease()
+        self.tenancy.removal_allowed.clear()
+        self.shared_service.release(tenant)
+        Thread(target=lambda: self.tenancy.removal_allowed.set()).start()
+        self.shared_service.tear_down()
+        self.assertEqual(set(), self.tenancy.namespaces)
+        self.assertEqual(self.manager.started, self.manager.stopped)
+        self.assertRaises(RuntimeError, self.shared_service.lease)
+
+
+class TestDockerisedServiceControllerSharedService(unittest.TestCase):
+    """
+    Tests for the shared services used by `DockerisedServiceController`.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        clean_up_controllers(self)
+
+    def _create_controller(self, repository: str) -> DockerisedServiceController:
+        return DockerisedServiceController(
+            DockerisedServiceWithUsers, repository, "latest", [], start_log_detector="started", tenancy=_FakeTenancy())
+
+    def test_differently_configured_controllers_use_different_shared_services(self):
+        self.assertIsNot(self._create_controller("fake")._get_shared_service(),
+                         self._create_controller("other")._get_shared_service())
+
+    def test_same_configured_controllers_share_service(self):
+        self.assertIs(self._create_controller("fake")._get_shared_service(),
+                      self._create_controller("fake")._get_shared_service())
+
+    def _start_shared_service(self) -> DockerisedServiceController:
+        return DockerisedServiceController(
+            DockerisedServiceWithUsers, "fake", "latest", [], image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, tenancy=_FakeTenancy())
+
+    def test_stop_tenant_twice(self):
+        controller = self._start_shared_service()
+        tenant = controller.start_service()
+        other_tenant = controller.start_service()
+        controller.stop_service(tenant)
+        with patch.object(controller.reaper, "remove") as remove:
+            controller.stop_service(tenant)
+        remove.assert_not_called()
+        self.assertIsNotNone(other_tenant.refresh_container())
+        self.assertTrue(controller._get_shared_service().is_tenant(other_tenant))
+
+    def test_stop_tenant_after_tear_down(self):
+        controller = self._start_shared_service()
+        tenant = controller.start_service()
+        controller._get_shared_service().tear_down()
+        with patch.object(controller.reaper, "remove") as remove:
+            controller.stop_service(tenant)
+        remove.assert_not_called()
+
+    def test_reset_released_tenant(self):
+        controller = self._start_shared_service()
+        tenant = controller.start_service()
+        other_tenant = controller.start_service()
+        controller.stop_service(tenant)
+        self.assertRaises(ValueError, controller.reset_service, tenant)
+        self.assertIsNotNone(other_tenant.refresh_container())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import subprocess
+import sys
+import unittest
+from threading import Thread
+from unittest.mock import MagicMock, call
+
+from useintest.common import get_docker_client, set_docker_client_factory, streaming_docker_client, \
+    DockerClientPool
+
+_HEAVY_DEPENDENCIES = ("docker", "requests", "urllib3", "bidict", "dill")
+_POOL_SIZE = 4
+
+
+class TestGetDockerClient(unittest.TestCase):
+    """
+    Tests for `get_docker_client`.
+    """
+    def setUp(self):
+        self.factory = MagicMock(side_effect=lambda **kwargs: MagicMock())
+        set_docker_client_factory(self.factory, pool_size=_POOL_SIZE)
+        self.addCleanup(set_docker_client_factory, None)
+
+    def test_created_lazily(self):
+        self.factory.assert_not_called()
+        client = get_docker_client()
+        self.assertIs(client, get_docker_client())
+        self.factory.assert_called_once_with(max_pool_size=_POOL_SIZE)
+
+    def test_deprecated_docker_client(self):
+        from useintest.common import docker_client
+        with self.assertWarns(DeprecationWarning):
+            self.assertIs(get_docker_client().containers, docker_client.containers)
+
+    def test_shared_between_threads(self):
+        clients = []
+        threads = [Thread(target=lambda: clients.append(get_docker_client())) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(clients[0], clients[1])
+
+    def test_streaming_client_reused(self):
+        with streaming_docker_client() as streaming_client:
+            self.assertIsNot(streaming_client, get_docker_client())
+        clients = []
+
+        def use_streaming_client():
+            with streaming_docker_client() as client:
+                clients.append(client)
+
+        threads = [Thread(target=use_streaming_client) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+        self.assertEqual([streaming_client] * 10, clients)
+        self.assertEqual(1, self.factory.call_args_list.count(call(max_pool_size=1)))
+
+    def test_streaming_clients_checked_out_at_once(self):
+        with streaming_docker_client() as first_client, streaming_docker_client() as second_client:
+            self.assertIsNot(first_client, second_client)
+        self.assertEqual(2, self.factory.call_args_list.count(call(max_pool_size=1)))
+
+    def test_clients_closed_when_factory_set(self):
+        client = get_docker_client()
+        with streaming_docker_client() as streaming_client:
+            pass
+        set_docker_client_factory(self.factory)
+        client.close.assert_called_once_with()
+        streaming_client.close.assert_called_once_with()
+
+    def test_recreated_when_factory_set(self):
+        client = get_docker_client()
+        set_docker_client_factory(self.factory)
+        self.assertIsNot(client, get_docker_client())
+        self.assertEqual(2, self.factory.call_count)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Requires fork")
+    def test_recreated_after_fork(self):
+        client = get_docker_client()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            os.write(write_end, b"1" if get_docker_client() is not client else b"0")
+            os._exit(0)
+        os.close(write_end)
+        try:
+            self.assertEqual(b"1", os.read(read_end, 1))
+        finally:
+            os.close(read_end)
+            os.waitpid(pid, 0)
+        self.assertIs(client, get_docker_client())
+
+    def test_import_does_not_create_client_or_import_dependencies(self):
+        script = "import sys\n" \
+                 "import useintest.services.builders, useintest.executables.controllers\n" \
+                 f"print(','.join(name for name in {_HEAVY_DEPENDENCIES!r} if name in sys.modules))"
+        environment = dict(os.environ, DOCKER_HOST="tcp://0.0.0.0:1")
+        output = subprocess.run([sys.executable, "-c", script], env=environment, check=True, stdout=subprocess.PIPE)
+        self.assertEqual("", output.stdout.decode().strip())
+
+
+
+class TestDockerClientPool(unittest.TestCase):
+    """
+    Tests for `DockerClientPool`.
+    """
+    def setUp(self):
+        self.factory = MagicMock(side_effect=lambda **kwargs: MagicMock())
+        self.pool = DockerClientPool(self.factory, max_idle_streaming_clients=2)
+
+    def test_idle_streaming_clients_bounded(self):
+        with self.pool.streaming_client() as first_client, self.pool.streaming_client() as second_client, \
+                self.pool.streaming_client() as third_client:
+            pass
+        clients = (first_client, second_client, third_client)
+        self.assertEqual(1, sum(client.close.call_count for client in clients))
+        with self.pool.streaming_client() as client:
+            self.assertIn(client, clients)
+            client.close.assert_not_called()
+        self.assertEqual(3, self.factory.call_count)
+
+    def test_streaming_client_closed_when_returned_after_close(self):
+        with self.pool.streaming_client() as client:
+            self.pool.close()
+            client.close.assert_not_called()
+        client.close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
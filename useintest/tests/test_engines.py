@@ -0,0 +1,162 @@
+import pickle
+import unittest
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.engines import DockerEngine, EngineScheduler, NoEngineAvailableError, parse_docker_engines, \
+    default_docker_engine
+from useintest.images import ImageCache
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.tests.common import clean_up_controllers
+
+_GIGABYTE = 1024 ** 3
+
+
+class _UnreachableDockerEngine:
+    """
+    Docker client of an engine that cannot be reached.
+    """
+    def info(self):
+        raise ConnectionError("Unreachable")
+
+
+def _create_engine(name: str, fake_engine) -> DockerEngine:
+    return DockerEngine(name, factory=lambda **kwargs: fake_engine)
+
+
+class TestDockerEngine(unittest.TestCase):
+    """
+    Tests for `DockerEngine`.
+    """
+    def test_host_of_remote_engine(self):
+        self.assertEqual("build-1", DockerEngine("build-1", "tcp://build-1:2375").host)
+
+    def test_host_of_local_engine(self):
+        self.assertEqual("localhost", DockerEngine("local", "unix:///var/run/docker.sock").host)
+
+    def test_host_of_default_engine(self):
+        with patch.dict("os.environ", {"DOCKER_HOST": "tcp://docker:2375"}):
+            self.assertEqual("docker", DockerEngine("default").host)
+
+    def test_is_local(self):
+        self.assertTrue(DockerEngine("local", "unix:///var/run/docker.sock").is_local)
+        self.assertTrue(DockerEngine("local", "tcp://127.0.0.1:2375").is_local)
+        self.assertFalse(DockerEngine("build-1", "tcp://build-1:2375").is_local)
+
+    def test_get_load(self):
+        fake_engine = FakeDockerEngine(memory=4 * _GIGABYTE)
+        fake_engine.images.pull("fake")
+        fake_engine.containers.create("fake:latest").start()
+        load = _create_engine("engine", fake_engine).get_load()
+        self.assertEqual(1, load.running_containers)
+        self.assertEqual(4 * _GIGABYTE, load.memory)
+
+    def test_copy_uses_engine_with_same_name(self):
+        engine = _create_engine("engine", FakeDockerEngine())
+        self.assertIs(engine, pickle.loads(pickle.dumps(engine)))
+
+    def test_copy_of_default_engine(self):
+        self.assertIs(default_docker_engine, pickle.loads(pickle.dumps(default_docker_engine)))
+
+
+class TestParseDockerEngines(unittest.TestCase):
+    """
+    Tests for `parse_docker_engines`.
+    """
+    def test_parse(self):
+        engines = parse_docker_engines("build-1=tcp://build-1:2375, tcp://build-2:2375")
+        self.assertEqual(["build-1", "tcp://build-2:2375"], [engine.name for engine in engines])
+        self.assertEqual(["tcp://build-1:2375", "tcp://build-2:2375"], [engine.base_url for engine in engines])
+
+    def test_parse_empty(self):
+        self.assertEqual([], parse_docker_engines(""))
+
+
+class TestEngineScheduler(unittest.TestCase):
+    """
+    Tests for `EngineScheduler`.
+    """
+    def setUp(self):
+        self.fake_engines = [FakeDockerEngine(), FakeDockerEngine()]
+        self.engines = [_create_engine(f"engine-{i}", engine) for i, engine in enumerate(self.fake_engines)]
+        for fake_engine in self.fake_engines:
+            fake_engine.images.pull("fake")
+
+    def _run_containers(self, fake_engine: FakeDockerEngine, number: int):
+        for _ in range(number):
+            fake_engine.containers.create("fake:latest").start()
+
+    def test_select_least_loaded(self):
+        self._run_containers(self.fake_engines[0], 2)
+        self.assertIs(self.engines[1], EngineScheduler(self.engines).select())
+
+    def test_select_by_memory(self):
+        self.fake_engines[1].memory = 4 * self.fake_engines[0].memory
+        self._run_containers(self.fake_engines[0], 1)
+        self._run_containers(self.fake_engines[1], 2)
+        self.assertIs(self.engines[1], EngineScheduler(self.engines).select())
+
+    def test_placements_count_towards_load(self):
+        scheduler = EngineScheduler(self.engines)
+        selected = [scheduler.select() for _ in range(4)]
+        self.assertEqual(2, selected.count(self.engines[0]))
+        self.assertEqual(2, selected.count(self.engines[1]))
+
+    def test_unreachable_engine_not_selected(self):
+        engines = [_create_engine("unreachable", _UnreachableDockerEngine()), self.engines[0]]
+        self.assertIs(self.engines[0], EngineScheduler(engines).select())
+
+    def test_no_engine_reachable(self):
+        scheduler = EngineScheduler([_create_engine("unreachable", _UnreachableDockerEngine())])
+        self.assertRaises(NoEngineAvailableError, scheduler.select)
+
+
+class TestDockerisedServiceControllerWithEngines(unittest.TestCase):
+    """
+    Tests for placing services on several Docker engines with `DockerisedServiceController`.
+    """
+    def setUp(self):
+        self.fake_engines = [FakeDockerEngine(log_script=[(0.0, "started")]) for _ in range(2)]
+        self.engines = [DockerEngine(f"build-{i}", f"tcp://build-{i}:2375", factory=lambda fake=fake, **kwargs: fake)
+                        for i, fake in enumerate(self.fake_engines)]
+        self.controller = DockerisedServiceController(
+            DockerisedService, "fake", "latest", [], image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, engine_scheduler=EngineScheduler(self.engines))
+        clean_up_controllers(self)
+
+    def test_services_spread_over_engines(self):
+        services = [self.controller.start_service() for _ in range(4)]
+        self.addCleanup(self.controller.stop_services, services)
+        for fake_engine in self.fake_engines:
+            self.assertEqual(2, len(fake_engine.containers.list()))
+        self.assertEqual({"build-0", "build-1"}, {service.host for service in services})
+        for service in services:
+            self.assertEqual(service.engine.host, service.host)
+            self.assertEqual(service.container_id, service.container.id)
+
+    def test_stop_service(self):
+        service = self.controller.start_service()
+        self.controller.stop_service(service)
+        self.controller.reaper.flush()
+        for fake_engine in self.fake_engines:
+            self.assertEqual([], fake_engine.containers.list(all=True))
+
+    def test_streaming_clients_bounded(self):
+        fake_engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        factory = MagicMock(side_effect=lambda **kwargs: fake_engine)
+        engine = DockerEngine(f"streaming-{uuid4()}", factory=factory)
+        controller = DockerisedServiceController(
+            DockerisedService, "fake", "latest", [], image_cache=ImageCache(), start_log_detector="started",
+            healthcheck="true", start_tries=1, engine_scheduler=EngineScheduler([engine]))
+        # Waiting for health as well as the log makes each start follow the log from a thread of its own
+        for _ in range(5):
+            controller.stop_service(controller.start_service())
+        streaming_clients = [args for args in factory.call_args_list if args.kwargs == {"max_pool_size": 1}]
+        # One client follows the engine's events and another is reused for each service's log stream
+        self.assertLessEqual(len(streaming_clients), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
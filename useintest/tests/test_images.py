@@ -0,0 +1,86 @@
+import os
+import unittest
+from unittest.mock import MagicMock
+
+from docker.errors import ImageNotFound
+from temphelpers import TempManager
+
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.tests.common import MOUNTABLE_TEMP_CREATION_KWARGS
+
+_REPOSITORY = "alpine"
+_TAG = "3.6"
+_IMAGE_ID = "sha256:1234"
+_DIGEST = "sha256:abcd"
+
+
+class TestImageCache(unittest.TestCase):
+    """
+    Tests for `ImageCache`.
+    """
+    def setUp(self):
+        self._temp_manager = TempManager(MOUNTABLE_TEMP_CREATION_KWARGS, MOUNTABLE_TEMP_CREATION_KWARGS)
+        self.docker_client = MagicMock()
+        set_docker_client_factory(lambda **kwargs: self.docker_client)
+        self.addCleanup(set_docker_client_factory, None)
+        image = MagicMock(id=_IMAGE_ID, attrs={"RepoDigests": [f"{_REPOSITORY}@{_DIGEST}"]})
+        self.docker_client.images.pull.return_value = image
+        self.docker_client.images.get.return_value = image
+        self.docker_client.images.get_registry_data.return_value = MagicMock(id=_DIGEST)
+
+    def tearDown(self):
+        self._temp_manager.tear_down()
+
+    def test_resolve_pulls_once_within_ttl(self):
+        image_cache = ImageCache(ttl=60)
+        self.assertEqual(_IMAGE_ID, image_cache.resolve(_REPOSITORY, _TAG))
+        self.assertEqual(_IMAGE_ID, image_cache.resolve(_REPOSITORY, _TAG))
+        self.assertEqual(1, self.docker_client.images.pull.call_count)
+
+    def test_resolve_does_not_pull_if_digest_unchanged(self):
+        image_cache = ImageCache(ttl=0)
+        image_cache.resolve(_REPOSITORY, _TAG)
+        image_cache.resolve(_REPOSITORY, _TAG)
+        self.assertEqual(1, self.docker_client.images.pull.call_count)
+        self.assertEqual(1, self.docker_client.images.get_registry_data.call_count)
+
+    def test_resolve_pulls_if_digest_changed(self):
+        image_cache = ImageCache(ttl=0)
+        image_cache.resolve(_REPOSITORY, _TAG)
+        self.docker_client.images.get_registry_data.return_value = MagicMock(id="sha256:other")
+        image_cache.resolve(_REPOSITORY, _TAG)
+        self.assertEqual(2, self.docker_client.images.pull.call_count)
+
+    def test_resolve_without_pull(self):
+        image_cache = ImageCache(ttl=60)
+        self.assertEqual(_IMAGE_ID, image_cache.resolve(_REPOSITORY, _TAG, pull=False))
+        self.docker_client.images.pull.assert_not_called()
+
+    def test_resolve_without_pull_when_image_missing(self):
+        self.docker_client.images.get.side_effect = ImageNotFound("")
+        self.assertRaises(ImageNotFound, ImageCache().resolve, _REPOSITORY, _TAG, pull=False)
+
+    def test_invalidate(self):
+        image_cache = ImageCache(ttl=60)
+        image_cache.resolve(_REPOSITORY, _TAG)
+        image_cache.invalidate(_REPOSITORY, _TAG)
+        image_cache.resolve(_REPOSITORY, _TAG)
+        self.assertEqual(2, self.docker_client.images.pull.call_count)
+
+    def test_persisted(self):
+        location = os.path.join(self._temp_manager.create_temp_directory(), "images.json")
+        ImageCache(ttl=60, location=location).resolve(_REPOSITORY, _TAG)
+        self.assertEqual(_IMAGE_ID, ImageCache(ttl=60, location=location).resolve(_REPOSITORY, _TAG))
+        self.assertEqual(1, self.docker_client.images.pull.call_count)
+
+    def test_persisted_image_removed(self):
+        location = os.path.join(self._temp_manager.create_temp_directory(), "images.json")
+        ImageCache(ttl=60, location=location).resolve(_REPOSITORY, _TAG)
+        self.docker_client.images.get.side_effect = ImageNotFound("")
+        ImageCache(ttl=60, location=location).resolve(_REPOSITORY, _TAG)
+        self.assertEqual(2, self.docker_client.images.pull.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from temphelpers import TempManager
+
+from useintest.metrics import Timings, JsonLinesMetricsSink, PrometheusMetricsSink, START_KIND, STOP_KIND, \
+    READINESS_PHASE, RETRY_PHASE
+
+_LABELS = {"controller": "TestController", "repository": "test", "tag": "1.0"}
+
+
+def _create_timings(readiness: float=1.0, retry: float=None, tries: int=1, succeeded: bool=True) -> Timings:
+    timings = Timings()
+    timings.add(READINESS_PHASE, readiness)
+    if retry is not None:
+        timings.add(RETRY_PHASE, retry)
+    timings.tries = tries
+    timings.end(succeeded)
+    return timings
+
+
+class TestTimings(unittest.TestCase):
+    """
+    Tests for `Timings`.
+    """
+    def test_time(self):
+        timings = Timings()
+        with timings.time(READINESS_PHASE):
+            pass
+        with timings.time(READINESS_PHASE):
+            pass
+        self.assertEqual([READINESS_PHASE], list(timings.phases.keys()))
+        self.assertGreaterEqual(timings.phases[READINESS_PHASE], 0.0)
+
+    def test_time_when_error_raised(self):
+        timings = Timings()
+        try:
+            with timings.time(READINESS_PHASE):
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertIn(READINESS_PHASE, timings.phases)
+
+    def test_end(self):
+        timings = Timings()
+        timings.end(True)
+        total = timings.total
+        self.assertTrue(timings.succeeded)
+        self.assertEqual(total, timings.total)
+
+
+class TestJsonLinesMetricsSink(unittest.TestCase):
+    """
+    Tests for `JsonLinesMetricsSink`.
+    """
+    def setUp(self):
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        self.location = os.path.join(self.temp_manager.create_temp_directory(), "metrics.jsonl")
+
+    def test_record(self):
+        sink = JsonLinesMetricsSink(self.location)
+        sink.record(START_KIND, _LABELS, _create_timings(readiness=2.0, tries=2))
+        sink.record(STOP_KIND, _LABELS, _create_timings())
+        with open(self.location) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual([START_KIND, STOP_KIND], [record["kind"] for record in records])
+        self.assertEqual(_LABELS, records[0]["labels"])
+        self.assertEqual({READINESS_PHASE: 2.0}, records[0]["phases"])
+        self.assertEqual(2, records[0]["tries"])
+
+
+class TestPrometheusMetricsSink(unittest.TestCase):
+    """
+    Tests for `PrometheusMetricsSink`.
+    """
+    def test_export(self):
+        sink = PrometheusMetricsSink()
+        sink.record(START_KIND, _LABELS, _create_timings(readiness=1.0))
+        sink.record(START_KIND, _LABELS, _create_timings(readiness=2.0, retry=0.5, tries=2))
+        exported = sink.export()
+        labels = 'controller="TestController",kind="start",phase="readiness",repository="test",tag="1.0"'
+        self.assertIn(f"useintest_phase_seconds_sum{{{labels}}} 3.0", exported)
+        self.assertIn(f"useintest_phase_seconds_count{{{labels}}} 2", exported)
+        self.assertIn('useintest_tries_total{controller="TestController",kind="start",repository="test",tag="1.0"} 3',
+                      exported)
+        self.assertIn("# TYPE useintest_seconds summary", exported)
+
+    def test_export_escapes_labels(self):
+        sink = PrometheusMetricsSink()
+        sink.record(START_KIND, {"controller": 'a"b'}, _create_timings())
+        self.assertIn('controller="a\\"b"', sink.export())
+
+    def test_write_on_record(self):
+        temp_manager = TempManager()
+        self.addCleanup(temp_manager.tear_down)
+        location = os.path.join(temp_manager.create_temp_directory(), "metrics.prom")
+        sink = PrometheusMetricsSink(location)
+        sink.record(START_KIND, _LABELS, _create_timings())
+        with open(location) as file:
+            self.assertEqual(sink.export(), file.read())
+
+    def test_concurrent_writes(self):
+        temp_manager = TempManager()
+        self.addCleanup(temp_manager.tear_down)
+        directory = temp_manager.create_temp_directory()
+        location = os.path.join(directory, "metrics.prom")
+        sink = PrometheusMetricsSink(location)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(100):
+                executor.submit(sink.record, START_KIND, _LABELS, _create_timings())
+        with open(location) as file:
+            self.assertEqual(sink.export(), file.read())
+        self.assertEqual(["metrics.prom"], os.listdir(directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
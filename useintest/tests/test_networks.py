@@ -0,0 +1,87 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.images import ImageCache
+from useintest.networks import ensure_session_network, remove_session_network, get_session_network_name, \
+    is_session_network_enabled, SESSION_NETWORK_ENVIRONMENT_VARIABLE
+from useintest.ownership import OWNER_PID_LABEL
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+from useintest.tests.common import clean_up_controllers
+
+_PORT = 1234
+
+
+class _NetworkTestCase(unittest.TestCase):
+    """
+    Base for tests that use the session's network on a fake Docker engine.
+    """
+    def setUp(self):
+        self.engine = FakeDockerEngine(log_script=[(0.0, "started")])
+        set_docker_client_factory(lambda **kwargs: self.engine)
+        self.addCleanup(set_docker_client_factory, None)
+        self.addCleanup(remove_session_network)
+        clean_up_controllers(self)
+
+    def _get_network_names(self):
+        return [network.name for network in self.engine.networks.list()]
+
+
+class TestSessionNetwork(_NetworkTestCase):
+    """
+    Tests for the session's network.
+    """
+    def test_enabled_by_environment(self):
+        with patch.dict(os.environ, {SESSION_NETWORK_ENVIRONMENT_VARIABLE: "true"}):
+            self.assertTrue(is_session_network_enabled())
+        with patch.dict(os.environ, {SESSION_NETWORK_ENVIRONMENT_VARIABLE: "0"}):
+            self.assertFalse(is_session_network_enabled())
+
+    def test_ensure(self):
+        self.assertEqual(get_session_network_name(), ensure_session_network())
+        self.assertEqual(get_session_network_name(), ensure_session_network())
+        self.assertEqual([get_session_network_name()], self._get_network_names())
+        self.assertIn(OWNER_PID_LABEL, self.engine.networks.get(get_session_network_name()).attrs["Labels"])
+
+    def test_ensure_after_removal(self):
+        ensure_session_network()
+        remove_session_network()
+        self.assertEqual([], self._get_network_names())
+        ensure_session_network()
+        self.assertEqual([get_session_network_name()], self._get_network_names())
+
+
+class TestDockerisedServiceControllerOnSessionNetwork(_NetworkTestCase):
+    """
+    Tests for `DockerisedServiceController` with services on the session's network.
+    """
+    def _start_service(self, **kwargs) -> DockerisedService:
+        controller = DockerisedServiceController(
+            DockerisedService, "fake", "latest", [_PORT], image_cache=ImageCache(), start_log_detector="started",
+            start_tries=1, session_network=True, **kwargs)
+        service = controller.start_service()
+        self.addCleanup(controller.stop_service, service)
+        return service
+
+    def test_joins_network(self):
+        service = self._start_service()
+        self.assertEqual(get_session_network_name(), service.network)
+        self.assertEqual(get_session_network_name(), service.container.network)
+        self.assertEqual(str(service.port), service.container.ports[f"{_PORT}/tcp"][0]["HostPort"])
+
+    def test_ports_not_published(self):
+        service = self._start_service(publish_ports=False)
+        self.assertEqual(service.name, service.host)
+        self.assertEqual(_PORT, service.port)
+        self.assertEqual({}, service.container.ports)
+
+    def test_ports_must_be_published_off_network(self):
+        self.assertRaises(ValueError, DockerisedServiceController, DockerisedService, "fake", "latest", [_PORT],
+                          start_log_detector="started", session_network=False, publish_ports=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
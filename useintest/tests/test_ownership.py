@@ -0,0 +1,48 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from temphelpers import TempManager
+
+from useintest.ownership import get_owner_labels, mark_owned, read_owner, start_session, OWNER_PID_LABEL, \
+    OWNER_SESSION_LABEL, SESSION_ID_ENVIRONMENT_VARIABLE, SESSION_PID_ENVIRONMENT_VARIABLE
+
+
+class TestOwnership(unittest.TestCase):
+    """
+    Tests for the labelling of what is created with its owner.
+    """
+    def setUp(self):
+        environment = patch.dict(os.environ)
+        environment.start()
+        self.addCleanup(environment.stop)
+        os.environ.pop(SESSION_ID_ENVIRONMENT_VARIABLE, None)
+        os.environ.pop(SESSION_PID_ENVIRONMENT_VARIABLE, None)
+
+    def test_owned_by_process(self):
+        self.assertEqual(str(os.getpid()), get_owner_labels()[OWNER_PID_LABEL])
+
+    def test_owned_by_session(self):
+        os.environ[SESSION_ID_ENVIRONMENT_VARIABLE] = "session"
+        os.environ[SESSION_PID_ENVIRONMENT_VARIABLE] = "1"
+        labels = get_owner_labels()
+        self.assertEqual("1", labels[OWNER_PID_LABEL])
+        self.assertEqual("session", labels[OWNER_SESSION_LABEL])
+
+    def test_start_session(self):
+        session_id = get_owner_labels()[OWNER_SESSION_LABEL]
+        start_session()
+        self.assertEqual(session_id, os.environ[SESSION_ID_ENVIRONMENT_VARIABLE])
+        self.assertEqual(str(os.getpid()), os.environ[SESSION_PID_ENVIRONMENT_VARIABLE])
+
+    def test_mark_owned(self):
+        temp_manager = TempManager()
+        self.addCleanup(temp_manager.tear_down)
+        directory = temp_manager.create_temp_directory()
+        self.assertIsNone(read_owner(directory))
+        mark_owned(directory)
+        self.assertEqual(str(os.getpid()), read_owner(directory)[OWNER_PID_LABEL])
+
+
+if __name__ == "__main__":
+    unittest.main()
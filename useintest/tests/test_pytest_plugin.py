@@ -0,0 +1,142 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from temphelpers import TempManager
+
+try:
+    import pytest
+except ImportError:
+    raise unittest.SkipTest("Requires pytest (see test_requirements.txt)")
+
+from useintest.executables.controllers import DefinedExecutablesController
+from useintest.pytest_plugin import get_fixture_name, _get_fixture_base_name, _can_create_without_arguments
+
+_CONFTEST = """
+from useintest.benchmarks.fake_docker import FakeDockerEngine
+from useintest.common import set_docker_client_factory
+from useintest.pytest_plugin import UseInTestPlugin
+from useintest.services.controllers import DockerisedServiceController
+from useintest.services.models import DockerisedService
+
+
+class FakeServiceController(DockerisedServiceController):
+    def __init__(self):
+        super().__init__(DockerisedService, "fake", "latest", [], start_log_detector="started", start_tries=1)
+
+
+def pytest_configure(config):
+    engine = FakeDockerEngine(log_script=[(0.0, "started")])
+    set_docker_client_factory(lambda **kwargs: engine)
+    config.pluginmanager.register(UseInTestPlugin(config, {"fake_service": FakeServiceController}), "fake")
+"""
+
+_TESTS = """
+import os
+
+import pytest
+
+
+@pytest.mark.parametrize("number", range(4))
+def test_session(fake_service_session, number):
+    with open(os.path.join(os.environ["RESULTS_DIRECTORY"], f"{os.getpid()}-{number}"), "w") as file:
+        file.write(fake_service_session.name)
+
+
+def test_function(fake_service, fake_service_module):
+    assert fake_service.name != fake_service_module.name
+"""
+
+
+class TestFixtureNames(unittest.TestCase):
+    """
+    Tests for the naming of fixtures.
+    """
+    def test_service_fixture_name(self):
+        self.assertEqual("mongo_service", _get_fixture_base_name("MongoServiceController"))
+        self.assertEqual("mongo3_service", _get_fixture_base_name("Mongo3DockerisedServiceController"))
+        self.assertEqual("couch_db1_6_service", _get_fixture_base_name("CouchDB1_6ServiceController"))
+
+    def test_executables_controller_fixture_name(self):
+        self.assertEqual("samtools_executables_controller",
+                         _get_fixture_base_name("SamtoolsExecutablesController"))
+
+    def test_scoped_fixture_name(self):
+        self.assertEqual("mongo_service", get_fixture_name("mongo_service", "function"))
+        self.assertEqual("mongo_service_session", get_fixture_name("mongo_service", "session"))
+
+
+class TestCanCreateWithoutArguments(unittest.TestCase):
+    """
+    Tests for `_can_create_without_arguments`.
+    """
+    def test_can_create(self):
+        self.assertTrue(_can_create_without_arguments(DefinedExecutablesController))
+
+    def test_cannot_create(self):
+        class RequiresArgumentsController(DefinedExecutablesController):
+            def __init__(self, name: str):
+                super().__init__()
+
+        class BuiltController(RequiresArgumentsController):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+
+        self.assertFalse(_can_create_without_arguments(BuiltController))
+
+
+class TestUseInTestPlugin(unittest.TestCase):
+    """
+    Tests for `UseInTestPlugin`, run against fake services in pytest subprocesses.
+    """
+    def setUp(self):
+        self.temp_manager = TempManager()
+        self.addCleanup(self.temp_manager.tear_down)
+        self.tests_directory = self.temp_manager.create_temp_directory()
+        self.results_directory = self.temp_manager.create_temp_directory()
+        self.temp_directory = self.temp_manager.create_temp_directory()
+        with open(os.path.join(self.tests_directory, "conftest.py"), "w") as file:
+            file.write(_CONFTEST)
+        with open(os.path.join(self.tests_directory, "test_fake.py"), "w") as file:
+            file.write(_TESTS)
+
+    def _run_pytest(self, *arguments: str) -> str:
+        package_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        environment = dict(os.environ, RESULTS_DIRECTORY=self.results_directory, TMPDIR=self.temp_directory,
+                           PYTHONPATH=os.pathsep.join(filter(None, [package_directory, os.environ.get("PYTHONPATH")])))
+        process = subprocess.run(
+            [sys.executable, "-m", "pytest", "-p", "useintest.pytest_plugin", "-o", "useintest_fixtures=false",
+             "-p", "no:cacheprovider", *arguments, self.tests_directory],
+            env=environment, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.stdout.decode()
+        self.assertEqual(0, process.returncode, output)
+        return output
+
+    def _get_session_service_names(self):
+        names = set()
+        for file_name in os.listdir(self.results_directory):
+            with open(os.path.join(self.results_directory, file_name)) as file:
+                names.add(file.read())
+        return names
+
+    def test_fixtures(self):
+        output = self._run_pytest()
+        self.assertEqual(1, len(self._get_session_service_names()))
+        self.assertIn("fake_service: 3 started", output)
+
+    def test_session_service_shared_by_workers(self):
+        try:
+            import xdist
+        except ImportError:
+            self.skipTest("Requires pytest-xdist")
+        output = self._run_pytest("-n", "2")
+        self.assertEqual(2, len({file_name.split("-")[0] for file_name in os.listdir(self.results_directory)}))
+        self.assertEqual(1, len(self._get_session_service_names()))
+        self.assertIn("fake_service:", output)
+        self.assertEqual([], [file_name for file_name in os.listdir(self.temp_directory)
+                              if file_name.startswith("useintest-shared-services-")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import MagicMock
+
+from docker.errors import NotFound
+
+from useintest.common import set_docker_client_factory
+from useintest.metrics import STOP_CONTAINER_PHASE, REMOVE_CONTAINER_PHASE
+from useintest.reaper import ContainerReaper
+
+_CONTAINER = "container-name"
+
+
+class TestContainerReaper(unittest.TestCase):
+    """
+    Tests for `ContainerReaper`.
+    """
+    def setUp(self):
+        self.docker_client = MagicMock()
+        set_docker_client_factory(lambda **kwargs: self.docker_client)
+        self.addCleanup(set_docker_client_factory, None)
+        self.reaper = ContainerReaper(stop_timeout=1)
+
+    def test_remove(self):
+        timings = self.reaper.remove(_CONTAINER).result()
+        self.assertEqual({STOP_CONTAINER_PHASE, REMOVE_CONTAINER_PHASE}, set(timings.keys()))
+        self.docker_client.api.stop.assert_called_once_with(_CONTAINER, timeout=1)
+        self.docker_client.api.remove_container.assert_called_once_with(_CONTAINER, force=True, v=True)
+
+    def test_remove_with_kill(self):
+        self.reaper.remove(_CONTAINER, kill=True).result()
+        self.docker_client.api.stop.assert_not_called()
+        self.docker_client.api.remove_container.assert_called_once_with(_CONTAINER, force=True, v=True)
+
+    def test_remove_when_not_found(self):
+        self.docker_client.api.stop.side_effect = NotFound("")
+        self.reaper.remove(_CONTAINER).result()
+
+    def test_remove_after_shutdown(self):
+        self.reaper._executor.shutdown()
+        timings = self.reaper.remove(_CONTAINER).result(timeout=0)
+        self.assertIn(REMOVE_CONTAINER_PHASE, timings)
+        self.docker_client.api.remove_container.assert_called_once_with(_CONTAINER, force=True, v=True)
+
+    def test_flush(self):
+        for i in range(20):
+            self.reaper.remove(f"{_CONTAINER}-{i}")
+        self.reaper.flush()
+        self.assertEqual(20, self.docker_client.api.remove_container.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()